@@ -2,15 +2,21 @@
 import asyncio
 import json
 import os
+from typing import Any, Dict, Optional
 
 from client_sdk.params import TaskParams, ServiceParams, SyncParams
 from client_sdk.rpc_client import EAIRPCClient
 from utils.file_utils import read_json_with_project_root, write_json_with_project_root, PROJECT_ROOT
+from utils import metrics, profiling
 
 data_dir = PROJECT_ROOT / "data"
 storage_abs_path = data_dir / "favorite_notes_brief.json"
 storage_rela_path = "data/favorite_notes_brief.json"
 
+COOKIE_IDS = ["28ba44f1-bb67-41ab-86f0-a3d049d902aa"]
+# 任务结束后是否关闭浏览器页面；常驻模式（sync_daemon.py）置为 False，页面保持打开供下次复用
+CLOSE_PAGE_WHEN_TASK_FINISHED = True
+
 def init_file():
     # 笔记数据由我们自己维护，初始哈笔记数据为一个对象
     if not os.path.exists(storage_abs_path):
@@ -18,6 +24,38 @@ def init_file():
 
 init_file()
 
+async def sync_brief(client: EAIRPCClient) -> Optional[Dict[str, Any]]:
+    """同步收藏简要数据并落盘，返回本次结果（含 added / updated）；失败返回 None"""
+    notes = read_json_with_project_root(storage_rela_path)
+
+    # 返回值是 全量笔记/新添加/有更新 的笔记数据，删除暂时没有做
+    # storage_file会保存完整数据（包含之前数据以及上面两者）
+    results = await client.get_favorite_notes_brief_from_xhs(
+        storage_data=json.dumps(notes),
+        task_params=TaskParams(
+            cookie_ids=COOKIE_IDS,
+            close_page_when_task_finished=CLOSE_PAGE_WHEN_TASK_FINISHED,
+        ),
+        service_params=ServiceParams(
+            max_items=20,
+            max_seconds=20 ** 9,
+        ),
+        sync_params=SyncParams(
+            max_new_items=20,
+        )
+    )
+    if not results["success"]:
+        print(f"[get_favorite_notes_brief_from_xhs]执行失败：{results['error']}")
+        return None
+
+    print(f"[get_favorite_notes_brief_from_xhs]执行成功，耗时：{results.get('exec_elapsed_ms', 'null')}ms")
+
+    # task_params_extra.storage_data 是本次请求传入的整个旧文件，原样保存会每次同步嵌套一层
+    (results.get("task_params_extra") or {}).pop("storage_data", None)
+    write_json_with_project_root(storage_rela_path, results)
+    return results
+
+
 async def main():
     # 创建客户端
     client = EAIRPCClient(
@@ -32,31 +70,7 @@ async def main():
         await client.start()
         print("✅ RPC客户端已启动")
 
-        notes = read_json_with_project_root(storage_rela_path)
-
-        # 返回值是 全量笔记/新添加/有更新 的笔记数据，删除暂时没有做
-        # storage_file会保存完整数据（包含之前数据以及上面两者）
-        results = await client.get_favorite_notes_brief_from_xhs(
-            storage_data=json.dumps(notes),
-            task_params=TaskParams(
-                cookie_ids=["28ba44f1-bb67-41ab-86f0-a3d049d902aa"],
-                close_page_when_task_finished=True,
-            ),
-            service_params=ServiceParams(
-                max_items=20,
-                max_seconds=20 ** 9,
-            ),
-            sync_params=SyncParams(
-                max_new_items=20,
-            )
-        )
-        if not results["success"]:
-            print(f"[get_favorite_notes_brief_from_xhs]执行失败：{results['error']}")
-            return
-
-        print(f"[get_favorite_notes_brief_from_xhs]执行成功，耗时：{results.get('exec_elapsed_ms', 'null')}ms")
-
-        write_json_with_project_root(storage_rela_path, results)
+        await sync_brief(client)
 
     except Exception as e:
         print(f"❌ 错误: {e}")
@@ -68,5 +82,7 @@ async def main():
 
 
 if __name__ == "__main__":
+    metrics.start_run("01_get_brief_notes")
+    profiling.start("01_get_brief_notes")
     print("🚀 小红书收藏笔记获取与处理")
     asyncio.run(main())
@@ -5,7 +5,8 @@ import json
 from client_sdk.params import TaskParams, ServiceParams
 from client_sdk.rpc_client import EAIRPCClient
 import os
-from utils.file_utils import read_json_with_project_root, write_json_with_project_root, PROJECT_ROOT
+from utils.file_utils import read_json_with_project_root, write_json_with_project_root, update_json_with_project_root, PROJECT_ROOT
+from utils import metrics, profiling
 
 data_dir = PROJECT_ROOT / "data"
 notes_brief_rela_path = "data/favorite_notes_brief.json"
@@ -14,6 +15,10 @@ notes_failed_abs_file = data_dir / "favorite_notes_details_failed.json"
 notes_details_rela_file = "data/favorite_notes_details.json"
 notes_failed_rela_file = "data/favorite_notes_details_failed.json"
 
+COOKIE_IDS = ["28ba44f1-bb67-41ab-86f0-a3d049d902aa"]
+# 任务结束后是否关闭浏览器页面；常驻模式（sync_daemon.py）置为 False，页面保持打开供下次复用
+CLOSE_PAGE_WHEN_TASK_FINISHED = True
+
 def init_file():
     # 笔记数据由我们自己维护，初始哈笔记数据为一个对象
     if not os.path.exists(notes_details_abs_file):
@@ -42,8 +47,8 @@ async def get_details(client: EAIRPCClient, brief_notes_results):
         brief_data=json.dumps(brief_data),
         wait_time_sec=10,  # 两次笔记详情获取时间间隔10s
         task_params=TaskParams(
-            cookie_ids=["28ba44f1-bb67-41ab-86f0-a3d049d902aa"],
-            close_page_when_task_finished=True,
+            cookie_ids=COOKIE_IDS,
+            close_page_when_task_finished=CLOSE_PAGE_WHEN_TASK_FINISHED,
         ),
         service_params=ServiceParams(
             max_items=10,
@@ -59,16 +64,22 @@ async def get_details(client: EAIRPCClient, brief_notes_results):
 
     print(f"[get_notes_details_from_xhs]执行成功，耗时：{details_notes_res.get('exec_elapsed_ms', 'null')}ms")
 
-    # 获取到现有的笔记详情数据
-    details_data = read_json_with_project_root(notes_details_rela_file)
-
-    # 将新获取到的笔记详情数据添加进去
-    data = details_data.get("data", [])
-    if details_notes_res["count"] > 0:
-        data.extend(details_notes_res["data"])
-    details_data["data"] = data
-    details_data["count"] = len(data)
-    write_json_with_project_root(notes_details_rela_file, details_data)
+    # 将新获取到的笔记详情数据合并到现有数据中（加锁读改写，避免与其他阶段并发时互相覆盖）
+    def _extend_details(details_data):
+        data = details_data.get("data", [])
+        if details_notes_res["count"] > 0:
+            # 有更新的笔记原位替换旧详情，新笔记追加，避免同一笔记出现多份
+            positions = {it.get("id"): i for i, it in enumerate(data) if isinstance(it, dict) and it.get("id")}
+            for it in details_notes_res["data"]:
+                pos = positions.get(it.get("id")) if isinstance(it, dict) else None
+                if pos is None:
+                    data.append(it)
+                else:
+                    data[pos] = it
+        details_data["data"] = data
+        details_data["count"] = len(data)
+
+    update_json_with_project_root(notes_details_rela_file, _extend_details, default=dict)
 
     if details_notes_res["failed_notes"]["count"] == 0:
         print("All brief notes collected successfully!")
@@ -79,6 +90,16 @@ async def get_details(client: EAIRPCClient, brief_notes_results):
 
     return True
 
+async def sync_details(client: EAIRPCClient) -> None:
+    """为简要数据中新增/有更新的笔记获取详情，失败的笔记重试"""
+    brief_notes_results = read_json_with_project_root(notes_brief_rela_path)
+    has_failed = await get_details(client, brief_notes_results)
+
+    while has_failed:
+        failed_notes_results = read_json_with_project_root(notes_failed_rela_file)
+        has_failed = await get_details(client, failed_notes_results)
+
+
 async def main():
     # 创建客户端
     client = EAIRPCClient(
@@ -103,12 +124,7 @@ async def main():
         # print(f"AI回复: {chat_result.get("data")[0].get('last_model_message', 'N/A')}")
 
 
-        brief_notes_results = read_json_with_project_root(notes_brief_rela_path)
-        has_failed = await get_details(client, brief_notes_results)
-
-        while has_failed:
-            failed_notes_results = read_json_with_project_root(notes_failed_rela_file)
-            has_failed = await get_details(client, failed_notes_results)
+        await sync_details(client)
 
     except Exception as e:
         print(f"❌ 错误: {e}")
@@ -120,5 +136,7 @@ async def main():
 
 
 if __name__ == "__main__":
+    metrics.start_run("02_get_details_notes")
+    profiling.start("02_get_details_notes")
     print("🚀 小红书收藏笔记获取与处理")
     asyncio.run(main())
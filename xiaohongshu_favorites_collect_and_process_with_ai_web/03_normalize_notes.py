@@ -3,7 +3,9 @@ import unicodedata
 from datetime import datetime, timezone
 from typing import Any, Dict, List, Optional
 
-from utils.file_utils import read_json_with_project_root, write_json_with_project_root, PROJECT_ROOT
+from utils.file_utils import iter_json_items_with_project_root, write_json_with_project_root, PROJECT_ROOT
+from utils.author_profiles import engagement_rate, load_author_profiles, profile_fans
+from utils import metrics, profiling
 
 # 输入/输出文件路径（相对项目根目录）
 INPUT_DETAILS_PATH = "data/favorite_notes_details.json"
@@ -181,7 +183,8 @@ def build_author_link(platform: str, user_id: str, user_xsec_token: str) -> Opti
     return None
 
 
-def normalize_one(item: Dict[str, Any], platform: str = "xhs") -> Dict[str, Any]:
+def normalize_one(item: Dict[str, Any], platform: str = "xhs",
+                  author_profiles: Optional[Dict[str, Dict[str, Any]]] = None) -> Dict[str, Any]:
     note_id = str(item.get("id", "")).strip()
     note_xsec_token = item.get("xsec_token")
     raw_title = item.get("title") or ""
@@ -219,6 +222,8 @@ def normalize_one(item: Dict[str, Any], platform: str = "xhs") -> Dict[str, Any]
     username = clean_text(author_info.get("username"))
     avatar = author_info.get("avatar") or None
     author_link = build_author_link(platform, user_id, user_xsec_token)
+    # 粉丝数来自 10_fetch_author_profiles.py 维护的缓存，这里不发请求
+    fans = profile_fans(author_profiles or {}, user_id)
 
     # 语言与质量标记
     lang = detect_lang(title, desc)
@@ -250,13 +255,14 @@ def normalize_one(item: Dict[str, Any], platform: str = "xhs") -> Dict[str, Any]
             "collect_num": collect_num,
             "comment_num": comment_num,
             "engagement_score": engagement_score,
-            "engagement_rate": None,  # 需要作者粉丝数后计算
+            "engagement_rate": engagement_rate(engagement_score, fans),  # 作者粉丝数未知时为 None
         },
         "author": {
             "user_id": user_id,
             "username": username,
             "avatar": avatar,
             "author_link": author_link,
+            "fans": fans,
         },
         "locale": {
             "lang": lang,
@@ -270,20 +276,13 @@ def normalize_one(item: Dict[str, Any], platform: str = "xhs") -> Dict[str, Any]
 
 
 def normalize_all() -> Dict[str, Any]:
-    src = read_json_with_project_root(INPUT_DETAILS_PATH)
-    # 兼容不同结构：可能是 {"data": [...]} 或 直接是列表
-    items: List[Dict[str, Any]]
-    if isinstance(src, dict):
-        items = src.get("data") or []
-    elif isinstance(src, list):
-        items = src
-    else:
-        items = []
-
+    # 流式读取详情：兼容 {"data": [...]} 或 直接是列表，不再整体载入原始数据
     normalized_list: List[Dict[str, Any]] = []
-    for it in items:
+    # 作者信息缓存只读一次，同一作者的多条笔记共用
+    author_profiles = load_author_profiles()
+    for it in iter_json_items_with_project_root(INPUT_DETAILS_PATH):
         try:
-            normalized_list.append(normalize_one(it, platform="xhs"))
+            normalized_list.append(normalize_one(it, platform="xhs", author_profiles=author_profiles))
         except Exception as e:
             # 忽略单条异常，保证整体可用
             normalized_list.append({
@@ -304,9 +303,13 @@ def normalize_all() -> Dict[str, Any]:
 def main():
     result = normalize_all()
     write_json_with_project_root(OUTPUT_NORMALIZED_PATH, result)
-    print(f"✅ 规范化完成，输出文件：{(PROJECT_ROOT / OUTPUT_NORMALIZED_PATH).as_posix()}，count={result.get('count')}")
+    with_rate = sum(1 for d in result["data"] if ((d.get("normalized") or {}).get("stats") or {}).get("engagement_rate") is not None)
+    print(f"✅ 规范化完成，输出文件：{(PROJECT_ROOT / OUTPUT_NORMALIZED_PATH).as_posix()}，count={result.get('count')}，"
+          f"有互动率 {with_rate}")
 
 
 if __name__ == "__main__":
+    metrics.start_run("03_normalize_notes")
+    profiling.start("03_normalize_notes")
     print("🚀 开始规范化收藏笔记数据 …")
     main()
\ No newline at end of file
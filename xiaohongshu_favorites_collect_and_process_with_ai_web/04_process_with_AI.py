@@ -1,11 +1,19 @@
+import argparse
 import asyncio
+import hashlib
 import json
 import re
-from typing import Any, Dict, List, Optional
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
 from client_sdk.params import TaskParams
 from client_sdk.rpc_client import EAIRPCClient  # type: ignore
-from utils.file_utils import read_json_with_project_root, write_json_with_project_root, PROJECT_ROOT
+from utils.ai_utils import externalize_task_raw
+from utils.file_utils import read_json_with_project_root, write_json_with_project_root, update_json_with_project_root, PROJECT_ROOT, UNCHANGED
+from utils.lease_utils import LEASE_HEARTBEAT_SEC, LEASE_TTL_SEC, LeaseStore, default_worker_id
+from utils import metrics, profiling
+from utils.page_session import PageSession
+from utils.progress import ProgressTracker
 
 # ----------------------
 # Config
@@ -13,6 +21,10 @@ from utils.file_utils import read_json_with_project_root, write_json_with_projec
 INPUT_NORMALIZED_PATH = "data/favorite_notes_normalized.json"
 OUTPUT_AI_RESULT_PATH = "data/favorite_notes_ai_processed.json"
 FAIL_LOG_PATH = "data/favorite_notes_ai_failures.json"
+# 多 worker 模式（--worker）的租约文件
+LEASE_PATH = "data/favorite_notes_ai_leases.json"
+# 剩余笔记都被其他 worker 持有时的轮询间隔（秒），等待其完成或租约过期后接管
+LEASE_POLL_SEC = 30
 
 # 控制是否重处理已完成的笔记，以及是否对部分完成的笔记继续补齐剩余任务
 REPROCESS_EXISTING = False
@@ -29,6 +41,10 @@ COOKIE_IDS = [
     "819969a2-9e59-46f5-b0ca-df2116d9c2a0"
 ]
 CONV_ID = "5b8eaf83-fcc7-4579-a61d-c5987a7a2603"
+# 任务结束后是否关闭浏览器页面；False 时连续的对话调用复用同一页面，
+# 满 PAGE_SESSION_MAX_CALLS 次或出错后回收（--reuse-pages 开启，常驻模式 sync_daemon.py 默认开启）
+CLOSE_PAGE_WHEN_TASK_FINISHED = True
+PAGE_SESSION_MAX_CALLS = 20
 
 # 每5s进入下一个笔记
 AI_INTERVAL_SEC = 5
@@ -160,6 +176,16 @@ def build_prompt_entities_concepts(title: str, desc: str, tags_joined: str) -> s
 # Persistence helpers (immediate write, resumable)
 # ----------------------
 
+def _new_state() -> Dict[str, Any]:
+    return {
+        "platform": None,
+        "source": INPUT_NORMALIZED_PATH,
+        "tasks": [],
+        "count": 0,
+        "data": [],
+    }
+
+
 def _load_processed_state() -> Dict[str, Any]:
     try:
         state = read_json_with_project_root(OUTPUT_AI_RESULT_PATH)
@@ -170,13 +196,7 @@ def _load_processed_state() -> Dict[str, Any]:
             return state
     except FileNotFoundError:
         pass
-    return {
-        "platform": None,
-        "source": INPUT_NORMALIZED_PATH,
-        "tasks": [],
-        "count": 0,
-        "data": [],
-    }
+    return _new_state()
 
 
 def _save_processed_state(state: Dict[str, Any]) -> None:
@@ -185,15 +205,31 @@ def _save_processed_state(state: Dict[str, Any]) -> None:
     write_json_with_project_root(OUTPUT_AI_RESULT_PATH, state)
 
 
+def _update_processed_state(fn: Callable[[Dict[str, Any]], Optional[bool]]) -> Dict[str, Any]:
+    """在文件锁内读取最新结果、修改并写回，不会覆盖其他 worker 同时写入的笔记
+
+    fn 返回 False 表示没有改动，此时不写回文件。
+    """
+    def _apply(existing: Any) -> Any:
+        state = existing if isinstance(existing, dict) else _new_state()
+        if not isinstance(state.get("data"), list):
+            state["data"] = []
+        if fn(state) is False and state is existing:
+            return UNCHANGED
+        state["count"] = len(state["data"])
+        return state
+
+    return update_json_with_project_root(OUTPUT_AI_RESULT_PATH, _apply, default=_new_state)
+
+
 def _append_failure_log(record: Dict[str, Any]) -> None:
-    try:
-        existing = read_json_with_project_root(FAIL_LOG_PATH)
+    def _append(existing: Any) -> List[Dict[str, Any]]:
         if not isinstance(existing, list):
             existing = []
-    except FileNotFoundError:
-        existing = []
-    existing.append(record)
-    write_json_with_project_root(FAIL_LOG_PATH, existing)
+        existing.append(record)
+        return existing
+
+    update_json_with_project_root(FAIL_LOG_PATH, _append, default=list)
 
 
 def _index_by_note_id(state: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
@@ -205,6 +241,60 @@ def _index_by_note_id(state: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
     return index
 
 
+def _source_hash(norm: Dict[str, Any]) -> str:
+    """参与提示词的字段（标题/正文/标签）的摘要，用于发现笔记被作者修改过"""
+    payload = json.dumps([norm.get("title"), norm.get("desc"), norm.get("tags")], ensure_ascii=False)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+def _source_changed(existing: Optional[Dict[str, Any]], normalized_item: Optional[dict]) -> bool:
+    # 旧结果没有记录摘要时无从判断，视为未修改；启动时由 _backfill_source_hashes 补记，此后的修改即可发现
+    if not existing or not existing.get("source_hash") or not isinstance(normalized_item, dict):
+        return False
+    return existing["source_hash"] != _source_hash(normalized_item.get("normalized") or {})
+
+
+def _backfill_source_hashes(state: Dict[str, Any], items: List[dict]) -> Tuple[Dict[str, Any], int]:
+    """为没有 source_hash 的旧结果补记当前规范化数据的摘要（锁内读-改-写），返回 (最新结果, 补记条数)
+
+    旧结果当初依据的内容已无法得知，按与当前数据一致处理。
+    只看规范化数据中仍存在的笔记：已移除笔记的结果永远补不上摘要，不能因此每次启动都重写整个文件。
+    """
+    hashes: Dict[str, str] = {}
+    for item in items:
+        norm = item.get("normalized") if isinstance(item, dict) else None
+        if isinstance(norm, dict) and norm.get("note_id"):
+            hashes.setdefault(norm["note_id"], _source_hash(norm))
+
+    def _missing(note: Any) -> bool:
+        return isinstance(note, dict) and not note.get("source_hash") and note.get("note_id") in hashes
+
+    if not any(_missing(note) for note in state.get("data", [])):
+        return state, 0
+    filled = 0
+
+    def _fill(latest: Dict[str, Any]) -> bool:
+        nonlocal filled
+        for note in latest["data"]:
+            if _missing(note):
+                note["source_hash"] = hashes[note["note_id"]]
+                filled += 1
+        return filled > 0
+
+    return _update_processed_state(_fill), filled
+
+
+def _skip_reason(existing: Optional[Dict[str, Any]], normalized_item: Optional[dict] = None) -> Optional[str]:
+    """已完成且不重跑 -> 跳过；部分完成且允许续跑 -> 处理剩余；返回 None 表示需要处理"""
+    if not existing or _source_changed(existing, normalized_item):
+        return None
+    if existing.get("status") == "ok" and not REPROCESS_EXISTING:
+        return "跳过已完成笔记"
+    if existing.get("status") == "partial" and not RESUME_PARTIAL and not REPROCESS_EXISTING:
+        return "跳过部分完成笔记（已禁用续跑）"
+    return None
+
+
 def _merge_note_result_into_state(state: Dict[str, Any], note_result: Dict[str, Any]) -> None:
     # 如存在相同 note_id 则替换，否则追加
     note_id = note_result.get("note_id")
@@ -223,6 +313,10 @@ def _merge_note_result_into_state(state: Dict[str, Any], note_result: Dict[str,
 # Task Abstractions
 # ----------------------
 
+# 所有对话任务共用一个页面会话
+CHAT_SESSION = PageSession("chat", max_calls=PAGE_SESSION_MAX_CALLS)
+
+
 class Task:
     name: str
 
@@ -234,13 +328,17 @@ class Task:
 
     async def run(self, client: EAIRPCClient, normalized: dict, context: Dict[str, Any]) -> Dict[str, Any]:
         p = self.prompt(normalized, context)
+        started = time.perf_counter()
+        # 拿到模型回复之前失败记为 rpc_error，之后失败记为 parse_error
+        outcome = "rpc_error"
+        close_page = CHAT_SESSION.begin(reuse=not CLOSE_PAGE_WHEN_TASK_FINISHED)
         try:
             chat_result = await client.chat_with_yuanbao(
                 ask_question=p,
                 conversation_id=CONV_ID,
                 task_params=TaskParams(
                     cookie_ids=COOKIE_IDS,
-                    close_page_when_task_finished=True,
+                    close_page_when_task_finished=close_page,
                 ),
             )
             data = chat_result.get("data") if isinstance(chat_result, dict) else None
@@ -249,7 +347,9 @@ class Task:
             text = data[0].get("last_model_message")
             if not isinstance(text, str) or not text.strip():
                 raise RuntimeError("empty model message")
+            outcome = "parse_error"
             parsed = self.parse_and_validate(text)
+            outcome = "ok"
             return {"ok": True, "result": parsed, "raw": text}
         except Exception as e:
             err = {"type": type(e).__name__, "message": str(e)}
@@ -260,6 +360,11 @@ class Task:
             except Exception:
                 raw = None
             return {"ok": False, "error": err, "raw": raw, "prompt_excerpt": p}
+        finally:
+            # 解析失败是模型回复的问题，不代表页面异常
+            CHAT_SESSION.end(outcome != "rpc_error", time.perf_counter() - started)
+            metrics.observe("ai_task_seconds", time.perf_counter() - started, task=self.name)
+            metrics.inc("ai_task_total", task=self.name, outcome=outcome)
 
 
 class SummaryTask(Task):
@@ -471,8 +576,12 @@ async def process_one_note(client: EAIRPCClient, normalized_item: dict, existing
     norm = normalized_item.get("normalized", {}) if isinstance(normalized_item, dict) else {}
     note_id = norm.get("note_id") or normalized_item.get("id") or ""
 
-    # 初始化/承接已存在的结果（用于断点续跑，仅补未完成任务）
-    note_result: Dict[str, Any] = existing.copy() if isinstance(existing, dict) else {"note_id": note_id, "tasks": {}}
+    # 初始化/承接已存在的结果（用于断点续跑，仅补未完成任务）；笔记内容有修改时全部重跑
+    if isinstance(existing, dict) and not _source_changed(existing, normalized_item):
+        note_result: Dict[str, Any] = existing.copy()
+    else:
+        note_result = {"note_id": note_id, "tasks": {}}
+    note_result["source_hash"] = _source_hash(norm)
 
     # 逐任务执行；若已有该任务且 ok 且不重跑，则跳过
     for task in TASKS:
@@ -492,6 +601,8 @@ async def process_one_note(client: EAIRPCClient, normalized_item: dict, existing
                 "raw_response_excerpt": res.get("raw"),
                 "prompt_excerpt": res.get("prompt_excerpt"),
             })
+        # 原始回复与 result 重复，移到旁路存储，主文件只保留引用（ai_utils.load_task_raw 读取）
+        externalize_task_raw(res)
 
     # 汇总状态
     task_values = list((note_result.get("tasks") or {}).values())
@@ -526,7 +637,91 @@ async def process_one_note(client: EAIRPCClient, normalized_item: dict, existing
 # Main
 # ----------------------
 
-async def main():
+async def _heartbeat(leases: LeaseStore, note_id: str) -> None:
+    # 租约调短时续约也要跟上，保证有效期内至少续约两次
+    interval = min(LEASE_HEARTBEAT_SEC, leases.ttl_sec / 3)
+    while True:
+        await asyncio.sleep(interval)
+        if not leases.heartbeat(note_id):
+            print(f"⚠️ 租约已被其他 worker 接管: {note_id}（本 worker 的结果仍会写入，以后写入者为准）")
+            return
+
+
+async def _run_worker(client: EAIRPCClient, items: List[dict], meta: Dict[str, Any],
+                      worker_id: str, lease_ttl: float) -> None:
+    """多 worker 模式：通过租约逐条认领笔记，结果在文件锁内合并写入"""
+    leases = LeaseStore(LEASE_PATH, worker_id=worker_id, ttl_sec=lease_ttl)
+    by_id: Dict[str, dict] = {}
+    for item in items:
+        note_id = (item.get("normalized") or {}).get("note_id") or item.get("id") or ""
+        if note_id:
+            by_id.setdefault(note_id, item)
+    order = list(by_id)
+
+    # 每次认领前清空，认领时按需读取一次最新结果
+    fresh: Dict[str, Dict[str, Any]] = {}
+
+    def _is_pending(note_id: str) -> bool:
+        if "index" not in fresh:
+            fresh["index"] = _index_by_note_id(_load_processed_state())
+        return _skip_reason(fresh["index"].get(note_id), by_id[note_id]) is None
+
+    index = _index_by_note_id(_load_processed_state())
+    pending = sum(1 for note_id in order if _skip_reason(index.get(note_id), by_id[note_id]) is None)
+    print(f"👷 worker {worker_id} 启动：待处理 {pending} 条（与其他 worker 共享）")
+    progress = ProgressTracker("04_process_with_AI", pending, unit="条", config={
+        "mode": "worker",
+        "worker_id": worker_id,
+        "lease_ttl_sec": lease_ttl,
+        "cookie_ids": COOKIE_IDS,
+        "tasks": [t.name for t in TASKS],
+        "task_version": TASK_VERSION,
+        "ai_interval_sec": AI_INTERVAL_SEC,
+        "reprocess_existing": REPROCESS_EXISTING,
+        "resume_partial": RESUME_PARTIAL,
+    })
+
+    while True:
+        fresh.clear()
+        note_id, held_by_others = leases.claim(order, _is_pending)
+        if note_id is None:
+            if not held_by_others:
+                break
+            poll = min(LEASE_POLL_SEC, lease_ttl)
+            print(f"⏳ 其余 {held_by_others} 条笔记正由其他 worker 处理，{poll:g}s 后重试")
+            await asyncio.sleep(poll)
+            continue
+
+        print(f"🧩 [{worker_id}] 认领笔记: {note_id}")
+        heartbeat = asyncio.create_task(_heartbeat(leases, note_id))
+        try:
+            # 以认领时读到的最新结果为准续跑，而不是启动时的快照
+            note_result = await process_one_note(client, by_id[note_id], (fresh.get("index") or {}).get(note_id))
+        finally:
+            heartbeat.cancel()
+
+        def _merge(state: Dict[str, Any]) -> None:
+            if state.get("platform") is None:
+                state.update(meta)
+            state["tasks"] = meta["tasks"]
+            _merge_note_result_into_state(state, note_result)
+
+        # 先写结果再释放租约：其他 worker 认领时一定能看到这条已完成；
+        # 未完成的保留认领次数，本 worker 本次运行也不再认领它
+        _update_processed_state(_merge)
+        leases.release(note_id, done=note_result.get("status") == "ok")
+        await asyncio.sleep(AI_INTERVAL_SEC)
+        progress.tick(note_result.get("status") or "failed")
+
+    stuck = [k for k, v in leases.snapshot().items() if int(v.get("attempts") or 0) >= leases.max_attempts]
+    if stuck:
+        print(f"⚠️ {len(stuck)} 条笔记多次认领均未完成，已停止分配（检查后从 {LEASE_PATH} 删除即可重试）: {stuck[:10]}")
+    progress.finish(worker_id=worker_id, stuck=len(stuck), page_session=CHAT_SESSION.report())
+    print(f"💾 AI处理结果已合并写入: {(PROJECT_ROOT / OUTPUT_AI_RESULT_PATH).as_posix()}")
+
+
+async def main(worker: bool = False, worker_id: Optional[str] = None, lease_ttl: float = LEASE_TTL_SEC,
+               client: Optional[EAIRPCClient] = None):
     print("🚀 AI处理阶段启动：读取规范化数据，执行任务并即时落盘（可恢复）")
 
     norm_payload = read_json_with_project_root(INPUT_NORMALIZED_PATH)
@@ -536,40 +731,74 @@ async def main():
 
     # 载入当前处理状态
     state = _load_processed_state()
+    # 旧结果中内联的原始回复一并移到旁路存储
+    if any(isinstance(t, dict) and "raw" in t
+           for note in state.get("data", []) if isinstance(note, dict)
+           for t in (note.get("tasks") or {}).values()):
+        moved = 0
+
+        def _externalize(latest: Dict[str, Any]) -> None:
+            nonlocal moved
+            for note in latest["data"]:
+                for task_state in ((note.get("tasks") if isinstance(note, dict) else None) or {}).values():
+                    moved += externalize_task_raw(task_state)
+
+        # 锁内迁移，不会覆盖并发 worker 的写入
+        state = _update_processed_state(_externalize)
+        print(f"🗜️ 已将 {moved} 条任务的原始回复移至旁路存储")
+    state, filled = _backfill_source_hashes(state, items)
+    if filled:
+        print(f"🧷 已为 {filled} 条旧结果补记内容摘要，之后笔记被修改时会重新处理")
     # 首次运行时补充元信息
+    meta = {"platform": norm_payload.get("platform", "xhs"), "source": INPUT_NORMALIZED_PATH}
     if state.get("platform") is None:
-        state["platform"] = norm_payload.get("platform", "xhs")
-        state["source"] = INPUT_NORMALIZED_PATH
+        state.update(meta)
     state["tasks"] = [t.name for t in TASKS]
+    meta["tasks"] = state["tasks"]
 
     index = _index_by_note_id(state)
 
-    client = EAIRPCClient(
-        base_url=RPC_BASE_URL,
-        api_key=RPC_API_KEY,
-        webhook_host=RPC_WEBHOOK_HOST,
-        webhook_port=RPC_WEBHOOK_PORT,
-    )
+    # 常驻模式传入已启动的客户端，由调用方负责启停
+    own_client = client is None
+    if own_client:
+        client = EAIRPCClient(
+            base_url=RPC_BASE_URL,
+            api_key=RPC_API_KEY,
+            webhook_host=RPC_WEBHOOK_HOST,
+            webhook_port=RPC_WEBHOOK_PORT,
+        )
 
     try:
-        await client.start()
-        print("✅ RPC客户端已启动")
-
+        if own_client:
+            await client.start()
+            print("✅ RPC客户端已启动")
+
+        if worker:
+            # 结果已逐条在锁内合并写入，结束时不再整体保存（会覆盖其他 worker 的写入）
+            await _run_worker(client, items, meta, worker_id or default_worker_id(), lease_ttl)
+            return
+
+        progress = ProgressTracker("04_process_with_AI", len(items), unit="条", config={
+            "tasks": [t.name for t in TASKS],
+            "task_version": TASK_VERSION,
+            "ai_interval_sec": AI_INTERVAL_SEC,
+            "reprocess_existing": REPROCESS_EXISTING,
+            "resume_partial": RESUME_PARTIAL,
+        })
         for idx, item in enumerate(items, start=1):
             note_id = (item.get("normalized") or {}).get("note_id") or item.get("id") or ""
             if not note_id:
                 print(f"⚠️ 跳过无效笔记（缺少 note_id）: index={idx}")
+                progress.tick("invalid")
                 continue
 
             existing = index.get(note_id)
             # 判断是否需要处理（已完成且不重跑 -> 跳过；部分完成且允许续跑 -> 处理剩余）
-            if existing:
-                if existing.get("status") == "ok" and not REPROCESS_EXISTING:
-                    print(f"⏭️ 跳过已完成笔记: {note_id}")
-                    continue
-                if existing.get("status") == "partial" and not RESUME_PARTIAL and not REPROCESS_EXISTING:
-                    print(f"⏭️ 跳过部分完成笔记（已禁用续跑）: {note_id}")
-                    continue
+            reason = _skip_reason(existing, item)
+            if reason:
+                print(f"⏭️ {reason}: {note_id}")
+                progress.tick("skipped")
+                continue
 
             print(f"🧩 处理第 {idx}/{len(items)} 条笔记: {note_id}")
             note_result = await process_one_note(client, item, existing)
@@ -581,11 +810,15 @@ async def main():
             index[note_id] = note_result
 
             await asyncio.sleep(AI_INTERVAL_SEC)
+            # 计入间隔等待，吞吐即实际可持续的处理速度
+            progress.tick(note_result.get("status") or "failed")
 
+        progress.finish(page_session=CHAT_SESSION.report())
 
     finally:
-        await client.stop()
-        print("✅ RPC客户端已停止")
+        if own_client:
+            await client.stop()
+            print("✅ RPC客户端已停止")
 
     # 结束时再次保存一次确保 count 等聚合字段正确
     _save_processed_state(state)
@@ -594,4 +827,24 @@ async def main():
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    metrics.start_run("04_process_with_AI")
+    profiling.start("04_process_with_AI")
+    parser = argparse.ArgumentParser(description="对规范化笔记执行 AI 任务")
+    parser.add_argument("--worker", action="store_true",
+                        help="多 worker 模式：可在多个进程/机器上同时运行，通过租约认领笔记")
+    parser.add_argument("--worker-id", default=None, help="worker 标识，默认 <主机名>-<pid>")
+    parser.add_argument("--lease-ttl", type=float, default=LEASE_TTL_SEC,
+                        help="租约有效期（秒），worker 失联超过该时间后其笔记可被接管")
+    parser.add_argument("--cookie-id", action="append", default=None,
+                        help="本进程使用的账号 cookie_id（可重复），不同 worker 用不同账号以分摊额度")
+    parser.add_argument("--conv-id", default=None, help="本进程使用的会话 ID")
+    parser.add_argument("--reuse-pages", action="store_true",
+                        help=f"连续的对话调用复用浏览器页面（每 {PAGE_SESSION_MAX_CALLS} 次或出错后回收）")
+    args = parser.parse_args()
+    if args.reuse_pages:
+        CLOSE_PAGE_WHEN_TASK_FINISHED = False
+    if args.cookie_id:
+        COOKIE_IDS = args.cookie_id
+    if args.conv_id:
+        CONV_ID = args.conv_id
+    asyncio.run(main(worker=args.worker, worker_id=args.worker_id, lease_ttl=args.lease_ttl))
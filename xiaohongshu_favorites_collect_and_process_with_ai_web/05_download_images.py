@@ -2,19 +2,32 @@ import os
 import sys
 import json
 import time
-import errno
+from datetime import datetime, timezone
 from typing import Any, Dict, List, Optional, Tuple
-from urllib.parse import urlsplit
 from urllib.request import Request, urlopen
 from urllib.error import URLError, HTTPError
 
-from utils.file_utils import read_json_with_project_root, PROJECT_ROOT
+from utils.file_utils import iter_json_items_with_project_root, PROJECT_ROOT
+from utils import metrics, profiling
+from utils.progress import ProgressTracker
+from utils.image_utils import (
+    append_download_records,
+    image_blob_rel_path,
+    image_blob_path,
+    iter_note_image_manifests,
+    load_note_image_manifest,
+    pick_filename_from_url,
+    put_image_blob,
+    sanitize_filename,
+    save_note_image_manifest,
+    IMAGE_BLOBS_DIR,
+    LEGACY_IMAGES_DIR,
+)
 
 # ----------------------
 # Config
 # ----------------------
 INPUT_DETAILS_PATH = "data/favorite_notes_details.json"
-OUTPUT_DIR = PROJECT_ROOT / "data" / "images"
 DEFAULT_REFERER = "https://www.xiaohongshu.com/"
 
 # User-Agent 模拟常见浏览器，避免被CDN/防火墙拦截
@@ -26,40 +39,6 @@ UA = (
 # Helpers
 # ----------------------
 
-def ensure_dir(path: str) -> None:
-    try:
-        os.makedirs(path, exist_ok=True)
-    except OSError as e:
-        if e.errno != errno.EEXIST:
-            raise
-
-
-def sanitize_filename(name: str) -> str:
-    # Windows 非法字符过滤: \\ / : * ? " < > |
-    invalid = '<>:"/\\|?*'
-    for ch in invalid:
-        name = name.replace(ch, '_')
-    # 去除控制字符
-    name = ''.join(c if 32 <= ord(c) < 127 else '_' for c in name)
-    # 避免过长
-    return name[:200] if len(name) > 200 else name
-
-
-def pick_filename_from_url(url: str, fallback: str) -> str:
-    path = urlsplit(url).path
-    base = os.path.basename(path) or fallback
-    base = sanitize_filename(base)
-    if not os.path.splitext(base)[1]:
-        # 没有扩展名时，尝试根据URL中可能的格式提示，默认 .jpg
-        if 'webp' in url.lower():
-            base += '.webp'
-        elif 'png' in url.lower():
-            base += '.png'
-        else:
-            base += '.jpg'
-    return base
-
-
 def load_cookies_from_env_or_file(arg_path: Optional[str]) -> Optional[List[Dict[str, Any]]]:
     # 1) 命令行参数文件
     if arg_path:
@@ -124,13 +103,13 @@ def make_headers(cookie_header: Optional[str]) -> Dict[str, str]:
     return headers
 
 
-def download_one(url: str, dst_path: str, headers: Dict[str, str], retries: int = 3, timeout: int = 20) -> Tuple[bool, Optional[str]]:
-    # 跳过已存在且非空
-    if os.path.exists(dst_path) and os.path.getsize(dst_path) > 0:
-        return True, None
-
+def download_one(url: str, headers: Dict[str, str], retries: int = 3, timeout: int = 20) -> Tuple[Optional[bytes], Optional[str]]:
+    """下载图片内容，返回 (字节, 错误信息)"""
     last_err: Optional[str] = None
+    started = time.perf_counter()
     for attempt in range(1, retries + 1):
+        if attempt > 1:
+            metrics.inc("download_retries_total")
         try:
             req = Request(url=url, headers=headers, method='GET')
             with urlopen(req, timeout=timeout) as resp:
@@ -138,10 +117,12 @@ def download_one(url: str, dst_path: str, headers: Dict[str, str], retries: int
                     last_err = f"HTTP {resp.status}"
                 else:
                     data = resp.read()
-                    ensure_dir(os.path.dirname(dst_path))
-                    with open(dst_path, 'wb') as f:
-                        f.write(data)
-                    return True, None
+                    if data:
+                        metrics.observe("download_seconds", time.perf_counter() - started, status="ok")
+                        metrics.observe("download_bytes", len(data))
+                        metrics.inc("download_total", status="ok")
+                        return data, None
+                    last_err = "empty body"
         except HTTPError as e:
             last_err = f"HTTPError {e.code}: {e.reason}"
         except URLError as e:
@@ -151,7 +132,32 @@ def download_one(url: str, dst_path: str, headers: Dict[str, str], retries: int
         # 退避等待
         sleep_sec = min(1.0 * attempt, 5.0)
         time.sleep(sleep_sec)
-    return False, last_err
+    metrics.observe("download_seconds", time.perf_counter() - started, status="failed")
+    metrics.inc("download_total", status="failed")
+    return None, last_err
+
+
+def _now_iso() -> str:
+    return datetime.now(timezone.utc).isoformat().replace("+00:00", "Z")
+
+
+def load_known_blobs() -> Dict[str, Dict[str, Any]]:
+    """汇总已有清单：url -> blob 信息。同一链接出现在多条笔记中时只下载一次"""
+    known: Dict[str, Dict[str, Any]] = {}
+    for manifest in iter_note_image_manifests():
+        for it in manifest.get("images") or []:
+            if isinstance(it, dict) and it.get("url") and it.get("sha256"):
+                known.setdefault(it["url"], {"sha256": it["sha256"], "ext": it.get("ext", ""), "size": it.get("size")})
+    return known
+
+
+def read_legacy_image(note_id: str, url: str, idx: int) -> Optional[bytes]:
+    """旧版按 data/images/<note_id>/<文件名> 保存过的图片，直接导入，不再重新下载"""
+    path = os.path.join(str(LEGACY_IMAGES_DIR), sanitize_filename(note_id), pick_filename_from_url(url, f"{idx}.jpg"))
+    if not os.path.isfile(path) or os.path.getsize(path) == 0:
+        return None
+    with open(path, 'rb') as f:
+        return f.read()
 
 
 # ----------------------
@@ -159,14 +165,6 @@ def download_one(url: str, dst_path: str, headers: Dict[str, str], retries: int
 # ----------------------
 
 def run(cookies_path: Optional[str] = None) -> None:
-    # 读取笔记详情数据
-    details: Dict[str, Any] = read_json_with_project_root(INPUT_DETAILS_PATH)
-    notes: List[Dict[str, Any]] = details.get('data', []) if isinstance(details, dict) else []
-
-    if not notes:
-        print("[info] 未在 data/favorite_notes_details.json 中发现可用数据")
-        return
-
     # 读取 cookies（可选）并组装请求头
     cookies_list = load_cookies_from_env_or_file(cookies_path)
     cookie_header = build_cookie_header(cookies_list)
@@ -174,37 +172,91 @@ def run(cookies_path: Optional[str] = None) -> None:
 
     total = 0
     ok_cnt = 0
+    reused_cnt = 0
     fail_cnt = 0
 
-    print(f"[info] 将下载到: {OUTPUT_DIR}")
+    print(f"[info] 将下载到: {IMAGE_BLOBS_DIR}")
+    known = load_known_blobs()
 
-    for note in notes:
-        note_id = note.get('id') or 'unknown'
-        images: List[str] = note.get('images', []) or []
+    # 流式解析一遍笔记详情，只留下 note_id 与图片链接（内存占用与笔记正文无关），
+    # 图片总数用于进度与 ETA，下载时直接复用，不再重复解析详情文件
+    notes: List[Tuple[str, List[str]]] = []
+    for note in iter_json_items_with_project_root(INPUT_DETAILS_PATH):
+        if isinstance(note, dict):
+            notes.append((str(note.get('id') or 'unknown'), note.get('images', []) or []))
+    note_cnt = len(notes)
+    image_cnt = sum(len(images) for _, images in notes)
+    progress = ProgressTracker("05_download_images", image_cnt, unit="张", config={
+        "input": INPUT_DETAILS_PATH,
+        "with_cookies": bool(cookie_header),
+        "known_blobs": len(known),
+    })
+
+    for note_id, images in notes:
         if not images:
             continue
 
-        save_dir = os.path.join(str(OUTPUT_DIR), sanitize_filename(str(note_id)))
-        ensure_dir(save_dir)
-
+        entries: List[Dict[str, Any]] = []
+        # 本条笔记新下载/导入（或失败）的图片，写入下载日志供 06 增量消费
+        records: List[Dict[str, Any]] = []
         for idx, url in enumerate(images, start=1):
             total += 1
-            base_name = pick_filename_from_url(url, f"{idx}.jpg")
-            dst = os.path.join(save_dir, base_name)
-            ok, err = download_one(url, dst, headers)
-            if ok:
-                ok_cnt += 1
-                print(f"[OK] {note_id} -> {base_name}")
+            blob = known.get(url)
+            if blob and os.path.exists(image_blob_path(blob["sha256"], blob["ext"])):
+                reused_cnt += 1
+                progress.tick("reused")
             else:
-                fail_cnt += 1
-                print(f"[FAIL] {note_id} -> {base_name} | {url} | {err}")
-            # 轻微限速，避免触发风控
-            time.sleep(2)
+                data = read_legacy_image(note_id, url, idx)
+                fetched = data is None
+                if fetched:
+                    data, err = download_one(url, headers)
+                    if data is None:
+                        fail_cnt += 1
+                        print(f"[FAIL] {note_id} -> #{idx} | {url} | {err}")
+                        records.append({"note_id": note_id, "index": idx - 1, "url": url, "status": "failed",
+                                        "error": err, "downloaded_at": _now_iso()})
+                        time.sleep(2)
+                        progress.tick("failed")
+                        continue
+                digest, ext = put_image_blob(data)
+                blob = {"sha256": digest, "ext": ext, "size": len(data)}
+                known[url] = blob
+                records.append({
+                    "note_id": note_id,
+                    "index": idx - 1,
+                    "url": url,
+                    "path": image_blob_rel_path(digest, ext),
+                    "size": len(data),
+                    "sha256": digest,
+                    "ext": ext,
+                    "status": "ok" if fetched else "imported",
+                    "downloaded_at": _now_iso(),
+                })
+                ok_cnt += 1
+                print(f"[OK] {note_id} -> #{idx} {digest[:12]}{ext}")
+                if fetched:
+                    # 轻微限速，避免触发风控
+                    time.sleep(2)
+                progress.tick("ok" if fetched else "imported")
+            entries.append({"index": idx - 1, "url": url, **blob})
+
+        prev = load_note_image_manifest(note_id) or {}
+        if entries != (prev.get("images") or []):
+            save_note_image_manifest(note_id, entries)
+        # 先写清单再写日志：06 读到日志时对应的 blob 与清单都已就绪
+        append_download_records(records)
+
+    progress.finish(notes=note_cnt)
+    if note_cnt == 0:
+        print("[info] 未在 data/favorite_notes_details.json 中发现可用数据")
+        return
 
-    print(f"[done] 完成: 成功 {ok_cnt} / 失败 {fail_cnt} / 总数 {total}")
+    print(f"[done] 完成: 成功 {ok_cnt} / 复用 {reused_cnt} / 失败 {fail_cnt} / 总数 {total}")
 
 
 if __name__ == '__main__':
+    metrics.start_run("05_download_images")
+    profiling.start("05_download_images")
     # 可选参数：python 05_download_images.py [cookies_json_path]
     arg_path = sys.argv[1] if len(sys.argv) > 1 else None
     run(cookies_path=arg_path)
\ No newline at end of file
@@ -1,23 +1,81 @@
 import os
 import json
+import time
 import asyncio
-from typing import Dict, Any
+import argparse
+from datetime import datetime, timezone
+from statistics import median
+from typing import Any, Dict, List, Optional, Tuple
 
 from client_sdk.params import TaskParams
 from client_sdk.rpc_client import EAIRPCClient  # type: ignore
-from utils.file_utils import PROJECT_ROOT
+from utils.file_utils import (
+    iter_json_items_with_project_root,
+    read_json_with_project_root,
+    write_json_with_project_root,
+    PROJECT_ROOT,
+)
+from utils.image_utils import (
+    download_log_size,
+    find_image_blob,
+    image_blob_path,
+    iter_download_records,
+    iter_note_image_manifests,
+    manifest_image_entries,
+    pick_filename_from_url,
+    DOWNLOAD_LOG_PATH,
+)
+from utils.ocr_preprocess import map_boxes_to_original, merge_tile_texts, prepare_ocr_inputs, preprocess_meta
+from utils.ocr_utils import externalize_ocr_payload, ocr_entry_note_id, ocr_entry_text
+from utils import metrics, profiling
+from utils.page_session import PageSession
+from utils.progress import ProgressTracker
+from utils.phash_utils import BKTree, compute_phash, load_phash_cache, phash_available, save_phash_cache
 
 # ----------------------
 # Config
 # ----------------------
-IMAGES_DIR = PROJECT_ROOT / "data" / "images"
-OUTPUT_PATH = PROJECT_ROOT / "data" / "ocr_results.json"
+OUTPUT_RELA_PATH = "data/ocr_results.json"
+OUTPUT_PATH = PROJECT_ROOT / OUTPUT_RELA_PATH
+# 已消费到的下载日志字节偏移；删除该文件或加 --full 参数会重新扫描全部图片清单
+CHECKPOINT_RELA_PATH = "data/ocr_checkpoint.json"
+INPUT_NORMALIZED_PATH = "data/favorite_notes_normalized.json"
+
+# 调度优先级：分数高的图片先识别，积压处理不完时最有价值的结果先落地
+PRIORITY_WEIGHTS: Dict[str, float] = {
+    "only_media": 4.0,  # 笔记没有正文，只有图片/视频
+    "sparse": 2.0,      # 正文很短
+    "recency": 2.0,     # 越新越优先，按半衰期衰减
+    "position": 1.0,    # 封面和前几张图通常承载主要信息
+}
+RECENCY_HALF_LIFE_DAYS = 90.0
+
+# 单次运行预算：最多识别多少张 / 最多运行多少秒，0 表示不限；未处理的留到下次
+OCR_MAX_IMAGES_PER_RUN = 0
+OCR_MAX_SECONDS_PER_RUN = 0
+
+# 识别失败的图片最多尝试几次（跨运行累计）；未到上限时不推进检查点，下次运行重试，
+# 到上限后不再自动重试（删除 ocr_results.json 中的对应条目即可重新识别）
+OCR_MAX_ATTEMPTS = 3
+
+# 近似重复检测：pHash 汉明距离不超过该值的图片直接复用已有 OCR 结果（需要 Pillow）
+PHASH_DEDUP_ENABLED = True
+PHASH_MAX_DISTANCE = 4
+
+# 识别前先缩放/转灰度/长图切片（需要 Pillow，缺失时直接识别原图）
+OCR_PREPROCESS_ENABLED = True
+# python 06_ocr_images.py --compare N：对前 N 张图分别识别原图与预处理图，输出对比结果
+BENCHMARK_OUTPUT_PATH = "data/ocr_preprocess_benchmark.json"
 
 # RPC client config（与现有脚本保持一致）
 RPC_BASE_URL = "http://127.0.0.1:8008"
 RPC_API_KEY = "testkey"
 RPC_WEBHOOK_HOST = "127.0.0.1"
 RPC_WEBHOOK_PORT = 0
+# 任务结束后是否关闭浏览器页面；False 时连续的 OCR 调用复用同一页面，
+# 满 PAGE_SESSION_MAX_CALLS 次或出错后回收（--reuse-pages 开启，常驻模式 sync_daemon.py 默认开启）
+CLOSE_PAGE_WHEN_TASK_FINISHED = True
+PAGE_SESSION_MAX_CALLS = 50
 
 # ----------------------
 # IO helpers
@@ -27,105 +85,484 @@ def _load_results() -> Dict[str, Any]:
     if not os.path.exists(OUTPUT_PATH):
         return {}
     try:
-        with open(OUTPUT_PATH, 'r', encoding='utf-8') as f:
-            return json.load(f)
+        return read_json_with_project_root(OUTPUT_RELA_PATH)
     except Exception:
         return {}
 
 
 def _save_results(data: Dict[str, Any]) -> None:
-    with open(OUTPUT_PATH, 'w', encoding='utf-8') as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
+    write_json_with_project_root(OUTPUT_RELA_PATH, data, indent=2)
+
+
+def _load_checkpoint() -> Optional[int]:
+    try:
+        data = read_json_with_project_root(CHECKPOINT_RELA_PATH)
+    except (FileNotFoundError, ValueError):
+        return None
+    offset = data.get("download_log_offset") if isinstance(data, dict) else None
+    return offset if isinstance(offset, int) and offset >= 0 else None
+
+
+def _save_checkpoint(offset: int) -> None:
+    write_json_with_project_root(CHECKPOINT_RELA_PATH, {"download_log_offset": offset}, indent=2)
+
+
+def collect_unique_images() -> Dict[str, Dict[str, Any]]:
+    """汇总 05 生成的图片清单并按内容哈希去重
+
+    Returns:
+        sha256 -> {"path": blob 绝对路径, "refs": [(note_id, 旧版文件名, 图片在笔记中的位置)]}
+    """
+    unique: Dict[str, Dict[str, Any]] = {}
+    for manifest in iter_note_image_manifests():
+        note_id = str(manifest["note_id"])
+        for it in manifest_image_entries(manifest):
+            digest = it["sha256"]
+            info = unique.setdefault(digest, {"path": image_blob_path(digest, it.get("ext", "")), "refs": []})
+            index = int(it.get("index", 0))
+            legacy_name = pick_filename_from_url(it.get("url") or "", f"{index + 1}.jpg")
+            info["refs"].append((note_id, legacy_name, index))
+    return unique
+
+
+def collect_new_images(offset: int) -> Tuple[Dict[str, Dict[str, Any]], int]:
+    """只读取下载日志中 offset 之后新增的记录，结构同 collect_unique_images
+
+    Returns:
+        (sha256 -> {"path", "refs"}, 读到的结束偏移)
+    """
+    unique: Dict[str, Dict[str, Any]] = {}
+    end = offset
+    for record, pos in iter_download_records(offset):
+        end = pos
+        digest = record.get("sha256")
+        if record.get("status") not in ("ok", "imported") or not digest:
+            continue
+        info = unique.setdefault(digest, {"path": image_blob_path(digest, record.get("ext", "")), "refs": []})
+        index = int(record.get("index", 0))
+        legacy_name = pick_filename_from_url(record.get("url") or "", f"{index + 1}.jpg")
+        info["refs"].append((str(record.get("note_id")), legacy_name, index))
+    return unique, end
+
+
+def _migrate_legacy_result(results: Dict[str, Any], refs: List[Tuple[str, str, int]]) -> Optional[Any]:
+    """旧版结果以文件名为键，找到属于同一笔记的那条则改挂到内容哈希下，避免重复识别"""
+    for note_id, legacy_name, _ in refs:
+        entry = results.get(legacy_name)
+        if entry is None:
+            continue
+        owner = ocr_entry_note_id(entry)
+        if owner is None or owner == note_id:
+            return results.pop(legacy_name)
+    return None
+
+
+def load_note_signals() -> Dict[str, Dict[str, Any]]:
+    """从 03 的规范化数据中读取调度所需的笔记特征"""
+    signals: Dict[str, Dict[str, Any]] = {}
+    try:
+        for it in iter_json_items_with_project_root(INPUT_NORMALIZED_PATH):
+            norm = it.get("normalized") if isinstance(it, dict) else None
+            if not isinstance(norm, dict) or not norm.get("note_id"):
+                continue
+            flags = norm.get("quality_flags") or {}
+            signals[str(norm["note_id"])] = {
+                "only_media": bool(flags.get("has_only_media")),
+                "sparse": bool(flags.get("is_content_sparse")),
+                "published_at": (norm.get("timestamps") or {}).get("published_at"),
+            }
+    except FileNotFoundError:
+        print(f"[warn] 未找到 {INPUT_NORMALIZED_PATH}，仅按图片位置排序")
+    return signals
+
+
+def _recency(published_at: Optional[str], now: datetime) -> float:
+    if not published_at:
+        return 0.0
+    try:
+        dt = datetime.fromisoformat(published_at.replace("Z", "+00:00"))
+    except ValueError:
+        return 0.0
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    age_days = max((now - dt).total_seconds() / 86400, 0.0)
+    return 0.5 ** (age_days / RECENCY_HALF_LIFE_DAYS)
+
+
+def priority_score(refs: List[Tuple[str, str, int]], signals: Dict[str, Dict[str, Any]], now: datetime) -> float:
+    """图片的调度分数；被多条笔记引用时取最高分"""
+    w = PRIORITY_WEIGHTS
+    best = 0.0
+    for note_id, _, index in refs:
+        sig = signals.get(note_id) or {}
+        score = (
+            w["only_media"] * sig.get("only_media", False)
+            + w["sparse"] * sig.get("sparse", False)
+            + w["recency"] * _recency(sig.get("published_at"), now)
+            + w["position"] / (1 + index)
+        )
+        best = max(best, score)
+    return best
+
+
+class NearDuplicateIndex:
+    """已有 OCR 结果的图片的 pHash 索引，新图片识别前先查近似重复"""
+
+    def __init__(self, max_distance: int):
+        self.max_distance = max_distance
+        self._cache = load_phash_cache()
+        self._cache_dirty = False
+        self._tree = BKTree()
+
+    def phash(self, digest: str, path: Optional[str] = None) -> Optional[int]:
+        hx = self._cache.get(digest)
+        if hx:
+            return int(hx, 16)
+        path = path or find_image_blob(digest)
+        if not path:
+            return None
+        value = compute_phash(path)
+        if value is not None:
+            self._cache[digest] = f"{value:016x}"
+            self._cache_dirty = True
+        return value
+
+    def add(self, digest: str, path: Optional[str] = None) -> None:
+        value = self.phash(digest, path)
+        if value is not None:
+            self._tree.add(value, digest)
+
+    def find(self, digest: str, path: str) -> Optional[Tuple[int, str]]:
+        """返回 (距离, 已识别图片的 sha256)，没有足够接近的返回 None"""
+        value = self.phash(digest, path)
+        if value is None:
+            return None
+        return self._tree.nearest(value, self.max_distance)
+
+    def save(self) -> None:
+        if self._cache_dirty:
+            save_phash_cache(self._cache)
+            self._cache_dirty = False
+
+
+def _needs_ocr(entry: Any) -> bool:
+    """没有结果，或失败次数未达上限的图片需要（重新）识别"""
+    if entry is None:
+        return True
+    if isinstance(entry, dict) and not entry.get("success"):
+        # 旧版失败记录没有 attempts，按失败过一次计
+        return int(entry.get("attempts") or 1) < OCR_MAX_ATTEMPTS
+    return False
+
+
+def _failure_entry(previous: Any, error: str, abs_path: str) -> Dict[str, Any]:
+    attempts = int(previous.get("attempts") or 1) if isinstance(previous, dict) else 0
+    return {"success": False, "error": error, "image_path": abs_path, "attempts": attempts + 1}
+
+
+def _is_source_result(entry: Any) -> bool:
+    # 只有真正调用过 OCR 且成功的结果才能被复用，链接不再被链接
+    return isinstance(entry, dict) and bool(entry.get("success")) and not entry.get("duplicate_of")
 
 
 # ----------------------
 # Main logic
 # ----------------------
 
+OCR_SESSION = PageSession("ocr", max_calls=PAGE_SESSION_MAX_CALLS)
+
+
 async def process_one_image(client: EAIRPCClient, abs_path: str) -> Dict[str, Any]:
     # 直接按你的示例调用 OCR（cookie_ids 为空）
-    res = await client.call_paddle_ocr(
-        image_path_abs_path=abs_path,
-        task_params=TaskParams(
-            cookie_ids=[],
-            close_page_when_task_finished=True,
-        ),
-    )
-    return res
+    started = time.perf_counter()
+    outcome = "error"
+    close_page = OCR_SESSION.begin(reuse=not CLOSE_PAGE_WHEN_TASK_FINISHED)
+    try:
+        res = await client.call_paddle_ocr(
+            image_path_abs_path=abs_path,
+            task_params=TaskParams(
+                cookie_ids=[],
+                close_page_when_task_finished=close_page,
+            ),
+        )
+        outcome = "ok" if isinstance(res, dict) and res.get("success") else "failed"
+        return res
+    finally:
+        OCR_SESSION.end(outcome == "ok", time.perf_counter() - started)
+        metrics.observe("ocr_call_seconds", time.perf_counter() - started)
+        metrics.inc("ocr_call_total", outcome=outcome)
+
+
+async def ocr_blob(client: EAIRPCClient, digest: str, abs_path: str,
+                   preprocess: bool = OCR_PREPROCESS_ENABLED) -> Dict[str, Any]:
+    """识别一张图片；预处理后有多个切片时合并文本，坐标统一换算回原图"""
+    tiles = prepare_ocr_inputs(digest, abs_path) if preprocess else None
+    if not tiles:
+        return await process_one_image(client, abs_path)
+
+    tile_results: List[Dict[str, Any]] = []
+    for tile in tiles:
+        res = await process_one_image(client, tile["path"])
+        # 任一切片失败即整张失败，由调用方记录失败次数、下次重跑
+        if not (isinstance(res, dict) and res.get("success")):
+            return res
+        tile_results.append(res)
+
+    if len(tiles) == 1:
+        out = dict(tile_results[0])
+        out["data"] = map_boxes_to_original(out.get("data"), tiles[0])
+    else:
+        out = {
+            "success": True,
+            "data": {
+                "text": merge_tile_texts([ocr_entry_text(r) for r in tile_results]),
+                "tiles": [map_boxes_to_original(r.get("data"), t) for r, t in zip(tile_results, tiles)],
+            },
+        }
+    out["image_path"] = abs_path
+    out["preprocess"] = preprocess_meta(tiles)
+    return out
 
 
-async def main():
+async def compare_preprocess(client: EAIRPCClient, unique: Dict[str, Dict[str, Any]], limit: int) -> None:
+    """对比原图与预处理图的 OCR 耗时、输入体积、结果体积与识别字数"""
+    rows: List[Dict[str, Any]] = []
+    for digest, info in unique.items():
+        if len(rows) >= limit:
+            break
+        abs_path = info["path"]
+        if not os.path.isfile(abs_path):
+            continue
+        row: Dict[str, Any] = {"sha256": digest, "input_bytes_original": os.path.getsize(abs_path)}
+        # 预处理耗时单独统计（结果可缓存复用），下面的 OCR 耗时只含识别本身
+        t0 = time.perf_counter()
+        tiles = prepare_ocr_inputs(digest, abs_path) or []
+        row["ms_prepare"] = round((time.perf_counter() - t0) * 1000, 1)
+        row["tiles"] = len(tiles)
+        row["input_bytes_preprocessed"] = sum(os.path.getsize(t["path"]) for t in tiles)
+        for mode, preprocess in (("original", False), ("preprocessed", True)):
+            t0 = time.perf_counter()
+            try:
+                res = await ocr_blob(client, digest, abs_path, preprocess=preprocess)
+            except Exception as e:
+                res = {"success": False, "error": str(e)}
+            row[f"ms_{mode}"] = round((time.perf_counter() - t0) * 1000, 1)
+            row[f"result_bytes_{mode}"] = len(json.dumps(res, ensure_ascii=False).encode("utf-8"))
+            row[f"chars_{mode}"] = len(ocr_entry_text(res))
+            row[f"success_{mode}"] = bool(isinstance(res, dict) and res.get("success"))
+        rows.append(row)
+        print(f"[bench] {digest[:12]} 原图 {row['ms_original']}ms / 预处理 {row['ms_preprocessed']}ms，"
+              f"切片 {row['tiles']}")
+
+    if not rows:
+        print("[warn] 没有可对比的图片")
+        return
+    keys = ("ms", "result_bytes", "chars")
+    summary = {
+        f"median_{k}_{mode}": median(r[f"{k}_{mode}"] for r in rows)
+        for k in keys for mode in ("original", "preprocessed")
+    }
+    summary["median_input_bytes_original"] = median(r["input_bytes_original"] for r in rows)
+    summary["median_input_bytes_preprocessed"] = median(r["input_bytes_preprocessed"] for r in rows)
+    summary["median_ms_prepare"] = median(r["ms_prepare"] for r in rows)
+    summary["images"] = len(rows)
+    write_json_with_project_root(BENCHMARK_OUTPUT_PATH, {"summary": summary, "images": rows}, indent=2)
+    print(f"[done] 对比 {len(rows)} 张：OCR 耗时中位数 {summary['median_ms_original']}ms -> "
+          f"{summary['median_ms_preprocessed']}ms，结果体积中位数 {summary['median_result_bytes_original']}B -> "
+          f"{summary['median_result_bytes_preprocessed']}B，输出 {BENCHMARK_OUTPUT_PATH}")
+
+
+async def main(compare: int = 0, full: bool = False,
+               max_images: int = OCR_MAX_IMAGES_PER_RUN, max_seconds: float = OCR_MAX_SECONDS_PER_RUN,
+               client: Optional[EAIRPCClient] = None):
     # 读取已存在的结果，避免重复处理
     results: Dict[str, Any] = _load_results()
+    # 旧结果内联的完整返回结构移到压缩的旁路存储，主文件只保留文本
+    moved = sum(externalize_ocr_payload(entry) for entry in results.values())
+    if moved:
+        _save_results(results)
+        print(f"[info] {moved} 条 OCR 结果的完整返回已移至旁路存储")
 
-    # 初始化 RPC 客户端
-    client = EAIRPCClient(
-        base_url=RPC_BASE_URL,
-        api_key=RPC_API_KEY,
-        webhook_host=RPC_WEBHOOK_HOST,
-        webhook_port=RPC_WEBHOOK_PORT,
-    )
-
-    await client.start()
-    print("✅ RPC客户端已启动")
+    # 初始化 RPC 客户端；常驻模式传入已启动的客户端，由调用方负责启停
+    own_client = client is None
+    if own_client:
+        client = EAIRPCClient(
+            base_url=RPC_BASE_URL,
+            api_key=RPC_API_KEY,
+            webhook_host=RPC_WEBHOOK_HOST,
+            webhook_port=RPC_WEBHOOK_PORT,
+        )
+        await client.start()
+        print("✅ RPC客户端已启动")
 
     try:
-        # 遍历 data/images 下的所有图片文件
-        if not os.path.exists(IMAGES_DIR):
-            print(f"[warn] 图片目录不存在: {IMAGES_DIR}")
+        if compare > 0:
+            await compare_preprocess(client, collect_unique_images(), compare)
             return
 
-        total = 0
-        skipped = 0
+        # 按内容哈希遍历：同一张图片被多条笔记引用时只识别一次。
+        # 平时只消费下载日志的新增部分；首次运行或 --full 时扫描全部图片清单
+        offset = None if full else _load_checkpoint()
+        if offset is not None and offset > download_log_size():
+            print("[warn] 下载日志比检查点短（可能被压缩或删除），重新全量扫描")
+            offset = None
+        if offset is None:
+            # 先取日志长度再扫描清单：05 先写清单后写日志，此后追加的记录留给下次增量处理
+            log_end = download_log_size()
+            unique = collect_unique_images()
+            print(f"[info] 全量扫描图片清单：{len(unique)} 张")
+        else:
+            unique, log_end = collect_new_images(offset)
+            print(f"[info] 下载日志新增 {log_end - offset} 字节，待处理 {len(unique)} 张")
+
+        if not unique:
+            if not os.path.exists(DOWNLOAD_LOG_PATH) and offset is None:
+                print("[warn] 未找到图片清单，请先运行 05_download_images.py")
+            _save_checkpoint(log_end)
+            return
+
+        # 先把旧版以文件名为键的结果改挂到内容哈希下，只落盘一次
+        migrated = 0
+        for digest, info in unique.items():
+            if digest in results:
+                continue
+            legacy = _migrate_legacy_result(results, info["refs"])
+            if legacy is not None:
+                results[digest] = legacy
+                migrated += 1
+        if migrated:
+            _save_results(results)
+
+        near_index: Optional[NearDuplicateIndex] = None
+        if PHASH_DEDUP_ENABLED:
+            if phash_available():
+                near_index = NearDuplicateIndex(PHASH_MAX_DISTANCE)
+                # 已识别图片的哈希大多来自缓存，不需要重新解码
+                for digest, entry in results.items():
+                    # 旧版以文件名为键的结果没有对应 blob，跳过
+                    if len(digest) == 64 and _is_source_result(entry):
+                        near_index.add(digest)
+            else:
+                print("[warn] 未安装 Pillow，跳过近似重复检测：pip install pillow")
+
+        total = len(unique)
+        pending = [d for d in unique if _needs_ocr(results.get(d))]
+        skipped = total - len(pending)
+        linked = 0
         ok_cnt = 0
         fail_cnt = 0
+        deferred = 0
 
-        for note_id in os.listdir(IMAGES_DIR):
-            note_dir = IMAGES_DIR / note_id
-            if not os.path.isdir(note_dir):
-                continue
+        # 按优先级排序；Python 排序稳定，同分时保持清单顺序
+        if pending:
+            signals = load_note_signals()
+            now = datetime.now(timezone.utc)
+            scores = {d: priority_score(unique[d]["refs"], signals, now) for d in pending}
+            pending.sort(key=lambda d: scores[d], reverse=True)
+            print(f"[info] 待识别 {len(pending)} 张，最高分 {scores[pending[0]]:.2f}，最低分 {scores[pending[-1]]:.2f}")
 
-            for fname in os.listdir(note_dir):
-                fpath = note_dir / fname
-                if not os.path.isfile(fpath):
-                    continue
+        progress = ProgressTracker("06_ocr_images", len(pending), unit="张", config={
+            "full": offset is None,
+            "max_images": max_images,
+            "max_seconds": max_seconds,
+            "phash_dedup": near_index is not None,
+            "phash_max_distance": PHASH_MAX_DISTANCE,
+            "preprocess": OCR_PREPROCESS_ENABLED,
+        })
+        started = time.monotonic()
+        for pos, digest in enumerate(pending):
+            # 预算只计算真正的 OCR 调用，近似重复链接几乎没有开销
+            if (max_images and ok_cnt + fail_cnt >= max_images) or \
+                    (max_seconds and time.monotonic() - started >= max_seconds):
+                deferred = len(pending) - pos
+                break
 
-                image_id = fname  # 以图片文件名作为唯一ID
-                total += 1
+            info = unique[digest]
+            label = f"{info['refs'][0][0]}/{digest[:12]}"
+            abs_path = info["path"]
+            if not os.path.isfile(abs_path):
+                print(f"[warn] 图片文件缺失: {abs_path}")
+                progress.tick("missing")
+                continue
 
-                # 跳过已有结果
-                if image_id in results:
-                    skipped += 1
-                    continue
+            near = near_index.find(digest, abs_path) if near_index else None
+            if near:
+                # 近似重复：只记录指向已有结果的链接，不再调用 OCR
+                distance, source = near
+                results[digest] = {"success": True, "duplicate_of": source, "phash_distance": distance}
+                linked += 1
+                print(f"[DUP] {label} ≈ {source[:12]} (距离 {distance})")
+                progress.tick("duplicate")
+                continue
 
-                abs_path = str(fpath.resolve())
-                try:
-                    ocr_res = await process_one_image(client, abs_path)
-                    # 将完整返回结构保存，便于后续调试/复用
-                    results[image_id] = ocr_res
+            try:
+                ocr_res = await ocr_blob(client, digest, abs_path)
+                if isinstance(ocr_res, dict) and ocr_res.get("success"):
+                    # 完整返回结构存入旁路存储，便于后续调试/复用（ocr_utils.load_ocr_data 读取）
+                    externalize_ocr_payload(ocr_res)
+                    results[digest] = ocr_res
                     ok_cnt += 1
-                    print(f"[OK] {note_id}/{fname}")
-                except Exception as e:
-                    results[image_id] = {
-                        "success": False,
-                        "error": str(e),
-                        "image_path": abs_path,
-                    }
+                    print(f"[OK] {label}")
+                    progress.tick("ok")
+                    if near_index and _is_source_result(ocr_res):
+                        near_index.add(digest, abs_path)
+                else:
+                    error = str((ocr_res.get("error") if isinstance(ocr_res, dict) else None) or "OCR 未返回成功结果")
+                    results[digest] = _failure_entry(results.get(digest), error, abs_path)
                     fail_cnt += 1
-                    print(f"[FAIL] {note_id}/{fname} -> {e}")
-                finally:
-                    # 每处理一张图片就落盘，保证中断可续跑
-                    _save_results(results)
-                    # 略作延迟，避免触发风控
-                    await asyncio.sleep(0.05)
-
-        print(f"[done] 总数 {total}, 成功 {ok_cnt}, 失败 {fail_cnt}, 跳过 {skipped}")
+                    print(f"[FAIL] {label} -> {error}（第 {results[digest]['attempts']} 次）")
+                    progress.tick("failed")
+            except Exception as e:
+                results[digest] = _failure_entry(results.get(digest), str(e), abs_path)
+                fail_cnt += 1
+                print(f"[FAIL] {label} -> {e}（第 {results[digest]['attempts']} 次）")
+                progress.tick("failed")
+            finally:
+                # 每处理一张图片就落盘，保证中断可续跑
+                _save_results(results)
+                # 略作延迟，避免触发风控
+                await asyncio.sleep(0.05)
+
+        if linked:
+            _save_results(results)
+        if near_index:
+            near_index.save()
+        # 有推迟或待重试的图片时不推进检查点，下次重新读取这段日志（已处理的会被跳过）
+        retry = sum(1 for d in pending if d in results and _needs_ocr(results[d]))
+        if deferred:
+            print(f"[info] 本次预算已用完，{deferred} 张推迟到下次运行")
+        if retry:
+            print(f"[info] {retry} 张识别失败，下次运行重试（最多 {OCR_MAX_ATTEMPTS} 次）")
+        if not deferred and not retry:
+            _save_checkpoint(log_end)
+        progress.finish("budget_exhausted" if deferred else "completed",
+                        already_done=skipped, migrated=migrated, deferred=deferred,
+                        page_session=OCR_SESSION.report())
+
+        print(f"[done] 总数 {total}, 成功 {ok_cnt}, 失败 {fail_cnt}, 跳过 {skipped}, 迁移 {migrated}, 推迟 {deferred}")
+        print(f"[done] 近似重复复用 {linked}，节省 OCR 调用 {linked} 次（阈值 {PHASH_MAX_DISTANCE}）")
     finally:
-        try:
-            await client.stop()
-        except Exception:
-            pass
+        if own_client:
+            try:
+                await client.stop()
+            except Exception:
+                pass
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    metrics.start_run("06_ocr_images")
+    profiling.start("06_ocr_images")
+    parser = argparse.ArgumentParser(description="对 05 下载的图片执行 OCR")
+    parser.add_argument("--full", action="store_true", help="忽略检查点，重新扫描全部图片清单")
+    parser.add_argument("--compare", type=int, default=0, metavar="N",
+                        help="对前 N 张图分别识别原图与预处理图并输出对比结果")
+    parser.add_argument("--max-images", type=int, default=OCR_MAX_IMAGES_PER_RUN,
+                        help="本次最多识别多少张（0 表示不限）")
+    parser.add_argument("--max-seconds", type=float, default=OCR_MAX_SECONDS_PER_RUN,
+                        help="本次最多运行多少秒（0 表示不限）")
+    parser.add_argument("--reuse-pages", action="store_true",
+                        help=f"连续的 OCR 调用复用浏览器页面（每 {PAGE_SESSION_MAX_CALLS} 次或出错后回收）")
+    args = parser.parse_args()
+    if args.reuse_pages:
+        CLOSE_PAGE_WHEN_TASK_FINISHED = False
+    asyncio.run(main(compare=args.compare, full=args.full, max_images=args.max_images, max_seconds=args.max_seconds))
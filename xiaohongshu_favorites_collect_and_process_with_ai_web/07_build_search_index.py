@@ -0,0 +1,119 @@
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+from utils.ai_utils import ai_keywords, ai_summary, load_ai_results_by_note
+from utils.file_utils import iter_json_items_with_project_root, write_json_with_project_root, PROJECT_ROOT
+from utils import metrics, profiling
+from utils.ocr_utils import load_ocr_text_by_note
+from utils.text_utils import cjk_chars, tokenize
+
+# ----------------------
+# Config
+# ----------------------
+INPUT_DETAILS_PATH = "data/favorite_notes_details.json"
+OUTPUT_INDEX_PATH = "data/search_index.json"
+
+# v2：增加 chars（CJK 单字 -> 文档下标），倒排表中只有二元组，单字查询靠它命中
+INDEX_VERSION = 2
+TOKENIZER = "cjk-bigram+latin-word/v1"
+
+# BM25 参数（查询端读取索引文件中的值）
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# 字段权重：同一词在标题/关键词中出现比在正文或图片文字中出现更重要
+FIELD_WEIGHTS: Dict[str, float] = {
+    "title": 3.0,
+    "keywords": 3.0,
+    "tags": 2.0,
+    "summary": 2.0,
+    "desc": 1.0,
+    "ocr": 0.5,
+}
+
+
+# ----------------------
+# Helpers
+# ----------------------
+
+def build_note_fields(note: Dict[str, Any], ai: Optional[Dict[str, Any]], ocr_texts: List[str]) -> Dict[str, str]:
+    """把一条笔记拆成待索引的各字段文本"""
+    return {
+        "title": str(note.get("title") or ""),
+        "keywords": " ".join(ai_keywords(ai)),
+        "tags": " ".join(str(t) for t in (note.get("tags") or []) if t),
+        "summary": ai_summary(ai),
+        "desc": str(note.get("desc") or ""),
+        "ocr": "\n".join(ocr_texts),
+    }
+
+
+def weighted_term_freqs(fields: Dict[str, str]) -> Dict[str, float]:
+    tf: Dict[str, float] = {}
+    for field, text in fields.items():
+        weight = FIELD_WEIGHTS.get(field, 1.0)
+        for token, cnt in Counter(tokenize(text)).items():
+            tf[token] = tf.get(token, 0.0) + weight * cnt
+    return tf
+
+
+# ----------------------
+# Main
+# ----------------------
+
+def build_index() -> Dict[str, Any]:
+    ai_index = load_ai_results_by_note()
+    ocr_by_note = load_ocr_text_by_note()
+
+    docs: List[Dict[str, Any]] = []
+    postings: Dict[str, List[List[Any]]] = {}
+    chars: Dict[str, List[int]] = {}
+    seen = set()
+    total_len = 0.0
+
+    for note in iter_json_items_with_project_root(INPUT_DETAILS_PATH):
+        note_id = str(note.get("id") or "").strip() if isinstance(note, dict) else ""
+        # 详情文件可能存在重复追加，只索引第一条
+        if not note_id or note_id in seen:
+            continue
+        seen.add(note_id)
+
+        fields = build_note_fields(note, ai_index.get(note_id), ocr_by_note.get(note_id, []))
+        tf = weighted_term_freqs(fields)
+        doc_len = round(sum(tf.values()), 3)
+        doc_idx = len(docs)
+        docs.append({"id": note_id, "len": doc_len})
+        total_len += doc_len
+        for token, freq in tf.items():
+            postings.setdefault(token, []).append([doc_idx, round(freq, 3)])
+        for ch in cjk_chars("\n".join(fields.values())):
+            chars.setdefault(ch, []).append(doc_idx)
+
+    return {
+        "version": INDEX_VERSION,
+        "tokenizer": TOKENIZER,
+        "generated_at": datetime.now(timezone.utc).isoformat().replace("+00:00", "Z"),
+        "k1": BM25_K1,
+        "b": BM25_B,
+        "doc_count": len(docs),
+        "avg_doc_len": (total_len / len(docs)) if docs else 0.0,
+        "docs": docs,
+        "postings": postings,
+        "chars": chars,
+    }
+
+
+def main():
+    index = build_index()
+    # 索引文件只供程序读取，不缩进以减小体积
+    write_json_with_project_root(OUTPUT_INDEX_PATH, index, indent=None)
+    print(f"✅ 检索索引构建完成，输出文件：{(PROJECT_ROOT / OUTPUT_INDEX_PATH).as_posix()}，"
+          f"docs={index['doc_count']}，terms={len(index['postings'])}")
+
+
+if __name__ == "__main__":
+    metrics.start_run("07_build_search_index")
+    profiling.start("07_build_search_index")
+    print("🚀 开始构建全文检索索引 …")
+    main()
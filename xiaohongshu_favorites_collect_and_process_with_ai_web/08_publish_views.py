@@ -0,0 +1,194 @@
+import hashlib
+import json
+import os
+import re
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+from utils.ai_utils import ai_keywords, ai_summary, ai_topics, load_ai_results_by_note, AI_RESULT_PATH
+from utils.file_utils import (
+    atomic_write_json,
+    iter_json_items_with_project_root,
+    read_json_with_project_root,
+    write_json_with_project_root,
+    PROJECT_ROOT,
+)
+from utils import metrics, profiling
+from utils.ocr_utils import load_ocr_entries_by_note, OCR_RESULTS_PATH
+
+# ----------------------
+# Config
+# ----------------------
+INPUT_DETAILS_PATH = "data/favorite_notes_details.json"
+INPUT_NORMALIZED_PATH = "data/favorite_notes_normalized.json"
+
+VIEWS_DIR_RELA = "data/views"
+NOTES_DIR = PROJECT_ROOT / VIEWS_DIR_RELA / "notes"
+OUTPUT_INDEX_PATH = f"{VIEWS_DIR_RELA}/index.json"
+OUTPUT_FACETS_PATH = f"{VIEWS_DIR_RELA}/facets.json"
+
+VIEWS_VERSION = 1
+
+# 发布所依据的源文件：其 mtime/size 记录在 index.json 的 sources 中，
+# 前端发现任一源文件在发布之后发生变化时判定视图过期、回退到内存快照
+SOURCE_PATHS = (INPUT_DETAILS_PATH, AI_RESULT_PATH, INPUT_NORMALIZED_PATH, OCR_RESULTS_PATH)
+
+# 只发布安全的 note_id 作为文件名，前端按同样规则校验
+SAFE_NOTE_ID_RE = re.compile(r"^[A-Za-z0-9_-]{1,128}$")
+
+
+# ----------------------
+# Helpers
+# ----------------------
+
+def _load_author_links() -> Dict[str, str]:
+    links: Dict[str, str] = {}
+    try:
+        for it in iter_json_items_with_project_root(INPUT_NORMALIZED_PATH):
+            norm = it.get("normalized") if isinstance(it, dict) else None
+            if not isinstance(norm, dict):
+                continue
+            nid = norm.get("note_id")
+            link = (norm.get("author") or {}).get("author_link")
+            if nid and isinstance(link, str):
+                links[nid] = link
+    except FileNotFoundError:
+        pass
+    return links
+
+
+def build_note_view(note: Dict[str, Any], ai: Optional[Dict[str, Any]], author_link: Optional[str],
+                    ocr_entries: List[Any]) -> Dict[str, Any]:
+    """拼接单条笔记的完整展示数据（与 /api/notes 中的 enrich 规则一致）"""
+    out = dict(note)
+    summary = ai_summary(ai)
+    keywords = ai_keywords(ai)
+    if summary or keywords:
+        out["ai_summary"] = {"summary": summary, "keywords": keywords}
+    topics = ai_topics(ai)
+    if topics:
+        out["ai_topics"] = topics
+    if author_link:
+        out["author_info"] = {**(out.get("author_info") or {}), "author_link": author_link}
+    if ocr_entries:
+        out["ocr"] = [{"image_id": image_id, "text": text} for image_id, text in ocr_entries]
+    return out
+
+
+def count_facets(topics_list: List[Dict[str, Any]]) -> Dict[str, List[Dict[str, Any]]]:
+    counts = {"primary": Counter(), "subtopics": Counter(), "intents": Counter(), "types": Counter()}
+    for t in topics_list:
+        if t.get("primary_topic"):
+            counts["primary"][t["primary_topic"]] += 1
+        for s in t.get("subtopics") or []:
+            counts["subtopics"][s] += 1
+        if t.get("content_intent"):
+            counts["intents"][t["content_intent"]] += 1
+        if t.get("content_type"):
+            counts["types"][t["content_type"]] += 1
+
+    def to_list(c: Counter) -> List[Dict[str, Any]]:
+        return [{"name": name, "count": cnt} for name, cnt in sorted(c.items(), key=lambda kv: (-kv[1], kv[0]))]
+
+    return {k: to_list(v) for k, v in counts.items()}
+
+
+def source_signatures() -> Dict[str, Optional[Dict[str, Any]]]:
+    """源文件签名：data/ 下的相对路径 -> {"mtime_ms", "size"}，不存在时为 None"""
+    out: Dict[str, Optional[Dict[str, Any]]] = {}
+    for rel in SOURCE_PATHS:
+        try:
+            st = os.stat(PROJECT_ROOT / rel)
+        except FileNotFoundError:
+            out[rel.split("/", 1)[1]] = None
+            continue
+        out[rel.split("/", 1)[1]] = {"mtime_ms": st.st_mtime_ns / 1e6, "size": st.st_size}
+    return out
+
+
+def _load_previous_index() -> Dict[str, Any]:
+    try:
+        prev = read_json_with_project_root(OUTPUT_INDEX_PATH)
+        return (prev.get("notes") or {}) if isinstance(prev, dict) else {}
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+# ----------------------
+# Main
+# ----------------------
+
+def publish() -> Dict[str, int]:
+    # 先于读取记录签名：发布过程中源文件若被改写，前端会把这次发布视为过期
+    sources = source_signatures()
+    ai_index = load_ai_results_by_note()
+    author_links = _load_author_links()
+    ocr_by_note = load_ocr_entries_by_note()
+    prev_index = _load_previous_index()
+
+    os.makedirs(NOTES_DIR, exist_ok=True)
+
+    notes_index: Dict[str, Dict[str, Any]] = {}
+    topics_list: List[Dict[str, Any]] = []
+    written = 0
+    unchanged = 0
+
+    for note in iter_json_items_with_project_root(INPUT_DETAILS_PATH):
+        note_id = str(note.get("id") or "").strip() if isinstance(note, dict) else ""
+        # 详情文件可能存在重复追加，只发布第一条
+        if not note_id or note_id in notes_index:
+            continue
+        if not SAFE_NOTE_ID_RE.match(note_id):
+            print(f"⚠️ 跳过非法 note_id: {note_id!r}")
+            continue
+
+        view = build_note_view(note, ai_index.get(note_id), author_links.get(note_id), ocr_by_note.get(note_id, []))
+        if view.get("ai_topics"):
+            topics_list.append(view["ai_topics"])
+
+        digest = hashlib.sha1(json.dumps(view, ensure_ascii=False, sort_keys=True).encode("utf-8")).hexdigest()
+        notes_index[note_id] = {"hash": digest}
+
+        shard_path = NOTES_DIR / f"{note_id}.json"
+        # 内容未变化则不重写，避免无谓的磁盘写入与前端缓存失效
+        if (prev_index.get(note_id) or {}).get("hash") == digest and os.path.exists(shard_path):
+            unchanged += 1
+            continue
+        atomic_write_json(str(shard_path), view, indent=None)
+        written += 1
+
+    # 清理已不在详情数据中的笔记
+    removed = 0
+    for fname in os.listdir(NOTES_DIR):
+        nid, ext = os.path.splitext(fname)
+        if ext == ".json" and nid not in notes_index:
+            os.remove(NOTES_DIR / fname)
+            removed += 1
+
+    generated_at = datetime.now(timezone.utc).isoformat().replace("+00:00", "Z")
+    facets = count_facets(topics_list)
+    facets["generated_at"] = generated_at
+    write_json_with_project_root(OUTPUT_FACETS_PATH, facets, indent=None)
+    write_json_with_project_root(OUTPUT_INDEX_PATH, {
+        "version": VIEWS_VERSION,
+        "generated_at": generated_at,
+        "count": len(notes_index),
+        "sources": sources,
+        "notes": notes_index,
+    }, indent=None)
+
+    return {"count": len(notes_index), "written": written, "unchanged": unchanged, "removed": removed}
+
+
+def main():
+    stats = publish()
+    print(f"✅ 发布完成，输出目录：{(PROJECT_ROOT / VIEWS_DIR_RELA).as_posix()}，"
+          f"count={stats['count']}，写入 {stats['written']}，未变化 {stats['unchanged']}，删除 {stats['removed']}")
+
+
+if __name__ == "__main__":
+    metrics.start_run("08_publish_views")
+    profiling.start("08_publish_views")
+    print("🚀 开始发布笔记视图与主题聚合 …")
+    main()
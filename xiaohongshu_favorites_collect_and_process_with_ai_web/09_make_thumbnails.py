@@ -0,0 +1,140 @@
+import hashlib
+import os
+import sys
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from utils.file_utils import write_json_with_project_root, PROJECT_ROOT
+from utils.image_utils import image_blob_path, image_blob_rel_path, iter_note_image_manifests, manifest_image_entries
+from utils import metrics, profiling
+
+try:
+    from PIL import Image, ImageOps  # type: ignore
+except ImportError:  # pragma: no cover - 可选依赖
+    Image = None
+    ImageOps = None
+
+# ----------------------
+# Config
+# ----------------------
+THUMBS_DIR = PROJECT_ROOT / "data" / "thumbs"
+OUTPUT_MANIFEST_PATH = "data/thumbs/manifest.json"
+
+# 各规格：(最大宽, 最大高, WebP 质量)；列表卡片用 thumb，详情页用 medium
+RENDITIONS: Dict[str, Tuple[int, int, int]] = {
+    "thumb": (480, 1200, 72),
+    "medium": (1280, 4096, 82),
+}
+
+MANIFEST_VERSION = 1
+
+
+# ----------------------
+# Helpers
+# ----------------------
+
+def rendition_rel_path(digest: str, rendition: str) -> str:
+    # 与 blob 一样按内容哈希存放，多条笔记引用同一张图时只生成一次
+    return f"{digest[:2]}/{digest}.{rendition}.webp"
+
+
+def make_rendition(src_path: str, dst_path: str, max_w: int, max_h: int, quality: int) -> Tuple[int, int]:
+    """生成单个 WebP 规格图，返回输出尺寸"""
+    with Image.open(src_path) as im:
+        im = ImageOps.exif_transpose(im)
+        if im.mode not in ("RGB", "RGBA"):
+            im = im.convert("RGBA" if "A" in im.getbands() else "RGB")
+        # 只缩小不放大
+        im.thumbnail((max_w, max_h), Image.LANCZOS)
+        tmp_path = dst_path + ".tmp"
+        im.save(tmp_path, format="WEBP", quality=quality, method=4)
+        os.replace(tmp_path, dst_path)
+        return im.size
+
+
+def _is_fresh(dst_path: str, src_path: str) -> bool:
+    return os.path.exists(dst_path) and os.path.getmtime(dst_path) >= os.path.getmtime(src_path)
+
+
+def _short_hash(path: str) -> str:
+    # 调整规格参数后文件名不变，前端用内容哈希作为 ?v= 参数，配合长期缓存
+    with open(path, "rb") as f:
+        return hashlib.sha1(f.read()).hexdigest()[:12]
+
+
+def make_renditions(digest: str, ext: str) -> Tuple[Optional[Dict[str, Any]], int]:
+    """为一张 blob 生成各规格，返回 ({规格: {path, hash}}, 新生成数)；原图缺失返回 None"""
+    src_path = image_blob_path(digest, ext)
+    if not os.path.isfile(src_path):
+        return None, 0
+    out: Dict[str, Any] = {}
+    made = 0
+    for rendition, (max_w, max_h, quality) in RENDITIONS.items():
+        rel = rendition_rel_path(digest, rendition)
+        dst_path = os.path.join(str(THUMBS_DIR), *rel.split("/"))
+        if not _is_fresh(dst_path, src_path):
+            os.makedirs(os.path.dirname(dst_path), exist_ok=True)
+            make_rendition(src_path, dst_path, max_w, max_h, quality)
+            made += 1
+        out[rendition] = {"path": rel, "hash": _short_hash(dst_path)}
+    return out, made
+
+
+# ----------------------
+# Main
+# ----------------------
+
+def run() -> Optional[Dict[str, int]]:
+    if Image is None:
+        print("[error] 需要安装 Pillow 才能生成缩略图：pip install pillow")
+        return None
+
+    manifest: Dict[str, List[Dict[str, Any]]] = {}
+    # 本次运行已处理的 blob：sha256 -> 各规格（失败为 None）
+    done: Dict[str, Optional[Dict[str, Any]]] = {}
+    made_total = 0
+    fail_total = 0
+
+    for image_manifest in iter_note_image_manifests():
+        entries: List[Dict[str, Any]] = []
+        for it in manifest_image_entries(image_manifest):
+            digest, ext = it["sha256"], it.get("ext", "")
+            if digest not in done:
+                try:
+                    renditions, made = make_renditions(digest, ext)
+                    made_total += made
+                except Exception as e:
+                    renditions = None
+                    fail_total += 1
+                    print(f"[FAIL] {image_blob_rel_path(digest, ext)} -> {e}")
+                done[digest] = renditions
+            if done[digest] is None:
+                continue
+            entries.append({
+                "index": it.get("index", 0),
+                "url": it.get("url", ""),
+                "sha256": digest,
+                "original": image_blob_rel_path(digest, ext),
+                **done[digest],
+            })
+        if entries:
+            manifest[str(image_manifest["note_id"])] = entries
+
+    write_json_with_project_root(OUTPUT_MANIFEST_PATH, {
+        "version": MANIFEST_VERSION,
+        "generated_at": datetime.now(timezone.utc).isoformat().replace("+00:00", "Z"),
+        "renditions": {k: {"max_width": w, "max_height": h} for k, (w, h, _) in RENDITIONS.items()},
+        "notes": manifest,
+    }, indent=None)
+
+    images_cnt = sum(len(v) for v in manifest.values())
+    print(f"[done] 笔记 {len(manifest)}，图片 {images_cnt}，新生成 {made_total}，失败 {fail_total}")
+    return {"notes": len(manifest), "images": images_cnt, "made": made_total, "failed": fail_total}
+
+
+if __name__ == '__main__':
+    metrics.start_run("09_make_thumbnails")
+    profiling.start("09_make_thumbnails")
+    print(f"[info] 缩略图输出目录: {THUMBS_DIR}")
+    result = run()
+    sys.exit(0 if result is not None else 1)
@@ -0,0 +1,143 @@
+import importlib
+import sys
+import time
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.error import HTTPError, URLError
+from urllib.parse import quote
+from urllib.request import Request, urlopen
+
+from utils import metrics, profiling
+from utils.author_profiles import (
+    iter_note_authors,
+    load_author_profiles,
+    make_profile_record,
+    merge_failed_record,
+    parse_profile_html,
+    pending_authors,
+    save_author_profiles,
+    AUTHOR_PROFILES_PATH,
+)
+from utils.progress import ProgressTracker
+
+# cookies 读取与请求头沿用 05 的实现
+download_stage = importlib.import_module("05_download_images")
+
+# ----------------------
+# Config
+# ----------------------
+# 在 03 之前运行：03 只读缓存计算 engagement_rate，不发请求
+INPUT_DETAILS_PATH = "data/favorite_notes_details.json"
+PROFILE_URL = "https://www.xiaohongshu.com/user/profile/{user_id}"
+
+# 同一作者的多条笔记只请求一次；每批请求之间间隔一段时间，批与批之间再长停一次，整批结果一次落盘
+PROFILE_BATCH_SIZE = 10
+PROFILE_REQUEST_INTERVAL_SEC = 3.0
+PROFILE_BATCH_PAUSE_SEC = 30.0
+# 单次运行最多请求多少位作者，0 表示不限；剩余的下次运行继续
+PROFILE_MAX_PER_RUN = 200
+
+HTML_ACCEPT = "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8"
+
+
+# ----------------------
+# Helpers
+# ----------------------
+
+def fetch_profile_html(user_id: str, xsec_token: Optional[str], headers: Dict[str, str],
+                       timeout: int = 20) -> Tuple[Optional[str], Optional[str]]:
+    """请求作者主页，返回 (HTML, 错误信息)"""
+    url = PROFILE_URL.format(user_id=quote(user_id, safe=""))
+    if xsec_token:
+        url += f"?xsec_token={quote(str(xsec_token), safe='')}&xsec_source=pc_note"
+    try:
+        req = Request(url=url, headers={**headers, "Accept": HTML_ACCEPT}, method="GET")
+        with urlopen(req, timeout=timeout) as resp:
+            if resp.status != 200:
+                return None, f"HTTP {resp.status}"
+            return resp.read().decode("utf-8", errors="replace"), None
+    except HTTPError as e:
+        return None, f"HTTPError {e.code}: {e.reason}"
+    except URLError as e:
+        return None, f"URLError: {e.reason}"
+    except Exception as e:
+        return None, f"Exception: {e}"
+
+
+def fetch_one(user_id: str, xsec_token: Optional[str], headers: Dict[str, str]) -> Dict[str, Any]:
+    started = time.perf_counter()
+    html, err = fetch_profile_html(user_id, xsec_token, headers)
+    parsed = parse_profile_html(html) if html is not None else None
+    if html is not None and parsed is None:
+        # 多半是登录 / 验证页面
+        err = "未能从主页解析出粉丝数"
+    status = "ok" if parsed is not None else "failed"
+    metrics.observe("profile_fetch_seconds", time.perf_counter() - started, status=status)
+    metrics.inc("profile_fetch_total", status=status)
+    return make_profile_record(parsed, err)
+
+
+# ----------------------
+# Main
+# ----------------------
+
+def run(cookies_path: Optional[str] = None, max_authors: int = PROFILE_MAX_PER_RUN) -> Dict[str, int]:
+    headers = download_stage.make_headers(
+        download_stage.build_cookie_header(download_stage.load_cookies_from_env_or_file(cookies_path)))
+
+    profiles = load_author_profiles()
+    authors = list(iter_note_authors(INPUT_DETAILS_PATH))
+    pending = list(pending_authors(authors, profiles))
+    deferred = 0
+    if max_authors and len(pending) > max_authors:
+        deferred = len(pending) - max_authors
+        pending = pending[:max_authors]
+    print(f"[info] 作者 {len(authors)} 位，缓存有效 {len(authors) - len(pending) - deferred} 位，"
+          f"本次获取 {len(pending)} 位{f'，推迟 {deferred} 位' if deferred else ''}")
+
+    progress = ProgressTracker("10_fetch_author_profiles", len(pending), unit="位", config={
+        "input": INPUT_DETAILS_PATH,
+        "batch_size": PROFILE_BATCH_SIZE,
+        "request_interval_sec": PROFILE_REQUEST_INTERVAL_SEC,
+        "batch_pause_sec": PROFILE_BATCH_PAUSE_SEC,
+        "max_authors": max_authors,
+    })
+    ok_cnt = fail_cnt = 0
+    stopped = False
+    for start in range(0, len(pending), PROFILE_BATCH_SIZE):
+        if start:
+            time.sleep(PROFILE_BATCH_PAUSE_SEC)
+        batch = pending[start:start + PROFILE_BATCH_SIZE]
+        updates: Dict[str, Dict[str, Any]] = {}
+        for i, (user_id, xsec_token) in enumerate(batch):
+            if i:
+                time.sleep(PROFILE_REQUEST_INTERVAL_SEC)
+            record = fetch_one(user_id, xsec_token, headers)
+            if record.get("error"):
+                fail_cnt += 1
+                print(f"[FAIL] {user_id} -> {record['error']}")
+                record = merge_failed_record(profiles.get(user_id), record)
+                progress.tick("failed")
+            else:
+                ok_cnt += 1
+                print(f"[OK] {user_id} {record.get('nickname') or ''} 粉丝 {record['fans']}")
+                progress.tick("ok")
+            updates[user_id] = record
+        save_author_profiles(updates)
+        if len(batch) > 1 and all(r.get("error") for r in updates.values()):
+            # 整批失败通常是 cookie 失效或触发了风控，继续请求只会更糟
+            print("[warn] 整批获取失败，停止本次运行，请检查 cookies 后重试")
+            stopped = True
+            break
+
+    progress.finish("stopped" if stopped else ("budget_exhausted" if deferred else "completed"),
+                    authors=len(authors), deferred=deferred)
+    print(f"[done] 成功 {ok_cnt} / 失败 {fail_cnt}，缓存文件: {AUTHOR_PROFILES_PATH}")
+    return {"authors": len(authors), "ok": ok_cnt, "failed": fail_cnt, "deferred": deferred}
+
+
+if __name__ == '__main__':
+    metrics.start_run("10_fetch_author_profiles")
+    profiling.start("10_fetch_author_profiles")
+    # 可选参数：python 10_fetch_author_profiles.py [cookies_json_path]
+    arg_path = sys.argv[1] if len(sys.argv) > 1 else None
+    run(cookies_path=arg_path)
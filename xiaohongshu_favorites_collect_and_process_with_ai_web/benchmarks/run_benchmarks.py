@@ -0,0 +1,320 @@
+"""流水线基准测试：在不同规模的合成数据上测量各热点函数，结果写成 JSON 便于跨提交对比
+
+用法（在项目根目录）：
+    python -m benchmarks.run_benchmarks                          # 1k / 10k
+    python -m benchmarks.run_benchmarks --sizes 1000 10000 100000
+    python -m benchmarks.run_benchmarks --compare benchmarks/results/<旧提交>.json
+    python -m benchmarks.run_benchmarks --nuxt-server frontend/.output/server/index.mjs
+
+覆盖：
+- normalize_all（03）
+- _merge_note_result_into_state / _save_processed_state（04 每处理完一条笔记执行一次）
+- _append_failure_log（04 每个失败任务执行一次）
+- OCR 结果落盘（06 每识别一张图片执行一次）
+- /api/notes（需先 nuxt build，服务以合成数据目录为工作目录启动）
+"""
+import argparse
+import copy
+import importlib.util
+import json
+import os
+import platform
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.parse
+import urllib.request
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+from benchmarks.synthetic_data import (
+    AI_FILE,
+    DETAILS_FILE,
+    NORMALIZED_FILE,
+    OCR_FILE,
+    generate_dataset,
+)
+from utils import fake_rpc
+from utils.file_utils import orjson, read_json_with_project_root, PROJECT_ROOT
+
+# ----------------------
+# Config
+# ----------------------
+RESULTS_DIR = PROJECT_ROOT / "benchmarks" / "results"
+RESULTS_VERSION = 1
+
+# 10 万条约需数 GB 内存与数分钟生成时间，需显式指定
+DEFAULT_SIZES = [1000, 10000]
+DEFAULT_WORKDIR = os.path.join(tempfile.gettempdir(), "xhs-bench")
+# 每项重复轮数与每轮操作次数（逐条落盘类的基准按单次操作统计）
+DEFAULT_REPEAT = 3
+DEFAULT_OPS = 5
+
+# /api/notes：等待服务启动的超时、翻页深度
+SERVER_START_TIMEOUT_SEC = 60
+API_PAGE_DEPTH = 10
+
+
+def _load_stage(filename: str) -> Any:
+    spec = importlib.util.spec_from_file_location(f"bench_{os.path.splitext(filename)[0]}", PROJECT_ROOT / filename)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)  # type: ignore[union-attr]
+    return module
+
+
+def _stats(samples_ms: List[float]) -> Dict[str, Any]:
+    return {
+        "median_ms": round(statistics.median(samples_ms), 3),
+        "min_ms": round(min(samples_ms), 3),
+        "max_ms": round(max(samples_ms), 3),
+        "samples": len(samples_ms),
+    }
+
+
+def _time_ms(fn: Callable[[], Any]) -> float:
+    t0 = time.perf_counter()
+    fn()
+    return (time.perf_counter() - t0) * 1000
+
+
+# ----------------------
+# Python 阶段
+# ----------------------
+
+def bench_normalize_all(stage03: Any, paths: Dict[str, str], repeat: int) -> Dict[str, Any]:
+    stage03.INPUT_DETAILS_PATH = paths[DETAILS_FILE]
+    return {"normalize_all": _stats([_time_ms(stage03.normalize_all) for _ in range(repeat)])}
+
+
+def bench_ai_state(stage04: Any, paths: Dict[str, str], workdir: str, repeat: int, ops: int) -> Dict[str, Any]:
+    """模拟 04 的逐条落盘：合并一条笔记结果后整体写回"""
+    state = read_json_with_project_root(paths[AI_FILE])
+    stage04.OUTPUT_AI_RESULT_PATH = os.path.join(workdir, "bench_" + AI_FILE)
+    notes = state["data"]
+    merge: List[float] = []
+    save: List[float] = []
+    for r in range(repeat):
+        for i in range(ops):
+            # 一半替换已有笔记，一半追加新笔记（合并的两条路径）
+            note = copy.deepcopy(notes[(r * ops + i) * 7919 % len(notes)])
+            if i % 2:
+                note["note_id"] = f"bench-{r}-{i}"
+            merge.append(_time_ms(lambda: stage04._merge_note_result_into_state(state, note)))
+            save.append(_time_ms(lambda: stage04._save_processed_state(state)))
+    return {"merge_note_result_into_state": _stats(merge), "save_processed_state": _stats(save)}
+
+
+def bench_failure_log(stage04: Any, workdir: str, notes: int, repeat: int, ops: int) -> Dict[str, Any]:
+    """失败日志按约 5% 的任务失败率预先填充，再逐条追加"""
+    stage04.FAIL_LOG_PATH = os.path.join(workdir, "bench_failures.json")
+    seed = [{
+        "note_id": f"seed-{i}",
+        "task": "topics",
+        "error": {"type": "ValueError", "message": "topics: invalid JSON"},
+        "raw_response_excerpt": "```json\n{\"primary_topic\":",
+        "prompt_excerpt": "从内容中判定 primary_topic、subtopics、content_intent、content_type。" * 4,
+    } for i in range(max(notes // 20, 1))]
+    samples: List[float] = []
+    for _ in range(repeat):
+        stage04.write_json_with_project_root(stage04.FAIL_LOG_PATH, seed)
+        for i in range(ops):
+            record = dict(seed[0], note_id=f"bench-{i}")
+            samples.append(_time_ms(lambda: stage04._append_failure_log(record)))
+    return {"append_failure_log": _stats(samples)}
+
+
+def bench_ocr_save(stage06: Any, paths: Dict[str, str], workdir: str, repeat: int, ops: int) -> Dict[str, Any]:
+    """模拟 06 识别循环：每得到一张图片的结果就整体写回 ocr_results.json"""
+    results = read_json_with_project_root(paths[OCR_FILE])
+    stage06.OUTPUT_RELA_PATH = os.path.join(workdir, "bench_" + OCR_FILE)
+    stage06.OUTPUT_PATH = stage06.OUTPUT_RELA_PATH
+    template = next(iter(results.values()), {"success": True, "data": {"text": ""}})
+    samples: List[float] = []
+    for r in range(repeat):
+        for i in range(ops):
+            results[f"{r:032x}{i:032x}"] = copy.deepcopy(template)
+            samples.append(_time_ms(lambda: stage06._save_results(results)))
+    return {"ocr_save_results": _stats(samples), "ocr_entries": len(results)}
+
+
+# ----------------------
+# /api/notes
+# ----------------------
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _wait_port(port: int, proc: subprocess.Popen, timeout: float) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            return False
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.5):
+                return True
+        except OSError:
+            time.sleep(0.1)
+    return False
+
+
+def _get_json(base: str, params: Dict[str, Any]) -> Any:
+    url = f"{base}/api/notes?{urllib.parse.urlencode(params)}"
+    with urllib.request.urlopen(url, timeout=120) as resp:
+        return json.loads(resp.read())
+
+
+def bench_api_notes(server_entry: str, dataset_dir: str, repeat: int, ops: int) -> Dict[str, Any]:
+    """以合成数据目录为工作目录启动构建好的 Nitro 服务（resolveDataPath 从 cwd/data 读取）"""
+    port = _free_port()
+    env = dict(os.environ, PORT=str(port), HOST="127.0.0.1", NITRO_PORT=str(port), NITRO_HOST="127.0.0.1")
+    proc = subprocess.Popen(["node", os.path.abspath(server_entry)], cwd=dataset_dir, env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        if not _wait_port(port, proc, SERVER_START_TIMEOUT_SEC):
+            return {"skipped": "服务未能启动"}
+        base = f"http://127.0.0.1:{port}"
+        out: Dict[str, Any] = {}
+        # 首个请求包含读取与拼接全部数据的冷启动开销
+        out["api_notes_cold"] = _stats([_time_ms(lambda: _get_json(base, {}))])
+        out["api_notes_warm_first_page"] = _stats([_time_ms(lambda: _get_json(base, {})) for _ in range(repeat * ops)])
+
+        page_samples: List[float] = []
+        cursor: Optional[str] = None
+        for _ in range(API_PAGE_DEPTH):
+            params = {"cursor": cursor} if cursor else {}
+            t0 = time.perf_counter()
+            page = _get_json(base, params)
+            page_samples.append((time.perf_counter() - t0) * 1000)
+            cursor = page.get("next_cursor")
+            if not cursor:
+                break
+        out["api_notes_paginate"] = _stats(page_samples)
+
+        # 每次换一个查询词，避免命中查询缓存
+        words = ["开源", "教程", "咖啡", "预算", "复盘", "徒步", "工具", "灵感"]
+        out["api_notes_search"] = _stats([_time_ms(lambda w=w: _get_json(base, {"q": w})) for w in words[:max(repeat, 1) * 2]])
+        out["api_notes_topic_sorted"] = _stats([
+            _time_ms(lambda s=s: _get_json(base, {"topic": "AI工具", "sort": s}))
+            for s in ("likes_desc", "collects_desc", "date_asc")
+        ])
+        return out
+    finally:
+        proc.terminate()
+        try:
+            proc.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+
+
+# ----------------------
+# 结果
+# ----------------------
+
+def _git_info() -> Dict[str, Any]:
+    def git(*args: str) -> str:
+        return subprocess.run(["git", *args], cwd=PROJECT_ROOT, capture_output=True, text=True, check=True).stdout.strip()
+
+    try:
+        return {"commit": git("rev-parse", "HEAD"), "dirty": bool(git("status", "--porcelain", "--untracked-files=no"))}
+    except (OSError, subprocess.CalledProcessError):
+        return {"commit": None, "dirty": None}
+
+
+def _iter_medians(results: Dict[str, Any]):
+    for size, entry in (results.get("sizes") or {}).items():
+        for name, metric in (entry.get("benchmarks") or {}).items():
+            if isinstance(metric, dict) and "median_ms" in metric:
+                yield (size, name), metric["median_ms"]
+
+
+def print_comparison(base: Dict[str, Any], current: Dict[str, Any]) -> None:
+    """按 规模/基准 对比中位数，比值 >1 表示变慢"""
+    base_medians = dict(_iter_medians(base))
+    print(f"\n[info] 对比基线 {str((base.get('git') or {}).get('commit'))[:12]}")
+    for (size, name), ms in _iter_medians(current):
+        old = base_medians.get((size, name))
+        if old is None:
+            continue
+        ratio = ms / old if old else float("inf")
+        flag = "⚠️" if ratio > 1.2 else "  "
+        print(f"{flag} n={size:>7} {name:<32} {old:>10.2f}ms -> {ms:>10.2f}ms  x{ratio:.2f}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="流水线基准测试")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="笔记规模，如 1000 10000 100000")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT)
+    parser.add_argument("--ops", type=int, default=DEFAULT_OPS, help="逐条落盘类基准每轮的操作次数")
+    parser.add_argument("--workdir", default=DEFAULT_WORKDIR, help="合成数据与临时输出目录")
+    parser.add_argument("--regenerate", action="store_true", help="重新生成合成数据")
+    parser.add_argument("--nuxt-server", help="nuxt build 产出的 .output/server/index.mjs，指定后测试 /api/notes")
+    parser.add_argument("--output", help=f"结果文件，默认 {RESULTS_DIR.relative_to(PROJECT_ROOT)}/<提交>.json")
+    parser.add_argument("--compare", help="与之前的结果文件对比")
+    args = parser.parse_args()
+
+    # 04/06 导入时需要 client_sdk，基准测试不访问真实服务
+    fake_rpc.install()
+    stage03 = _load_stage("03_normalize_notes.py")
+    stage04 = _load_stage("04_process_with_AI.py")
+    stage06 = _load_stage("06_ocr_images.py")
+
+    git = _git_info()
+    results: Dict[str, Any] = {
+        "version": RESULTS_VERSION,
+        "generated_at": datetime.now(timezone.utc).isoformat().replace("+00:00", "Z"),
+        "git": git,
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "orjson": orjson is not None,
+        "repeat": args.repeat,
+        "ops": args.ops,
+        "sizes": {},
+    }
+
+    for size in args.sizes:
+        dataset_dir = os.path.join(args.workdir, f"n{size}-s{args.seed}")
+        names = (DETAILS_FILE, NORMALIZED_FILE, AI_FILE, OCR_FILE)
+        paths = {name: os.path.join(dataset_dir, "data", name) for name in names}
+        if args.regenerate or not all(os.path.exists(p) for p in paths.values()):
+            print(f"[info] 生成 {size} 条合成笔记 -> {dataset_dir}")
+            generate_dataset(dataset_dir, size, args.seed)
+
+        print(f"[info] n={size} 运行基准 …")
+        bench: Dict[str, Any] = {}
+        bench.update(bench_normalize_all(stage03, paths, args.repeat))
+        bench.update(bench_ai_state(stage04, paths, dataset_dir, args.repeat, args.ops))
+        bench.update(bench_failure_log(stage04, dataset_dir, size, args.repeat, args.ops))
+        bench.update(bench_ocr_save(stage06, paths, dataset_dir, args.repeat, args.ops))
+        if args.nuxt_server:
+            bench.update(bench_api_notes(args.nuxt_server, dataset_dir, args.repeat, args.ops))
+        else:
+            bench["api_notes"] = {"skipped": "未指定 --nuxt-server"}
+
+        results["sizes"][str(size)] = {
+            "dataset_bytes": {name: os.path.getsize(p) for name, p in paths.items()},
+            "benchmarks": bench,
+        }
+        for name, metric in bench.items():
+            if isinstance(metric, dict) and "median_ms" in metric:
+                print(f"[OK] n={size} {name}: {metric['median_ms']:.2f}ms")
+
+    output = args.output or os.path.join(str(RESULTS_DIR), f"{(git['commit'] or 'unknown')[:12]}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+    print(f"[done] 结果已写入 {output}")
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            print_comparison(json.load(f), results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,254 @@
+"""合成收藏数据：按真实字段结构生成任意规模的 详情 / 规范化 / AI 结果 / OCR 结果
+
+用法（在项目根目录）：
+    python -m benchmarks.synthetic_data --notes 10000 --out /tmp/xhs-bench/n10000
+
+输出目录下的 data/ 与项目 data/ 布局一致，可直接作为：
+- 基准测试的输入（benchmarks/run_benchmarks.py）
+- 替身 RPC 的夹具（python -m utils.fake_rpc --fixtures <out>/data ...）
+- 前端的数据目录（在 <out> 下启动 Nitro 服务）
+"""
+import argparse
+import hashlib
+import importlib.util
+import os
+import random
+import string
+import time
+from typing import Any, Dict, List, Tuple
+
+from utils.file_utils import atomic_write_json, PROJECT_ROOT
+
+# ----------------------
+# 词表与分布
+# ----------------------
+_TOPICS = ["AI工具", "穿搭", "旅行", "健身", "理财", "摄影", "美食", "教育", "职场", "心理", "家居", "亲子", "宠物", "影视", "游戏", "科技"]
+_INTENTS = ["教程", "经验分享", "测评", "种草", "记录", "新闻", "活动", "招聘", "广告"]
+_TYPES = ["图文", "长文", "短视频", "教程清单", "测评对比", "随笔"]
+_WORDS = [
+    "开源", "模型", "效率", "工具", "分享", "教程", "推荐", "攻略", "日常", "测评", "干货", "收藏", "实战", "入门",
+    "周末", "城市", "咖啡", "徒步", "预算", "清单", "复盘", "经验", "踩坑", "对比", "新手", "进阶", "灵感", "记录",
+]
+_IPS = ["上海", "北京", "广东", "浙江", "四川", "江苏", "新加坡", "美国", "湖北", None]
+
+# 正文长度分布：约 15% 没有正文，约 20% 少于 50 字（规范化后为内容稀疏）
+_DESC_BUCKETS = [(0.15, 0, 0), (0.20, 5, 49), (0.45, 50, 400), (0.20, 400, 1500)]
+
+DETAILS_FILE = "favorite_notes_details.json"
+BRIEF_FILE = "favorite_notes_brief.json"
+NORMALIZED_FILE = "favorite_notes_normalized.json"
+AI_FILE = "favorite_notes_ai_processed.json"
+OCR_FILE = "ocr_results.json"
+
+
+def _hex(rng: random.Random, n: int) -> str:
+    return "".join(rng.choice("0123456789abcdef") for _ in range(n))
+
+
+def _token(rng: random.Random) -> str:
+    return "AB" + "".join(rng.choice(string.ascii_letters + string.digits) for _ in range(40)) + "="
+
+
+def _phrase(rng: random.Random, n: int) -> str:
+    return "".join(rng.choice(_WORDS) for _ in range(n))
+
+
+def _count(rng: random.Random) -> str:
+    # 互动数长尾分布，与真实数据一样以字符串返回
+    return str(int(rng.paretovariate(1.2) * 10) - 10)
+
+
+def _image_url(rng: random.Random) -> str:
+    return (f"http://sns-webpic-qc.xhscdn.com/2025{rng.randint(1, 12):02d}{rng.randint(1, 28):02d}0000/"
+            f"{_hex(rng, 32)}/notes_pre_post/1040g{_hex(rng, 30)}!nd_dft_wgth_webp_3")
+
+
+def _desc(rng: random.Random) -> str:
+    roll = rng.random()
+    for share, lo, hi in _DESC_BUCKETS:
+        if roll < share:
+            break
+        roll -= share
+    length = rng.randint(lo, hi)
+    out: List[str] = []
+    size = 0
+    while size < length:
+        part = _phrase(rng, rng.randint(2, 6)) + rng.choice(["。", "！", "\n", "，", " 🌟 "])
+        out.append(part)
+        size += len(part)
+    return "".join(out)[:length]
+
+
+def make_detail(rng: random.Random, now_ms: int) -> Dict[str, Any]:
+    """一条与 02 输出结构一致的笔记详情"""
+    note_id = f"{rng.randint(0x60000000, 0x69ffffff):08x}" + _hex(rng, 16)
+    user_id = _hex(rng, 24)
+    tags = [_phrase(rng, rng.randint(1, 2)) for _ in range(rng.randint(0, 8))]
+    desc = _desc(rng)
+    if tags:
+        desc += "\n" + " ".join(f"#{t}[话题]#" for t in tags)
+    is_video = rng.random() < 0.1
+    return {
+        "raw_data": None,
+        "id": note_id,
+        "xsec_token": _token(rng),
+        "title": _phrase(rng, rng.randint(2, 8)),
+        "desc": desc,
+        "author_info": {
+            "user_id": user_id,
+            "username": _phrase(rng, 2),
+            "avatar": f"https://sns-avatar-qc.xhscdn.com/avatar/1040g2jo{_hex(rng, 30)}",
+            "xsec_token": _token(rng),
+            "gender": None,
+            "is_following": None,
+            "is_followed": None,
+            "user_type": None,
+        },
+        "tags": tags,
+        # 近三年内发布
+        "date": now_ms - rng.randint(0, 3 * 365 * 86400 * 1000),
+        "ip_zh": rng.choice(_IPS),
+        "comment_num": _count(rng),
+        "statistic": {"like_num": _count(rng), "collect_num": _count(rng), "chat_num": _count(rng)},
+        "images": [_image_url(rng) for _ in range(1 if is_video else rng.randint(1, 9))],
+        "video": {"duration": rng.randint(5, 600), "url": f"http://sns-video-qc.xhscdn.com/{_hex(rng, 32)}"} if is_video else None,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(now_ms / 1000)),
+    }
+
+
+def make_brief(detail: Dict[str, Any]) -> Dict[str, Any]:
+    """由详情反推 01 输出的简要信息"""
+    return {
+        "raw_data": {"note_id": detail["id"], "display_title": detail["title"], "type": "video" if detail["video"] else "normal"},
+        "id": detail["id"],
+        "xsec_token": detail["xsec_token"],
+        "title": detail["title"],
+        "author_info": detail["author_info"],
+        "statistic": {"like_num": detail["statistic"]["like_num"]},
+        "cover_image": detail["images"][0] if detail["images"] else None,
+    }
+
+
+def make_ai_result(rng: random.Random, note_id: str, title: str) -> Dict[str, Any]:
+    """一条与 04 输出结构一致的 AI 结果（原始回复以 raw_ref 引用）"""
+    def ok(result: Dict[str, Any]) -> Dict[str, Any]:
+        return {"ok": True, "result": {"version": "1.0", **result}, "raw_ref": _hex(rng, 64)}
+
+    def conf() -> float:
+        return round(rng.uniform(0.6, 0.95), 2)
+
+    intent = rng.choice(_INTENTS)
+    tasks = {
+        "summary": ok({"summary_200": f"{title}：" + _phrase(rng, rng.randint(10, 40)), "confidence": conf()}),
+        "keywords": ok({"keywords": [_phrase(rng, 1) for _ in range(rng.randint(3, 5))], "confidence": conf()}),
+        "topics": ok({
+            "primary_topic": rng.choice(_TOPICS),
+            "subtopics": [_phrase(rng, 1) for _ in range(rng.randint(1, 3))],
+            "content_intent": intent,
+            "content_type": rng.choice(_TYPES),
+            "confidence": conf(),
+        }),
+        "entities_concepts": ok({
+            "entities": {"people": [], "orgs": [_phrase(rng, 1)], "products": [_phrase(rng, 1)], "locations": []},
+            "concepts": [_phrase(rng, 1) for _ in range(rng.randint(0, 4))],
+            "confidence": conf(),
+        }),
+        "takeaways": ok({"takeaways": [_phrase(rng, 5) for _ in range(rng.randint(1, 3))], "confidence": conf()}),
+        "steps": ok({"steps": [{"step": i + 1, "action": _phrase(rng, 4), "tip": ""} for i in range(rng.randint(2, 6))],
+                     "confidence": conf()})
+        if intent == "教程" else
+        {"ok": True, "result": {"version": "1.0", "steps": [], "confidence": None, "not_applicable": True, "reason": "not tutorial"}},
+    }
+    # 约 5% 的笔记有任务失败
+    if rng.random() < 0.05:
+        tasks["topics"] = {"ok": False, "error": {"type": "ValueError", "message": "topics: invalid JSON"}, "prompt_excerpt": title}
+    note: Dict[str, Any] = {"note_id": note_id, "tasks": tasks}
+    note["status"] = "ok" if all(t.get("ok") for t in tasks.values()) else "partial"
+    for name in ("summary", "keywords", "topics", "takeaways"):
+        if tasks[name].get("ok"):
+            note[name] = tasks[name]["result"]
+    if tasks["steps"]["result"].get("steps"):
+        note["steps"] = tasks["steps"]["result"]
+    return note
+
+
+def make_ocr_results(rng: random.Random, details: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """与 06 输出结构一致的 OCR 结果，以图片内容哈希为键"""
+    results: Dict[str, Any] = {}
+    for d in details:
+        for url in d["images"]:
+            digest = hashlib.sha256(url.encode("utf-8")).hexdigest()
+            lines = [_phrase(rng, rng.randint(2, 8)) for _ in range(rng.randint(0, 12))]
+            results[digest] = {
+                "success": True,
+                "data": {"text": "\n".join(lines)},
+                "image_path": os.path.join("data", "blobs", digest[:2], f"{digest}.webp"),
+                "preprocess": {"version": 1, "tiles": [{"scale": 1.0, "offset_x": 0, "offset_y": 0, "width": 1080, "height": 1440}]},
+                "payload_ref": _hex(rng, 64),
+            }
+    return results
+
+
+def _load_normalizer():
+    # 规范化结果由 03 的 normalize_one 生成，与真实流水线保持一致
+    spec = importlib.util.spec_from_file_location("stage03_normalize", PROJECT_ROOT / "03_normalize_notes.py")
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)  # type: ignore[union-attr]
+    return module
+
+
+def generate_dataset(out_dir: str, notes: int, seed: int = 0) -> Dict[str, str]:
+    """在 out_dir/data 下生成全部数据文件，返回 文件名 -> 绝对路径"""
+    rng = random.Random(seed)
+    # 固定发布时间的基准，相同 seed 生成的笔记相同（规范化中的 age_days 仍按当天计算）
+    now_ms = 1_760_000_000_000
+    details = [make_detail(rng, now_ms) for _ in range(notes)]
+    stage03 = _load_normalizer()
+
+    data_dir = os.path.join(out_dir, "data")
+    paths = {name: os.path.join(data_dir, name) for name in (DETAILS_FILE, BRIEF_FILE, NORMALIZED_FILE, AI_FILE, OCR_FILE)}
+    briefs = [make_brief(d) for d in details]
+    files: List[Tuple[str, Any]] = [
+        (DETAILS_FILE, {"data": details, "count": len(details)}),
+        (BRIEF_FILE, {
+            "success": True, "data": briefs, "count": len(briefs),
+            "added": {"data": [], "count": 0}, "updated": {"data": [], "count": 0},
+        }),
+        (NORMALIZED_FILE, {
+            "platform": "xhs",
+            "count": len(details),
+            "data": [stage03.normalize_one(d, platform="xhs") for d in details],
+            "generated_at": "2025-10-09T00:00:00Z",
+            "source_file": "data/" + DETAILS_FILE,
+        }),
+        (AI_FILE, {
+            "platform": "xhs",
+            "source": "data/" + NORMALIZED_FILE,
+            "tasks": ["summary", "keywords", "topics", "entities_concepts", "takeaways", "steps"],
+            "count": len(details),
+            "data": [make_ai_result(rng, d["id"], d["title"]) for d in details],
+        }),
+        (OCR_FILE, make_ocr_results(rng, details)),
+    ]
+    for name, payload in files:
+        # 与各阶段实际写入的缩进保持一致
+        atomic_write_json(paths[name], payload, indent=2 if name == OCR_FILE else 4)
+    return paths
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="生成合成收藏数据")
+    parser.add_argument("--notes", type=int, default=1000, help="笔记数量")
+    parser.add_argument("--out", required=True, help="输出目录（数据写入 <out>/data）")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    t0 = time.perf_counter()
+    paths = generate_dataset(args.out, args.notes, args.seed)
+    for name, path in paths.items():
+        print(f"[OK] {name}: {os.path.getsize(path) / 1024 / 1024:.1f} MB")
+    print(f"[done] 生成 {args.notes} 条笔记，耗时 {time.perf_counter() - t0:.1f}s -> {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,668 @@
+import argparse
+import json
+import os
+import re
+import shutil
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from utils.ai_utils import AI_RESULT_PATH
+from utils.author_profiles import AUTHOR_PROFILES_PATH
+from utils.file_utils import (
+    PROJECT_ROOT,
+    atomic_write_json,
+    file_lock,
+    json_loads,
+    read_json_with_project_root,
+)
+from utils.image_utils import (
+    DOWNLOAD_LOG_PATH,
+    IMAGE_BLOBS_DIR,
+    IMAGE_MANIFESTS_DIR,
+    iter_note_image_manifests,
+    manifest_image_entries,
+    note_image_manifest_path,
+)
+from utils.ocr_preprocess import OCR_INPUTS_DIR, PREPROCESS_VERSION
+from utils.ocr_utils import IMAGES_DIR, OCR_RESULTS_PATH, ocr_entry_note_id
+from utils.payload_store import PAYLOAD_STORE_DIR
+from utils.phash_utils import PHASH_CACHE_PATH
+from utils.progress import format_duration, runs_dir
+from utils import metrics, profiling
+
+# ----------------------
+# 存储压缩与垃圾回收
+# ----------------------
+# data/ 下的文件只增不减：简要数据带着 raw_data 和上一次请求回显的 storage_data，
+# 取消收藏的笔记以软删除标记（deleted / deleted_at）长期保留，图片、OCR、旁路存储也不会随笔记删除。
+# 本脚本做一次整体压缩：
+#   - 简要 / 详情 / 规范化 / AI 结果按 id / note_id 去重（保留最后一条），去掉不用的原始字段
+#   - 软删除超过保留期的笔记视为已删除，其余文件中属于已删除或已不存在笔记的条目一并清理
+#   - 标记-清除：图片 blob、OCR 预处理缓存、缩略图、pHash 缓存、旁路存储、作者信息缓存只保留仍被引用的部分
+#   - 下载日志每张图片只留最后一条记录（重写后删除 06 的读取位置，下次从头扫描，已识别的图片不会重复识别）
+# 建议在没有其他阶段运行时执行；blob / payload 写入与引用落盘之间有时间差，最近修改的文件不会被清除。
+
+# ----------------------
+# Config
+# ----------------------
+INPUT_BRIEF_PATH = "data/favorite_notes_brief.json"
+INPUT_DETAILS_PATH = "data/favorite_notes_details.json"
+INPUT_NORMALIZED_PATH = "data/favorite_notes_normalized.json"
+FAIL_LOG_PATH = "data/favorite_notes_ai_failures.json"
+OCR_CHECKPOINT_PATH = "data/ocr_checkpoint.json"
+THUMBS_DIR = PROJECT_ROOT / "data" / "thumbs"
+THUMBS_MANIFEST_PATH = "data/thumbs/manifest.json"
+PROFILES_DIR = PROJECT_ROOT / "data" / "profiles"
+
+# 软删除的笔记保留多少天后彻底清理（期间重新收藏可恢复，已有的 AI / OCR 结果不丢）
+TOMBSTONE_RETENTION_DAYS = 30
+# 运行清单（data/runs）与性能分析结果（data/profiles）保留天数
+OUTPUT_RETENTION_DAYS = 30
+# 最近这么多秒内修改过的 blob / payload 不清除：可能属于正在运行的阶段，引用还没写入结果文件
+GC_GRACE_SEC = 3600
+
+# 简要 / 详情条目中没有任何阶段读取的原始字段
+UNUSED_RAW_FIELDS = ("raw_data",)
+# 软删除字段名的默认值（以简要数据 task_params_extra 中的配置为准）
+DEFAULT_SOFT_DELETE_FLAG = "deleted"
+DEFAULT_SOFT_DELETE_TIME_KEY = "deleted_at"
+
+SHA256_RE = re.compile(r"^[0-9a-f]{64}$")
+
+
+# ----------------------
+# Helpers
+# ----------------------
+
+def _rel(path: Any) -> str:
+    return os.path.relpath(str(path), str(PROJECT_ROOT)).replace(os.sep, "/")
+
+
+def _tree_size(path: str) -> Tuple[int, int]:
+    """目录下的 (文件数, 字节数)"""
+    files = size = 0
+    for root, _, names in os.walk(path):
+        for name in names:
+            try:
+                size += os.path.getsize(os.path.join(root, name))
+                files += 1
+            except OSError:
+                pass
+    return files, size
+
+
+def _parse_time(value: Any) -> Optional[float]:
+    """软删除时间：秒 / 毫秒时间戳或 ISO8601 字符串，无法识别返回 None"""
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return value / 1000 if value > 1e12 else float(value)
+    if isinstance(value, str) and value.strip():
+        text = value.strip()
+        if re.fullmatch(r"\d+(\.\d+)?", text):
+            return _parse_time(float(text))
+        try:
+            dt = datetime.fromisoformat(text.replace("Z", "+00:00"))
+        except ValueError:
+            return None
+        if dt.tzinfo is None:
+            dt = dt.replace(tzinfo=timezone.utc)
+        return dt.timestamp()
+    return None
+
+
+def _dedupe_last(items: Iterable[Any], key: Callable[[Any], Optional[str]]) -> Tuple[List[Any], int]:
+    """按 key 去重，保留最后一条（与各阶段"后写覆盖"的语义一致），位置取第一次出现处；无 key 的条目原样保留"""
+    out: List[Any] = []
+    positions: Dict[str, int] = {}
+    dropped = 0
+    for it in items:
+        k = key(it)
+        if not k:
+            out.append(it)
+            continue
+        if k in positions:
+            out[positions[k]] = it
+            dropped += 1
+            continue
+        positions[k] = len(out)
+        out.append(it)
+    return out, dropped
+
+
+def _item_id(it: Any) -> Optional[str]:
+    nid = it.get("id") if isinstance(it, dict) else None
+    return str(nid) if nid else None
+
+
+def _ai_note_id(it: Any) -> Optional[str]:
+    nid = it.get("note_id") if isinstance(it, dict) else None
+    return nid if isinstance(nid, str) and nid else None
+
+
+def _normalized_note_id(it: Any) -> Optional[str]:
+    norm = it.get("normalized") if isinstance(it, dict) else None
+    nid = norm.get("note_id") if isinstance(norm, dict) else None
+    return str(nid) if nid else None
+
+
+def _strip_raw_fields(items: Iterable[Any]) -> int:
+    stripped = 0
+    for it in items:
+        if not isinstance(it, dict):
+            continue
+        for field in UNUSED_RAW_FIELDS:
+            if field in it:
+                del it[field]
+                stripped += 1
+    return stripped
+
+
+# ----------------------
+# Compactor
+# ----------------------
+
+class Compactor:
+    """逐个目标执行压缩并记录回收的字节数；dry_run 时只统计不落盘"""
+
+    def __init__(self, dry_run: bool = False, tombstone_days: float = TOMBSTONE_RETENTION_DAYS,
+                 output_days: float = OUTPUT_RETENTION_DAYS, grace_sec: float = GC_GRACE_SEC) -> None:
+        self.dry_run = dry_run
+        self.tombstone_days = tombstone_days
+        self.output_days = output_days
+        self.grace_sec = grace_sec
+        self.now = time.time()
+        self.report: Dict[str, Dict[str, int]] = {}
+        # 仍然存在的笔记；None 表示没有可靠的笔记列表，跳过所有按笔记清理的步骤
+        self.live_ids: Optional[Set[str]] = None
+        self.expired_ids: Set[str] = set()
+        # 仍被图片清单引用的 blob 哈希；None 表示还没有图片清单（旧版目录结构），跳过按哈希清理
+        self.live_digests: Optional[Set[str]] = None
+        self.payload_refs: Set[str] = set()
+        # 没能读到的引用来源（AI 结果、OCR 结果）；非空时不清理旁路存储，否则其中的引用会全部被当作无人引用
+        self.unread_ref_sources: List[str] = []
+        # 详情中仍出现的作者；None 表示详情文件不可用
+        self.live_authors: Optional[Set[str]] = None
+
+    # ---- 记账与落盘 ----
+
+    def _entry(self, target: str) -> Dict[str, int]:
+        return self.report.setdefault(target, {"before": 0, "after": 0, "items": 0, "files": 0})
+
+    def _account(self, target: str, before: int, after: int, items: int = 0, files: int = 0) -> None:
+        entry = self._entry(target)
+        entry["before"] += before
+        entry["after"] += after
+        entry["items"] += items
+        entry["files"] += files
+
+    def _remove_file(self, target: str, path: str) -> None:
+        try:
+            size = os.path.getsize(path)
+        except OSError:
+            return
+        if not self.dry_run:
+            try:
+                os.remove(path)
+            except OSError as e:
+                print(f"[warn] 删除失败 {_rel(path)}: {e}")
+                return
+        self._account(target, size, 0, files=1)
+
+    def _remove_tree(self, target: str, path: str) -> None:
+        files, size = _tree_size(path)
+        if not self.dry_run:
+            shutil.rmtree(path, ignore_errors=True)
+        self._account(target, size, 0, files=files)
+
+    def _is_recent(self, path: str) -> bool:
+        try:
+            return self.now - os.path.getmtime(path) < self.grace_sec
+        except OSError:
+            return True
+
+    def _rewrite_json(self, target: str, rel_path: str, fn: Callable[[Any], int], indent: Optional[int]) -> Any:
+        """在文件锁内读取-修改-写回 JSON；fn 原地修改数据并返回清理的条目数，返回 0 时不重写文件
+
+        Returns:
+            修改后的数据；文件不存在或无法解析时返回 None
+        """
+        abs_path = os.path.join(str(PROJECT_ROOT), rel_path)
+        if not os.path.exists(abs_path):
+            return None
+        before = os.path.getsize(abs_path)
+        box: Dict[str, Any] = {}
+
+        def _apply(data: Any) -> Any:
+            box["items"] = fn(data)
+            box["data"] = data
+            return data
+
+        if self.dry_run:
+            try:
+                data = read_json_with_project_root(rel_path)
+            except ValueError as e:
+                print(f"[warn] 无法解析 {rel_path}，跳过: {e}")
+                return None
+            _apply(data)
+            after = len(json.dumps(data, ensure_ascii=False, indent=indent).encode("utf-8")) if box["items"] else before
+        else:
+            with file_lock(abs_path):
+                try:
+                    with open(abs_path, "rb") as f:
+                        data = json_loads(f.read())
+                except ValueError as e:
+                    print(f"[warn] 无法解析 {rel_path}，跳过: {e}")
+                    return None
+                _apply(data)
+                if box["items"]:
+                    atomic_write_json(abs_path, data, indent=indent)
+            after = os.path.getsize(abs_path)
+        self._account(target, before, after, items=box["items"])
+        return box["data"]
+
+    # ---- 笔记列表 ----
+
+    def _is_live(self, note_id: Optional[str]) -> bool:
+        # 归属未知的条目一律保留
+        return self.live_ids is None or not note_id or note_id in self.live_ids
+
+    def collect_live_notes(self) -> None:
+        """存在的笔记 = 简要 ∪ 详情 中的笔记，去掉软删除超过保留期的"""
+        ids: Set[str] = set()
+        try:
+            brief = read_json_with_project_root(INPUT_BRIEF_PATH)
+        except (FileNotFoundError, ValueError):
+            brief = {}
+        brief = brief if isinstance(brief, dict) else {}
+        extra = brief.get("task_params_extra") or {}
+        flag_key = extra.get("soft_delete_flag") or DEFAULT_SOFT_DELETE_FLAG
+        time_key = extra.get("soft_delete_time_key") or DEFAULT_SOFT_DELETE_TIME_KEY
+        cutoff = self.now - self.tombstone_days * 86400
+        tombstones = unknown_time = 0
+        for it in brief.get("data") or []:
+            nid = _item_id(it)
+            if not nid:
+                continue
+            ids.add(nid)
+            if not it.get(flag_key):
+                continue
+            tombstones += 1
+            deleted_at = _parse_time(it.get(time_key))
+            if deleted_at is None:
+                # 没有删除时间无法判断是否过期，保留
+                unknown_time += 1
+            elif deleted_at < cutoff:
+                self.expired_ids.add(nid)
+        try:
+            with open(os.path.join(str(PROJECT_ROOT), INPUT_DETAILS_PATH), "rb") as f:
+                details = json_loads(f.read())
+        except (OSError, ValueError):
+            details = {}
+        details_items = details.get("data") if isinstance(details, dict) else details
+        for it in details_items if isinstance(details_items, list) else []:
+            nid = _item_id(it)
+            if nid:
+                ids.add(nid)
+
+        if not ids:
+            print("[warn] 简要与详情数据中都没有笔记，跳过按笔记清理的步骤，只做去重与字段精简")
+            return
+        self.live_ids = ids - self.expired_ids
+        print(f"[info] 笔记 {len(ids)} 条，软删除 {tombstones} 条（超过 {self.tombstone_days:g} 天 {len(self.expired_ids)} 条"
+              f"{f'，{unknown_time} 条缺少删除时间' if unknown_time else ''}）")
+
+    # ---- 结构化数据 ----
+
+    def compact_brief(self) -> None:
+        def _fn(data: Any) -> int:
+            if not isinstance(data, dict):
+                return 0
+            changed = 0
+            extra = data.get("task_params_extra")
+            # storage_data 是上一次请求原样回显的整个文件，每同步一次就嵌套一层
+            if isinstance(extra, dict) and extra.get("storage_data"):
+                extra.pop("storage_data")
+                changed += 1
+            for section in (data, data.get("added"), data.get("updated")):
+                if not isinstance(section, dict) or not isinstance(section.get("data"), list):
+                    continue
+                items, dropped = _dedupe_last(section["data"], _item_id)
+                kept = [it for it in items if _item_id(it) not in self.expired_ids]
+                changed += dropped + len(items) - len(kept) + _strip_raw_fields(kept)
+                section["data"] = kept
+                section["count"] = len(kept)
+            return changed
+
+        self._rewrite_json("brief", INPUT_BRIEF_PATH, _fn, indent=4)
+
+    def compact_details(self) -> None:
+        def _fn(data: Any) -> int:
+            if not isinstance(data, dict) or not isinstance(data.get("data"), list):
+                return 0
+            items, dropped = _dedupe_last(data["data"], _item_id)
+            kept = [it for it in items if self._is_live(_item_id(it))]
+            data["data"] = kept
+            data["count"] = len(kept)
+            self.live_authors = {
+                str((it.get("author_info") or {}).get("user_id") or "").strip() for it in kept if isinstance(it, dict)
+            }
+            return dropped + len(items) - len(kept) + _strip_raw_fields(kept)
+
+        self._rewrite_json("details", INPUT_DETAILS_PATH, _fn, indent=4)
+
+    def compact_author_profiles(self) -> None:
+        """作者的笔记都已删除后，其缓存记录不再需要"""
+        live = self.live_authors
+        if live is None:
+            return
+
+        def _fn(data: Any) -> int:
+            profiles = data.get("profiles") if isinstance(data, dict) else None
+            if not isinstance(profiles, dict):
+                return 0
+            dead = [uid for uid in profiles if uid not in live]
+            for uid in dead:
+                del profiles[uid]
+            return len(dead)
+
+        self._rewrite_json("author_profiles", AUTHOR_PROFILES_PATH, _fn, indent=None)
+
+    def compact_normalized(self) -> None:
+        def _fn(data: Any) -> int:
+            if not isinstance(data, dict) or not isinstance(data.get("data"), list):
+                return 0
+            items, dropped = _dedupe_last(data["data"], _normalized_note_id)
+            kept = [it for it in items if self._is_live(_normalized_note_id(it))]
+            data["data"] = kept
+            data["count"] = len([d for d in kept if isinstance(d, dict) and "normalized" in d])
+            return dropped + len(items) - len(kept)
+
+        self._rewrite_json("normalized", INPUT_NORMALIZED_PATH, _fn, indent=4)
+
+    def compact_ai_results(self) -> None:
+        box: Dict[str, Any] = {}
+
+        def _fn(data: Any) -> int:
+            if not isinstance(data, dict) or not isinstance(data.get("data"), list):
+                return 0
+            items, dropped = _dedupe_last(data["data"], _ai_note_id)
+            kept = [it for it in items if self._is_live(_ai_note_id(it))]
+            data["data"] = kept
+            data["count"] = len(kept)
+            box["ok_tasks"] = {
+                (it["note_id"], name)
+                for it in kept if _ai_note_id(it)
+                for name, task in (it.get("tasks") or {}).items() if isinstance(task, dict) and task.get("ok")
+            }
+            return dropped + len(items) - len(kept)
+
+        data = self._rewrite_json("ai_results", AI_RESULT_PATH, _fn, indent=4)
+        if not isinstance(data, dict) or not isinstance(data.get("data"), list):
+            self.unread_ref_sources.append(AI_RESULT_PATH)
+        for it in (data or {}).get("data") or []:
+            for task in (it.get("tasks") or {}).values() if isinstance(it, dict) else ():
+                if isinstance(task, dict) and task.get("raw_ref"):
+                    self.payload_refs.add(task["raw_ref"])
+
+        # 失败日志：笔记已删除，或该任务之后已成功的记录不再需要
+        ok_tasks = box.get("ok_tasks", set())
+
+        def _prune_failures(log: Any) -> int:
+            if not isinstance(log, list):
+                return 0
+            kept = [r for r in log if not isinstance(r, dict) or (
+                self._is_live(r.get("note_id")) and (r.get("note_id"), r.get("task")) not in ok_tasks)]
+            removed = len(log) - len(kept)
+            log[:] = kept
+            return removed
+
+        self._rewrite_json("ai_failures", FAIL_LOG_PATH, _prune_failures, indent=4)
+
+    # ---- 图片与 OCR ----
+
+    def compact_images(self) -> None:
+        """删除已不存在笔记的图片清单与旧版图片目录，并收集仍被引用的 blob 哈希"""
+        if os.path.isdir(IMAGE_MANIFESTS_DIR):
+            digests: Set[str] = set()
+            unreadable: List[str] = []
+            for manifest in iter_note_image_manifests(unreadable):
+                note_id = str(manifest["note_id"])
+                if not self._is_live(note_id):
+                    self._remove_file("image_manifests", note_image_manifest_path(note_id))
+                    continue
+                digests.update(it["sha256"] for it in manifest_image_entries(manifest))
+            if unreadable:
+                # 读不出的清单引用了哪些 blob 无从得知，不能按哈希清理
+                print(f"[warn] {len(unreadable)} 个图片清单无法读取，跳过 blob / 缩略图 / OCR 缓存的清理: {unreadable[:5]}")
+            else:
+                self.live_digests = digests
+
+        if self.live_ids is not None and os.path.isdir(IMAGES_DIR):
+            for note_id in sorted(os.listdir(IMAGES_DIR)):
+                note_dir = os.path.join(str(IMAGES_DIR), note_id)
+                if os.path.isdir(note_dir) and note_id not in self.live_ids:
+                    self._remove_tree("legacy_images", note_dir)
+
+    def _sweep_sharded(self, target: str, root: Any, keep: Callable[[str], bool]) -> None:
+        """按哈希分片存放的目录（<前两位>/<文件>）：keep(文件名) 为 False 且不是最近写入的文件删除"""
+        root = str(root)
+        if not os.path.isdir(root):
+            return
+        for shard in sorted(os.listdir(root)):
+            shard_dir = os.path.join(root, shard)
+            if not os.path.isdir(shard_dir):
+                continue
+            for name in os.listdir(shard_dir):
+                path = os.path.join(shard_dir, name)
+                if not keep(name) and not self._is_recent(path):
+                    self._remove_file(target, path)
+            if not self.dry_run and not os.listdir(shard_dir):
+                os.rmdir(shard_dir)
+
+    def sweep_image_derivatives(self) -> None:
+        """blob、OCR 预处理缓存、缩略图、pHash 缓存只保留仍被图片清单引用的哈希"""
+        live = self.live_digests
+        if live is None:
+            return
+        version_tag = f"v{PREPROCESS_VERSION}"
+
+        def _digest_of(name: str) -> str:
+            return name.split(".", 1)[0]
+
+        self._sweep_sharded("blobs", IMAGE_BLOBS_DIR,
+                            lambda name: not name.endswith(".tmp") and _digest_of(name) in live)
+        # 预处理参数升级后旧版本的切片不会再被读取
+        self._sweep_sharded("ocr_inputs", OCR_INPUTS_DIR,
+                            lambda name: _digest_of(name) in live and name.split(".")[1:2] == [version_tag])
+        self._sweep_sharded("thumbs", THUMBS_DIR,
+                            lambda name: not name.endswith(".tmp") and _digest_of(name) in live)
+
+        def _prune_thumbs_manifest(data: Any) -> int:
+            notes = data.get("notes") if isinstance(data, dict) else None
+            if not isinstance(notes, dict):
+                return 0
+            dead = [nid for nid in notes if not self._is_live(nid)]
+            for nid in dead:
+                del notes[nid]
+            return len(dead)
+
+        self._rewrite_json("thumbs", THUMBS_MANIFEST_PATH, _prune_thumbs_manifest, indent=None)
+
+        def _prune_phash(cache: Any) -> int:
+            if not isinstance(cache, dict):
+                return 0
+            dead = [k for k in cache if k not in live]
+            for k in dead:
+                del cache[k]
+            return len(dead)
+
+        self._rewrite_json("phash_cache", PHASH_CACHE_PATH, _prune_phash, indent=None)
+
+    def compact_ocr_results(self) -> None:
+        live = self.live_digests
+
+        def _keep(key: str, entry: Any) -> bool:
+            if SHA256_RE.match(key):
+                return live is None or key in live
+            # 旧版以文件名为键，按图片路径判断归属
+            return self._is_live(ocr_entry_note_id(entry))
+
+        def _fn(results: Any) -> int:
+            if not isinstance(results, dict):
+                return 0
+            kept = {k for k, v in results.items() if _keep(k, v)}
+            # 近似重复的结果只记录 duplicate_of，被指向的原始结果即使图片已删除也要保留
+            pending = list(kept)
+            while pending:
+                entry = results.get(pending.pop())
+                src = entry.get("duplicate_of") if isinstance(entry, dict) else None
+                if src and src in results and src not in kept:
+                    kept.add(src)
+                    pending.append(src)
+            dead = [k for k in results if k not in kept]
+            for k in dead:
+                del results[k]
+            return len(dead)
+
+        data = self._rewrite_json("ocr_results", OCR_RESULTS_PATH, _fn, indent=2)
+        if not isinstance(data, dict):
+            self.unread_ref_sources.append(OCR_RESULTS_PATH)
+        for entry in (data or {}).values():
+            if isinstance(entry, dict) and entry.get("payload_ref"):
+                self.payload_refs.add(entry["payload_ref"])
+
+    def compact_download_log(self) -> None:
+        """每张图片（note_id + 序号）只保留最后一条记录，去掉已不存在笔记的记录"""
+        abs_path = str(DOWNLOAD_LOG_PATH)
+        if not os.path.exists(abs_path):
+            return
+        with file_lock(abs_path):
+            before = os.path.getsize(abs_path)
+            records: Dict[Tuple[str, Any], bytes] = {}
+            total = 0
+            with open(abs_path, "rb") as f:
+                for line in f:
+                    if not line.endswith(b"\n"):
+                        # 末尾未写完的半行
+                        continue
+                    total += 1
+                    try:
+                        record = json_loads(line)
+                    except ValueError:
+                        continue
+                    if not isinstance(record, dict) or not self._is_live(record.get("note_id")):
+                        continue
+                    key = (str(record.get("note_id")), record.get("index", record.get("url")))
+                    # 先删后插，保持按最后一次出现的先后排列
+                    records.pop(key, None)
+                    records[key] = line
+            removed = total - len(records)
+            if not removed:
+                self._account("download_log", before, before)
+                return
+            payload = b"".join(records.values())
+            if not self.dry_run:
+                tmp = f"{abs_path}.{os.getpid()}.tmp"
+                with open(tmp, "wb") as f:
+                    f.write(payload)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp, abs_path)
+        self._account("download_log", before, len(payload), items=removed)
+        # 06 记录的是旧文件中的字节偏移，重写后失效
+        checkpoint = os.path.join(str(PROJECT_ROOT), OCR_CHECKPOINT_PATH)
+        if os.path.exists(checkpoint):
+            self._remove_file("download_log", checkpoint)
+
+    def sweep_payloads(self) -> None:
+        if self.unread_ref_sources:
+            print(f"[warn] {', '.join(self.unread_ref_sources)} 不存在或无法解析，跳过旁路存储的清理")
+            return
+        refs = self.payload_refs
+        self._sweep_sharded("payloads", PAYLOAD_STORE_DIR,
+                            lambda name: not name.endswith(".tmp") and name.split(".", 1)[0] in refs)
+
+    # ---- 运行产物 ----
+
+    def prune_old_outputs(self) -> None:
+        cutoff = self.now - self.output_days * 86400
+        for target, root in (("runs", runs_dir()), ("profiles", str(PROFILES_DIR))):
+            if not os.path.isdir(root):
+                continue
+            for name in sorted(os.listdir(root)):
+                path = os.path.join(root, name)
+                try:
+                    if os.path.getmtime(path) >= cutoff:
+                        continue
+                except OSError:
+                    continue
+                if os.path.isdir(path):
+                    self._remove_tree(target, path)
+                else:
+                    self._remove_file(target, path)
+
+    def run(self) -> Dict[str, Dict[str, int]]:
+        self.collect_live_notes()
+        self.compact_brief()
+        self.compact_details()
+        self.compact_author_profiles()
+        self.compact_normalized()
+        self.compact_ai_results()
+        self.compact_images()
+        self.sweep_image_derivatives()
+        self.compact_ocr_results()
+        self.compact_download_log()
+        self.sweep_payloads()
+        self.prune_old_outputs()
+        return self.report
+
+
+def _fmt_bytes(n: float) -> str:
+    for unit in ("B", "KB", "MB"):
+        if abs(n) < 1024:
+            return f"{n:.0f} {unit}" if unit == "B" else f"{n:.1f} {unit}"
+        n /= 1024
+    return f"{n:.2f} GB"
+
+
+def print_report(report: Dict[str, Dict[str, int]], dry_run: bool) -> int:
+    total = 0
+    print(f"{'目标':<16}{'清理条目':>10}{'删除文件':>10}{'回收':>12}{'压缩后':>12}")
+    for target, r in report.items():
+        reclaimed = r["before"] - r["after"]
+        total += reclaimed
+        metrics.inc("compact_reclaimed_bytes_total", reclaimed, target=target)
+        if not reclaimed and not r["items"] and not r["files"]:
+            continue
+        after = _fmt_bytes(r["after"]) if r["after"] else "-"
+        print(f"{target:<16}{r['items']:>10}{r['files']:>10}{_fmt_bytes(reclaimed):>12}{after:>12}")
+    print(f"[done] {'预计可' if dry_run else '共'}回收 {_fmt_bytes(total)}" + ("（dry-run，未修改任何文件）" if dry_run else ""))
+    return total
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="压缩 data/ 目录：去重、清理已删除笔记及其图片 / OCR / 旁路存储，报告回收的空间")
+    parser.add_argument("--dry-run", action="store_true", help="只统计可回收的空间，不修改文件")
+    parser.add_argument("--retention-days", type=float, default=TOMBSTONE_RETENTION_DAYS,
+                        help="软删除的笔记保留天数，超过后彻底清理")
+    parser.add_argument("--output-retention-days", type=float, default=OUTPUT_RETENTION_DAYS,
+                        help="data/runs 与 data/profiles 的保留天数")
+    parser.add_argument("--grace-sec", type=float, default=GC_GRACE_SEC,
+                        help="最近这么多秒内写入的 blob / payload 不清除")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    compactor = Compactor(dry_run=args.dry_run, tombstone_days=args.retention_days,
+                          output_days=args.output_retention_days, grace_sec=args.grace_sec)
+    report = compactor.run()
+    print_report(report, args.dry_run)
+    print(f"[info] 耗时 {format_duration(time.perf_counter() - started)}")
+
+
+if __name__ == "__main__":
+    metrics.start_run("compact_data")
+    profiling.start("compact_data")
+    print("🚀 开始压缩 data/ 目录 …")
+    main()
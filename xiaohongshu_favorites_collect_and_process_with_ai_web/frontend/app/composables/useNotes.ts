@@ -1,11 +1,48 @@
-import { computed } from 'vue'
-import type { NoteDetailsItem } from '~/types/notes'
+import { computed, ref, shallowRef, triggerRef, watch, type Ref } from 'vue'
+import type { NoteDetailsItem, NotesPage, NotesQuery } from '~/types/notes'
 
-export function useNotes() {
-  const { data: notes, pending, error, refresh } = useFetch<NoteDetailsItem[]>('/api/notes')
+export const NOTES_PAGE_SIZE = 24
+
+export function useNotes(filters: Ref<NotesQuery>) {
+  // 筛选条件变化时 useFetch 自动重新请求第一页
+  const query = computed(() => ({ ...filters.value, limit: NOTES_PAGE_SIZE }))
+  const { data, pending, error, refresh } = useFetch<NotesPage>('/api/notes', { query })
+
+  // 卡片数据只读，不需要深层响应式；追加后手动触发更新
+  const notes = shallowRef<NoteDetailsItem[]>([])
+  const total = ref(0)
+  const nextCursor = ref<string | null>(null)
+  const loadingMore = ref(false)
+
+  watch(data, (page) => {
+    notes.value = page?.items ? [...page.items] : []
+    total.value = page?.total ?? 0
+    nextCursor.value = page?.next_cursor ?? null
+  }, { immediate: true })
+
+  async function loadMore() {
+    if (!nextCursor.value || loadingMore.value) return
+    const requestQuery = { ...query.value, cursor: nextCursor.value }
+    loadingMore.value = true
+    try {
+      const page = await $fetch<NotesPage>('/api/notes', { query: requestQuery })
+      // 请求期间筛选条件已变化，丢弃过期的结果
+      if (JSON.stringify({ ...query.value, cursor: nextCursor.value }) !== JSON.stringify(requestQuery)) return
+      notes.value.push(...page.items)
+      triggerRef(notes)
+      total.value = page.total
+      nextCursor.value = page.next_cursor
+    } finally {
+      loadingMore.value = false
+    }
+  }
 
   return {
     notes: notes,
+    total,
+    hasMore: computed(() => nextCursor.value !== null),
+    loadingMore,
+    loadMore,
     status: computed(() => {
       if (pending.value) return 'pending'
       if (error.value) return 'error'
@@ -13,4 +50,4 @@ export function useNotes() {
     }),
     refresh
   }
-}
\ No newline at end of file
+}
@@ -0,0 +1,135 @@
+import { computed, onMounted, ref, shallowRef, watch, type Ref } from 'vue'
+import { useEventListener, useResizeObserver, useWindowSize } from '@vueuse/core'
+
+// 与 index.vue 中网格的 Tailwind 断点保持一致：
+// grid-cols-1 sm:grid-cols-2 lg:grid-cols-3 xl:grid-cols-4 2xl:grid-cols-5
+const COLUMN_BREAKPOINTS: Array<[minWidth: number, columns: number]> = [
+  [1536, 5],
+  [1280, 4],
+  [1024, 3],
+  [640, 2],
+]
+
+export interface VirtualGridOptions {
+  // 未测量行的估计高度（含行间距）
+  estimateRowHeight?: number
+  // 视口上下额外渲染的像素范围，快速滚动时不出现空白
+  overscan?: number
+}
+
+/**
+ * 按行窗口化渲染网格：只挂载视口附近的行，上下用 padding 占位。
+ * 列数按断点计算，行高在渲染后测量（未渲染过的行按估计值），
+ * 因此卡片高度不固定也能正确定位。挂载前（含 SSR）渲染全部条目，保证水合一致。
+ */
+export function useVirtualGrid<T>(items: Ref<T[]>, grid: Ref<HTMLElement | null>, options: VirtualGridOptions = {}) {
+  const estimateRowHeight = options.estimateRowHeight ?? 460
+  const overscan = options.overscan ?? 800
+
+  const mounted = ref(false)
+  const { width, height } = useWindowSize()
+
+  const columns = computed(() => {
+    for (const [minWidth, cols] of COLUMN_BREAKPOINTS) {
+      if (width.value >= minWidth) return cols
+    }
+    return 1
+  })
+  const rowCount = computed(() => Math.ceil(items.value.length / columns.value))
+
+  // 已测量的行高；下标为行号
+  const rowHeights = shallowRef<number[]>([])
+  // 视口顶部相对网格顶部的距离
+  const scrollTop = ref(0)
+
+  // offsets[i] 为第 i 行顶部位置，offsets[rowCount] 为总高度
+  const offsets = computed(() => {
+    const n = rowCount.value
+    const heights = rowHeights.value
+    const out = new Array<number>(n + 1)
+    out[0] = 0
+    for (let i = 0; i < n; i++) out[i + 1] = out[i] + (heights[i] ?? estimateRowHeight)
+    return out
+  })
+
+  // 二分查找 y 所在的行
+  function findRow(y: number): number {
+    const o = offsets.value
+    let lo = 0
+    let hi = rowCount.value - 1
+    while (lo < hi) {
+      const mid = (lo + hi + 1) >> 1
+      if (o[mid] <= y) lo = mid
+      else hi = mid - 1
+    }
+    return Math.max(lo, 0)
+  }
+
+  const range = computed(() => {
+    if (!mounted.value) return { start: 0, end: rowCount.value }
+    const start = findRow(Math.max(scrollTop.value - overscan, 0))
+    const end = Math.min(findRow(scrollTop.value + height.value + overscan) + 1, rowCount.value)
+    return { start, end: Math.max(start, end) }
+  })
+
+  const visibleItems = computed(() =>
+    items.value.slice(range.value.start * columns.value, range.value.end * columns.value))
+  const paddingTop = computed(() => offsets.value[range.value.start] ?? 0)
+  const paddingBottom = computed(() => (offsets.value[rowCount.value] ?? 0) - (offsets.value[range.value.end] ?? 0))
+
+  function measure() {
+    const el = grid.value
+    if (!el || !mounted.value) return
+    const cols = columns.value
+    const { start, end } = range.value
+    const gap = Number.parseFloat(getComputedStyle(el).rowGap) || 0
+    let next: number[] | null = null
+    for (let r = start; r < end; r++) {
+      // 卡片为 h-full，每行第一张卡片的高度即行高
+      const child = el.children[(r - start) * cols] as HTMLElement | undefined
+      if (!child) break
+      const h = child.offsetHeight + gap
+      if (rowHeights.value[r] !== h) {
+        next ??= rowHeights.value.slice()
+        next[r] = h
+      }
+    }
+    if (next) rowHeights.value = next
+  }
+
+  let frame = 0
+  function updateScroll() {
+    frame = 0
+    const el = grid.value
+    if (el) scrollTop.value = -el.getBoundingClientRect().top
+  }
+  function scheduleUpdate() {
+    // 每帧最多读取一次布局
+    if (!frame) frame = requestAnimationFrame(updateScroll)
+  }
+
+  // 不传 target 时默认监听 window，SSR 下自动跳过
+  useEventListener('scroll', scheduleUpdate, { passive: true })
+  watch([width, height], scheduleUpdate)
+  useResizeObserver(grid, measure)
+  watch(visibleItems, measure, { flush: 'post' })
+
+  // 列数变化或列表整体替换（筛选条件变化）后，旧的行高不再适用
+  watch(columns, () => { rowHeights.value = [] })
+  watch(items, (next, prev) => {
+    if (next !== prev) rowHeights.value = []
+  })
+
+  onMounted(() => {
+    mounted.value = true
+    updateScroll()
+  })
+
+  return {
+    columns,
+    range,
+    visibleItems,
+    paddingTop,
+    paddingBottom,
+  }
+}
@@ -31,6 +31,18 @@ export interface AiTopics {
   confidence?: number
 }
 
+export interface NoteOcrText {
+  image_id: string
+  text: string
+}
+
+export interface ImageRendition {
+  index: number
+  url: string // 原始远程链接
+  thumb: string // /media 下的本地缩略图
+  medium: string // /media 下的本地中图
+}
+
 export interface NoteDetailsItem {
   id: string
   title: string
@@ -46,5 +58,37 @@ export interface NoteDetailsItem {
   timestamp: string
   ai_summary?: AiSummary
   ai_topics?: AiTopics
+  ocr?: NoteOcrText[] // 仅详情接口返回（来自发布阶段）
+  thumbnail?: string // 仅列表接口返回：本地首图缩略图
+  image_renditions?: ImageRendition[] // 仅详情接口返回：本地各规格图片
   platform?: string // Added platform as it was in the user request but not in the json
-}
\ No newline at end of file
+}
+
+export type NotesSortKey = 'date_desc' | 'date_asc' | 'likes_desc' | 'collects_desc' | 'comments_desc'
+
+export interface NotesQuery {
+  q?: string
+  platform?: string
+  topic?: string
+  sort?: NotesSortKey | string
+}
+
+// /api/notes 分页响应；items 为列表卡片所需的精简字段
+export interface NotesPage {
+  items: NoteDetailsItem[]
+  total: number
+  next_cursor: string | null
+  version: string
+}
+
+export interface TopicCount {
+  name: string
+  count: number
+}
+
+export interface TopicsFacets {
+  primary: TopicCount[]
+  subtopics: TopicCount[]
+  intents: TopicCount[]
+  types: TopicCount[]
+}
@@ -0,0 +1,28 @@
+import { getQuery, createError } from 'h3'
+import { getNotesSnapshot, publicVersion, searchHits, DEFAULT_PAGE_LIMIT, MAX_PAGE_LIMIT } from '../utils/notesStore'
+import { getSearchIndex } from '../utils/searchIndex'
+
+// GET /api/search?q=&cursor=&limit=  按 BM25 相关度排序（需先运行 07_build_search_index.py）
+export default defineEventHandler((event) => {
+  const query = getQuery(event)
+  const q = typeof query.q === 'string' ? query.q.trim() : ''
+  const limit = Math.min(Math.max(Number(query.limit) || DEFAULT_PAGE_LIMIT, 1), MAX_PAGE_LIMIT)
+  const offset = Math.max(Number.parseInt(typeof query.cursor === 'string' ? query.cursor : '0', 10) || 0, 0)
+
+  const index = getSearchIndex()
+  if (!index) {
+    throw createError({ statusCode: 503, statusMessage: 'Search index not built' })
+  }
+
+  const snapshot = getNotesSnapshot()
+  const hits = q ? searchHits(snapshot, index, q) : []
+  const page = hits.slice(offset, offset + limit)
+  const end = offset + page.length
+
+  return {
+    items: page.map(h => ({ ...snapshot.cardById.get(h.id), score: h.score })),
+    total: hits.length,
+    next_cursor: end < hits.length ? String(end) : null,
+    version: publicVersion(`${snapshot.version}|${index.version}`),
+  }
+})
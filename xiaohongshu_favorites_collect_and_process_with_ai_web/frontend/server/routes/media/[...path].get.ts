@@ -0,0 +1,52 @@
+import { createReadStream, statSync } from 'node:fs'
+import { resolve, sep } from 'node:path'
+import { defineEventHandler, createError, getRouterParam, getRequestHeader, sendNoContent, sendStream, setResponseHeaders } from 'h3'
+import { resolveDataPath } from '../../utils/dataPath'
+
+// GET /media/<sha256 前两位>/<sha256>.<thumb|medium>.webp
+// 从磁盘直接提供 09_make_thumbnails.py 生成的图片；URL 带内容哈希 ?v=，可长期缓存
+
+const CONTENT_TYPES: Record<string, string> = {
+  webp: 'image/webp',
+  jpg: 'image/jpeg',
+  jpeg: 'image/jpeg',
+  png: 'image/png',
+}
+
+export default defineEventHandler((event) => {
+  const rel = getRouterParam(event, 'path', { decode: true }) || ''
+  const ext = rel.split('.').pop()?.toLowerCase() || ''
+  const contentType = CONTENT_TYPES[ext]
+  if (!rel || !contentType || rel.includes('\0')) {
+    throw createError({ statusCode: 404, statusMessage: 'Not found' })
+  }
+
+  // 防止 ../ 穿越出 thumbs 目录
+  const root = resolveDataPath('thumbs')
+  const filePath = resolve(root, rel)
+  if (!filePath.startsWith(root + sep)) {
+    throw createError({ statusCode: 404, statusMessage: 'Not found' })
+  }
+
+  let st
+  try {
+    st = statSync(filePath)
+  } catch (e) {
+    throw createError({ statusCode: 404, statusMessage: 'Not found' })
+  }
+  if (!st.isFile()) {
+    throw createError({ statusCode: 404, statusMessage: 'Not found' })
+  }
+
+  const etag = `W/"${st.size.toString(36)}-${Math.floor(st.mtimeMs).toString(36)}"`
+  setResponseHeaders(event, {
+    'Content-Type': contentType,
+    'Cache-Control': 'public, max-age=31536000, immutable',
+    'ETag': etag,
+  })
+  if (getRequestHeader(event, 'if-none-match') === etag) {
+    return sendNoContent(event, 304)
+  }
+  setResponseHeaders(event, { 'Content-Length': String(st.size) })
+  return sendStream(event, createReadStream(filePath))
+})
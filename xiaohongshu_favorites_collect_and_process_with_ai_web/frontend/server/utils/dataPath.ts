@@ -0,0 +1,13 @@
+import { existsSync } from 'node:fs'
+import { resolve } from 'node:path'
+
+export function resolveDataPath(rel: string) {
+  // 1) frontend/data
+  const p1 = resolve(process.cwd(), 'data', rel)
+  if (existsSync(p1)) return p1
+  // 2) project-root/data (../data from frontend)
+  const p2 = resolve(process.cwd(), '..', 'data', rel)
+  if (existsSync(p2)) return p2
+  // 3) fallback: frontend/data (even if not exists, to allow error reporting upstream)
+  return p1
+}
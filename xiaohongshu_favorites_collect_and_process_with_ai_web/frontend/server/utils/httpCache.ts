@@ -0,0 +1,104 @@
+import { createHash } from 'node:crypto'
+import { brotliCompressSync, constants as zlibConstants, gzipSync } from 'node:zlib'
+import { getRequestHeader, sendNoContent, setResponseHeader, type H3Event } from 'h3'
+
+// 按数据版本缓存序列化后的响应体及其 gzip/brotli 压缩结果：
+// 同一版本只序列化、压缩一次；客户端带上 If-None-Match 时直接返回 304
+
+interface CachedBody {
+  version: string
+  etag: string
+  identity: Buffer
+  gzip?: Buffer
+  br?: Buffer
+}
+
+// 查询条件组合较多（分页、筛选），限制缓存条目数
+const MAX_CACHED_BODIES = 256
+// 体积过小的响应压缩收益有限
+const MIN_COMPRESS_BYTES = 1024
+
+const bodies = new Map<string, CachedBody>()
+
+function pickEncoding(acceptEncoding: string | undefined): 'br' | 'gzip' | null {
+  const accepted = new Set<string>()
+  for (const part of (acceptEncoding || '').toLowerCase().split(',')) {
+    const [name, ...params] = part.trim().split(';')
+    // 跳过显式声明 q=0 的编码
+    if (params.some(p => /^\s*q=0(\.0*)?\s*$/.test(p))) continue
+    if (name) accepted.add(name.trim())
+  }
+  if (accepted.has('br')) return 'br'
+  if (accepted.has('gzip')) return 'gzip'
+  return null
+}
+
+function etagMatches(ifNoneMatch: string | undefined, etag: string): boolean {
+  if (!ifNoneMatch) return false
+  if (ifNoneMatch.trim() === '*') return true
+  // 比较时忽略弱校验前缀 W/
+  const bare = etag.replace(/^W\//, '')
+  return ifNoneMatch.split(',').some(t => t.trim().replace(/^W\//, '') === bare)
+}
+
+function getCachedBody(key: string, version: string, build: () => unknown): CachedBody {
+  const hit = bodies.get(key)
+  if (hit && hit.version === version) {
+    // 重新插入，使 Map 的迭代顺序近似 LRU
+    bodies.delete(key)
+    bodies.set(key, hit)
+    return hit
+  }
+
+  const identity = Buffer.from(JSON.stringify(build()), 'utf-8')
+  const etag = `"${createHash('sha1').update(identity).digest('base64url')}"`
+  const entry: CachedBody = { version, etag, identity }
+
+  if (bodies.size >= MAX_CACHED_BODIES) {
+    bodies.delete(bodies.keys().next().value as string)
+  }
+  bodies.set(key, entry)
+  return entry
+}
+
+function compressed(entry: CachedBody, encoding: 'br' | 'gzip'): Buffer {
+  if (encoding === 'br') {
+    entry.br ??= brotliCompressSync(entry.identity, {
+      params: {
+        [zlibConstants.BROTLI_PARAM_MODE]: zlibConstants.BROTLI_MODE_TEXT,
+        [zlibConstants.BROTLI_PARAM_SIZE_HINT]: entry.identity.length,
+      },
+    })
+    return entry.br
+  }
+  entry.gzip ??= gzipSync(entry.identity)
+  return entry.gzip
+}
+
+/**
+ * 以 JSON 响应返回 build() 的结果，带 ETag 与预压缩。
+ *
+ * @param key     缓存键（同一路由下不同查询条件应使用不同的键）
+ * @param version 数据版本；版本不变时不会再次调用 build()
+ */
+export function sendCachedJson(event: H3Event, key: string, version: string, build: () => unknown): Buffer | undefined {
+  const entry = getCachedBody(key, version, build)
+
+  setResponseHeader(event, 'ETag', entry.etag)
+  setResponseHeader(event, 'Cache-Control', 'no-cache')
+  setResponseHeader(event, 'Vary', 'Accept-Encoding')
+
+  if (etagMatches(getRequestHeader(event, 'if-none-match'), entry.etag)) {
+    sendNoContent(event, 304)
+    return
+  }
+
+  setResponseHeader(event, 'Content-Type', 'application/json; charset=utf-8')
+  const encoding = entry.identity.length >= MIN_COMPRESS_BYTES
+    ? pickEncoding(getRequestHeader(event, 'accept-encoding'))
+    : null
+  if (!encoding) return entry.identity
+
+  setResponseHeader(event, 'Content-Encoding', encoding)
+  return compressed(entry, encoding)
+}
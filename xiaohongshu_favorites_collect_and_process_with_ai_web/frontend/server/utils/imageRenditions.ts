@@ -0,0 +1,85 @@
+import { readFileSync, statSync } from 'node:fs'
+import { resolveDataPath } from './dataPath'
+
+// 读取 09_make_thumbnails.py 生成的 thumbs/manifest.json，
+// 把本地缩略图/中图映射成 /media 下的 URL；未生成时返回空映射，前端回退到原图链接
+
+export const MEDIA_URL_PREFIX = '/media/'
+
+export interface ImageRendition {
+  // 在笔记 images 中的下标；下载失败的图片没有对应规格，因此下标可能不连续
+  index: number
+  // 原始远程图片链接
+  url: string
+  thumb: string
+  medium: string
+}
+
+export interface ImageRenditions {
+  // 文件 mtime/size 签名
+  version: string
+  byNote: Map<string, ImageRendition[]>
+}
+
+let cached: ImageRenditions = { version: '', byNote: new Map() }
+
+function toMediaUrl(r: any): string {
+  if (!r || typeof r.path !== 'string') return ''
+  // 文件名不随内容变化，带上内容哈希以便浏览器长期缓存
+  const path = r.path.split('/').map(encodeURIComponent).join('/')
+  return r.hash ? `${MEDIA_URL_PREFIX}${path}?v=${r.hash}` : `${MEDIA_URL_PREFIX}${path}`
+}
+
+export function getImageRenditions(): ImageRenditions {
+  const p = resolveDataPath('thumbs/manifest.json')
+  let signature: string
+  try {
+    const st = statSync(p)
+    signature = `${p}:${st.mtimeMs}:${st.size}`
+  } catch (e) {
+    signature = `${p}:missing`
+  }
+  if (cached.version === signature) return cached
+
+  const byNote = new Map<string, ImageRendition[]>()
+  try {
+    const raw = JSON.parse(readFileSync(p, 'utf-8'))
+    for (const [noteId, list] of Object.entries<any>(raw?.notes || {})) {
+      if (!Array.isArray(list)) continue
+      // 按图片下标去重，列表按下标排序
+      const byIndex = new Map<number, ImageRendition>()
+      for (const it of list) {
+        const thumb = toMediaUrl(it?.thumb)
+        const medium = toMediaUrl(it?.medium)
+        const index = Number(it?.index)
+        if ((!thumb && !medium) || !Number.isInteger(index) || index < 0) continue
+        byIndex.set(index, { index, url: it.url || '', thumb: thumb || medium, medium: medium || thumb })
+      }
+      if (byIndex.size) byNote.set(noteId, [...byIndex.values()].sort((a, b) => a.index - b.index))
+    }
+  } catch (e) {
+    // 清单缺失或损坏：全部回退到原图
+  }
+  cached = { version: signature, byNote }
+  return cached
+}
+
+/**
+ * 取笔记第 index 张图片的本地规格；该图片没有生成规格，或笔记的图片链接已变化时返回 undefined，
+ * 调用方应回退到 images[index] 原图
+ */
+export function renditionAt(note: any, index: number): ImageRendition | undefined {
+  const r = (note?.image_renditions as ImageRendition[] | undefined)?.find((it) => it.index === index)
+  const url = Array.isArray(note?.images) ? note.images[index] : undefined
+  if (!r || (r.url && url && r.url !== url)) return undefined
+  return r
+}
+
+/**
+ * 为单条笔记附加本地图片规格；返回新对象，不修改传入的笔记
+ */
+export function withImageRenditions(note: any, renditions: ImageRenditions = getImageRenditions()): any {
+  const list = note?.id ? renditions.byNote.get(note.id) : undefined
+  if (!list) return note
+  return { ...note, image_renditions: list }
+}
@@ -0,0 +1,440 @@
+import { createHash } from 'node:crypto'
+import { readFileSync, statSync } from 'node:fs'
+import { resolveDataPath } from './dataPath'
+import { getImageRenditions, renditionAt, withImageRenditions, type ImageRenditions } from './imageRenditions'
+import { getSearchIndex, matchAllTokens, searchNotes, type SearchHit, type SearchIndex } from './searchIndex'
+
+// 进程内缓存：解析 + 拼接后的笔记数据只在源文件变化时重建，
+// 请求路径上只剩下几次 stat 调用，耗时与数据量无关
+
+export interface TopicCount {
+  name: string
+  count: number
+}
+
+export interface TopicsFacets {
+  primary: TopicCount[]
+  subtopics: TopicCount[]
+  intents: TopicCount[]
+  types: TopicCount[]
+}
+
+export const SORT_KEYS = ['date_desc', 'date_asc', 'likes_desc', 'collects_desc', 'comments_desc'] as const
+export type SortKey = typeof SORT_KEYS[number]
+
+// 列表页所需的预计算信息，避免每次查询重复计算
+interface NoteIndexEntry {
+  card: any
+  // 小写后的 标题/摘要/关键词/标签/正文，以 \u0000 分隔防止跨字段误匹配
+  haystack: string
+  topics: Set<string>
+  platform: string
+}
+
+export interface NotesSnapshot {
+  // 由三份源文件及缩略图清单的 mtime/size 组成，文件有变化即变化
+  version: string
+  notes: any[]
+  byId: Map<string, any>
+  cardById: Map<string, any>
+  topics: TopicsFacets
+  entries: NoteIndexEntry[]
+  // 每种排序方式下 entries 的下标顺序
+  orders: Record<SortKey, number[]>
+}
+
+export interface NotesQuery {
+  q?: string
+  platform?: string
+  topic?: string
+  sort?: SortKey
+  cursor?: string
+  limit?: number
+}
+
+export interface NotesPage {
+  items: any[]
+  total: number
+  next_cursor: string | null
+  version: string
+}
+
+export const DEFAULT_PAGE_LIMIT = 24
+export const MAX_PAGE_LIMIT = 100
+// 每个数据版本最多缓存的筛选结果数
+const MAX_CACHED_QUERIES = 64
+// 列表卡片中 desc 的最大长度（详情页再取全文）
+const CARD_DESC_MAX_LEN = 200
+
+const SOURCE_FILES = [
+  'favorite_notes_details.json',
+  'favorite_notes_ai_processed.json',
+  'favorite_notes_normalized.json',
+] as const
+
+let cached: NotesSnapshot | null = null
+// 同一数据版本下，筛选+排序后的 entries 下标按查询条件缓存，翻页时不再重复扫描
+const queryCache = new Map<string, number[]>()
+// /api/search 的合并命中列表，同样按数据版本缓存
+const hitCache = new Map<string, SearchHit[]>()
+
+function readJson<T = any>(p: string): T | null {
+  try {
+    const txt = readFileSync(p, 'utf-8')
+    return JSON.parse(txt) as T
+  } catch (e) {
+    return null
+  }
+}
+
+function fileSignature(p: string): string {
+  try {
+    const st = statSync(p)
+    return `${p}:${st.mtimeMs}:${st.size}`
+  } catch (e) {
+    return `${p}:missing`
+  }
+}
+
+/**
+ * 对外返回的数据版本：内部签名含服务器上的绝对路径，只给出其摘要，客户端仅用于比较是否变化。
+ */
+export function publicVersion(signature: string): string {
+  return createHash('sha1').update(signature).digest('base64url').slice(0, 16)
+}
+
+function enrichNote(note: any, ai: any, authorLink: string | undefined): any {
+  let summaryText: string | undefined
+  let keywordsArr: string[] | undefined
+  let topicsObj: any | undefined
+
+  if (ai) {
+    // summary
+    summaryText = ai?.summary?.summary_200
+      || ai?.tasks?.summary?.result?.summary_200
+    // keywords
+    keywordsArr = ai?.keywords?.keywords
+      || ai?.tasks?.keywords?.result?.keywords
+    // topics
+    topicsObj = ai?.topics
+      || ai?.tasks?.topics?.result
+  }
+
+  const out: any = { ...note }
+
+  if (summaryText || (keywordsArr && keywordsArr.length)) {
+    out.ai_summary = {
+      summary: summaryText || '',
+      keywords: Array.isArray(keywordsArr) ? keywordsArr : [],
+    }
+  }
+
+  if (topicsObj && typeof topicsObj === 'object') {
+    out.ai_topics = {
+      primary_topic: topicsObj.primary_topic,
+      subtopics: topicsObj.subtopics || [],
+      content_intent: topicsObj.content_intent,
+      content_type: topicsObj.content_type,
+      confidence: topicsObj.confidence,
+    }
+  }
+
+  // inject author_link if available
+  if (authorLink) {
+    out.author_info = {
+      ...out.author_info,
+      author_link: authorLink,
+    }
+  }
+
+  return out
+}
+
+function toNum(v: unknown): number {
+  if (typeof v === 'number') return v
+  if (typeof v === 'string') {
+    const n = Number(v.replace?.(/[,\s]/g, '') ?? v)
+    return isNaN(n) ? 0 : n
+  }
+  return 0
+}
+
+export function getNotePlatform(note: any): string {
+  if (note.platform) return note.platform
+  const pools: string[] = []
+  if (note.images && note.images.length) pools.push(...note.images)
+  if (note.author_info?.avatar) pools.push(note.author_info.avatar)
+  if (note.desc) pools.push(note.desc)
+  const blob = pools.join(' ').toLowerCase()
+  if (blob.includes('xhscdn.com')) return 'xiaohongshu'
+  if (blob.includes('bilibili.com') || blob.includes('hdslb.com')) return 'bilibili'
+  if (blob.includes('zhihu.com') || blob.includes('zhimg.com')) return 'zhihu'
+  return 'unknown'
+}
+
+// 列表卡片只需要的字段：首图、截断的正文、前几个标签/关键词
+function toCardItem(note: any, platform: string): any {
+  const desc: string = note.desc || ''
+  return {
+    id: note.id,
+    title: note.title,
+    desc: desc.length > CARD_DESC_MAX_LEN ? desc.slice(0, CARD_DESC_MAX_LEN) : desc,
+    author_info: note.author_info,
+    tags: (note.tags || []).slice(0, 3),
+    date: note.date,
+    statistic: note.statistic,
+    images: Array.isArray(note.images) && note.images.length ? [note.images[0]] : null,
+    // 本地生成的首图缩略图，未生成时前端回退到 images[0]
+    thumbnail: renditionAt(note, 0)?.thumb,
+    video: note.video ?? null,
+    ai_summary: note.ai_summary
+      ? { summary: note.ai_summary.summary, keywords: (note.ai_summary.keywords || []).slice(0, 3) }
+      : undefined,
+    ai_topics: note.ai_topics,
+    platform,
+  }
+}
+
+function buildIndexEntry(note: any): NoteIndexEntry {
+  const platform = getNotePlatform(note)
+  const haystack = [
+    note.title || '',
+    note.ai_summary?.summary || '',
+    ...(note.ai_summary?.keywords || []),
+    ...(note.tags || []),
+    note.desc || '',
+  ].join('\u0000').toLowerCase()
+
+  const topics = new Set<string>()
+  const at = note.ai_topics
+  if (at) {
+    for (const t of [at.primary_topic, ...(Array.isArray(at.subtopics) ? at.subtopics : []), at.content_intent, at.content_type]) {
+      if (t) topics.add(String(t).toLowerCase())
+    }
+  }
+
+  return { card: toCardItem(note, platform), haystack, topics, platform }
+}
+
+function buildOrders(notes: any[]): Record<SortKey, number[]> {
+  const date = notes.map(n => toNum(n.date))
+  const likes = notes.map(n => toNum(n.statistic?.like_num))
+  const collects = notes.map(n => toNum(n.statistic?.collect_num))
+  const comments = notes.map(n => toNum(n.statistic?.chat_num))
+  const base = notes.map((_, i) => i)
+  // Array.prototype.sort 是稳定排序，键相同时保持原始顺序
+  return {
+    date_desc: [...base].sort((a, b) => date[b] - date[a]),
+    date_asc: [...base].sort((a, b) => date[a] - date[b]),
+    likes_desc: [...base].sort((a, b) => likes[b] - likes[a]),
+    collects_desc: [...base].sort((a, b) => collects[b] - collects[a]),
+    comments_desc: [...base].sort((a, b) => comments[b] - comments[a]),
+  }
+}
+
+function countTopics(notes: any[]): TopicsFacets {
+  const counts = {
+    primary: new Map<string, number>(),
+    subtopics: new Map<string, number>(),
+    intents: new Map<string, number>(),
+    types: new Map<string, number>(),
+  }
+
+  for (const note of notes) {
+    const topics = note.ai_topics
+    if (!topics) continue
+    const primary: string | undefined = topics.primary_topic
+    const subs: string[] = Array.isArray(topics.subtopics) ? topics.subtopics : []
+    const intent: string | undefined = topics.content_intent
+    const type: string | undefined = topics.content_type
+
+    if (primary) counts.primary.set(primary, (counts.primary.get(primary) || 0) + 1)
+    for (const s of subs) counts.subtopics.set(s, (counts.subtopics.get(s) || 0) + 1)
+    if (intent) counts.intents.set(intent, (counts.intents.get(intent) || 0) + 1)
+    if (type) counts.types.set(type, (counts.types.get(type) || 0) + 1)
+  }
+
+  function toArray(m: Map<string, number>) {
+    return Array.from(m.entries()).map(([name, count]) => ({ name, count }))
+      .sort((a, b) => b.count - a.count || a.name.localeCompare(b.name))
+  }
+
+  return {
+    primary: toArray(counts.primary),
+    subtopics: toArray(counts.subtopics),
+    intents: toArray(counts.intents),
+    types: toArray(counts.types),
+  }
+}
+
+function buildSnapshot(paths: string[], version: string, renditions: ImageRenditions): NotesSnapshot {
+  const [detailsPath, aiPath, normalizedPath] = paths
+
+  const details = readJson<any>(detailsPath)
+  const aiProcessed = readJson<any>(aiPath)
+  const normalized = readJson<any>(normalizedPath)
+
+  const aiArray = (aiProcessed as any)?.data as any[] | undefined
+  const aiMap = new Map<string, any>()
+  if (Array.isArray(aiArray)) {
+    for (const item of aiArray) {
+      const id = item?.note_id
+      if (id) aiMap.set(id, item)
+    }
+  }
+
+  // normalized: { data: [ { normalized: { note_id, author: { author_link } } } ] }
+  const normArray = (normalized as any)?.data as any[] | undefined
+  const authorLinkMap = new Map<string, string>()
+  if (Array.isArray(normArray)) {
+    for (const it of normArray) {
+      const nid = it?.normalized?.note_id
+      const link = it?.normalized?.author?.author_link
+      if (nid && typeof link === 'string') authorLinkMap.set(nid, link)
+    }
+  }
+
+  const notes = ((details as any)?.data || []).map((note: any) =>
+    withImageRenditions(enrichNote(note, aiMap.get(note.id), authorLinkMap.get(note.id)), renditions))
+
+  const byId = new Map<string, any>()
+  for (const n of notes) {
+    // 详情文件可能存在重复追加，保留第一条以与原 .find() 行为一致
+    if (n?.id && !byId.has(n.id)) byId.set(n.id, n)
+  }
+
+  const entries = notes.map(buildIndexEntry)
+  const cardById = new Map<string, any>()
+  for (const e of entries) {
+    if (e.card.id && !cardById.has(e.card.id)) cardById.set(e.card.id, e.card)
+  }
+
+  return {
+    version,
+    notes,
+    byId,
+    cardById,
+    topics: countTopics(notes),
+    entries,
+    orders: buildOrders(notes),
+  }
+}
+
+/**
+ * 获取当前数据快照；源文件 mtime/size 未变化时直接复用内存中的结果。
+ * 返回的对象在多个请求间共享，调用方不得修改。
+ */
+export function getNotesSnapshot(): NotesSnapshot {
+  const paths = SOURCE_FILES.map(resolveDataPath)
+  const renditions = getImageRenditions()
+  const version = [...paths.map(fileSignature), renditions.version].join('|')
+  if (!cached || cached.version !== version) {
+    cached = buildSnapshot(paths, version, renditions)
+    queryCache.clear()
+    hitCache.clear()
+  }
+  return cached
+}
+
+function remember<T>(cache: Map<string, T>, key: string, value: T): void {
+  if (cache.size >= MAX_CACHED_QUERIES) {
+    // Map 按插入顺序迭代，删除最早的一条
+    cache.delete(cache.keys().next().value as string)
+  }
+  cache.set(key, value)
+}
+
+/**
+ * 关键词匹配：建索引时已有的笔记只查检索索引（单字表与英文前缀覆盖了子串匹配的常见用法），
+ * 07 之后新增、尚未进入索引的笔记，以及查询分不出词时，才对文本做子串匹配。
+ */
+function matchesQuery(e: NoteIndexEntry, q: string, index: SearchIndex | null, matched: Set<string> | null): boolean {
+  if (index && matched && index.docIds.has(e.card.id)) return matched.has(e.card.id)
+  return e.haystack.includes(q)
+}
+
+function filterOrder(snapshot: NotesSnapshot, q: string, platform: string, topic: string, sort: SortKey): number[] {
+  const index = q ? getSearchIndex() : null
+  const key = JSON.stringify([q, platform, topic, sort, index?.version || ''])
+  const hit = queryCache.get(key)
+  if (hit) return hit
+
+  const matched = index ? matchAllTokens(index, q) : null
+  let order = snapshot.orders[sort]
+  if (q || platform !== 'all' || topic !== 'all') {
+    order = order.filter((i) => {
+      const e = snapshot.entries[i]
+      if (q && !matchesQuery(e, q, index, matched)) return false
+      if (platform !== 'all' && e.platform !== platform) return false
+      if (topic !== 'all' && !e.topics.has(topic)) return false
+      return true
+    })
+  }
+
+  remember(queryCache, key, order)
+  return order
+}
+
+// 尚未进入检索索引的笔记（entries 下标，按时间倒序），按 快照版本|索引版本 缓存一份
+let unindexed: { key: string; order: number[] } | null = null
+
+function unindexedOrder(snapshot: NotesSnapshot, index: SearchIndex): number[] {
+  const key = `${snapshot.version}|${index.version}`
+  if (unindexed?.key !== key) {
+    unindexed = { key, order: snapshot.orders.date_desc.filter(i => !index.docIds.has(snapshot.entries[i].card.id)) }
+  }
+  return unindexed.order
+}
+
+/**
+ * 检索结果：BM25 命中按相关度在前，尚未进入索引的笔记按子串匹配补在最后（得分 0，按时间倒序）。
+ * 按 (q, 快照版本, 索引版本) 缓存，翻页时不再重复计算。
+ */
+export function searchHits(snapshot: NotesSnapshot, index: SearchIndex, q: string): SearchHit[] {
+  const key = JSON.stringify([q, snapshot.version, index.version])
+  const cachedHits = hitCache.get(key)
+  if (cachedHits) return cachedHits
+
+  // 索引可能比详情数据旧，丢弃已不存在的笔记
+  const hits = searchNotes(index, q).filter(h => snapshot.cardById.has(h.id))
+  const needle = q.toLowerCase()
+  for (const i of unindexedOrder(snapshot, index)) {
+    const e = snapshot.entries[i]
+    if (e.haystack.includes(needle)) hits.push({ id: e.card.id, score: 0 })
+  }
+  remember(hitCache, key, hits)
+  return hits
+}
+
+/**
+ * 查询结果所依赖的数据版本：笔记快照，以及带关键词时的检索索引。
+ */
+export function getNotesQueryVersion(params: NotesQuery): string {
+  const version = getNotesSnapshot().version
+  if (!(params.q || '').trim()) return version
+  return `${version}|${getSearchIndex()?.version || ''}`
+}
+
+/**
+ * 按条件筛选、排序并分页；cursor 为上一页返回的 next_cursor（结果中的偏移量）。
+ */
+export function queryNotes(params: NotesQuery): NotesPage {
+  const snapshot = getNotesSnapshot()
+  const q = (params.q || '').trim().toLowerCase()
+  const platform = params.platform || 'all'
+  const topic = (params.topic || 'all').toLowerCase()
+  const sort: SortKey = SORT_KEYS.includes(params.sort as SortKey) ? params.sort as SortKey : 'date_desc'
+  const limit = Math.min(Math.max(Number(params.limit) || DEFAULT_PAGE_LIMIT, 1), MAX_PAGE_LIMIT)
+  const offset = Math.max(Number.parseInt(params.cursor || '0', 10) || 0, 0)
+
+  const order = filterOrder(snapshot, q, platform, topic, sort)
+  const items = order.slice(offset, offset + limit).map(i => snapshot.entries[i].card)
+  const end = offset + items.length
+
+  return {
+    items,
+    total: order.length,
+    next_cursor: end < order.length ? String(end) : null,
+    version: publicVersion(snapshot.version),
+  }
+}
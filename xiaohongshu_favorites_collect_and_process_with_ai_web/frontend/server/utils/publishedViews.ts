@@ -0,0 +1,105 @@
+import { readFileSync, statSync } from 'node:fs'
+import { resolveDataPath } from './dataPath'
+import type { TopicsFacets } from './notesStore'
+
+// 读取 08_publish_views.py 发布的物化视图：
+//   views/notes/<note_id>.json  单条笔记的完整展示数据
+//   views/facets.json           主题聚合
+//   views/index.json            发布时各源文件的 mtime/size（sources）
+// 未发布时返回 null，调用方回退到内存快照；源文件在发布后又被改写时视图已过期，同样回退
+
+// 与 08_publish_views.py 中的 SAFE_NOTE_ID_RE 一致，同时防止路径穿越
+const SAFE_NOTE_ID_RE = /^[A-Za-z0-9_-]{1,128}$/
+
+let cachedFacets: PublishedFacets | null = null
+let cachedFacetsSignature = ''
+
+type SourceSignature = { mtime_ms: number; size: number } | null
+
+let cachedSources: Record<string, SourceSignature> | null = null
+let cachedIndexSignature = ''
+
+function readPublishedSources(): Record<string, SourceSignature> | null {
+  const p = resolveDataPath('views/index.json')
+  let signature: string
+  try {
+    const st = statSync(p)
+    signature = `${p}:${st.mtimeMs}:${st.size}`
+  } catch (e) {
+    return null
+  }
+  if (cachedIndexSignature !== signature) {
+    try {
+      const raw = JSON.parse(readFileSync(p, 'utf-8'))
+      cachedSources = raw && typeof raw.sources === 'object' ? raw.sources : null
+    } catch (e) {
+      cachedSources = null
+    }
+    cachedIndexSignature = signature
+  }
+  return cachedSources
+}
+
+function sameSignature(rel: string, recorded: SourceSignature): boolean {
+  try {
+    const st = statSync(resolveDataPath(rel))
+    // Python 记录的是 st_mtime_ns / 1e6，与 Node 的 mtimeMs 之间只有浮点误差
+    return !!recorded && recorded.size === st.size && Math.abs(recorded.mtime_ms - st.mtimeMs) < 1
+  } catch (e) {
+    return recorded === null
+  }
+}
+
+/**
+ * 发布的视图是否仍与源文件一致。
+ * 旧版 index.json 没有 sources 时无法判断，按过期处理。
+ */
+export function isPublishedViewFresh(): boolean {
+  const sources = readPublishedSources()
+  if (!sources) return false
+  return Object.entries(sources).every(([rel, recorded]) => sameSignature(rel, recorded))
+}
+
+export function readPublishedNote(id: string): any | null {
+  if (!SAFE_NOTE_ID_RE.test(id)) return null
+  try {
+    return JSON.parse(readFileSync(resolveDataPath(`views/notes/${id}.json`), 'utf-8'))
+  } catch (e) {
+    return null
+  }
+}
+
+export interface PublishedFacets {
+  // 文件 mtime/size 签名
+  version: string
+  facets: TopicsFacets
+}
+
+export function getPublishedFacets(): PublishedFacets | null {
+  const p = resolveDataPath('views/facets.json')
+  let signature: string
+  try {
+    const st = statSync(p)
+    signature = `${p}:${st.mtimeMs}:${st.size}`
+  } catch (e) {
+    return null
+  }
+  if (cachedFacetsSignature !== signature) {
+    try {
+      const raw = JSON.parse(readFileSync(p, 'utf-8'))
+      cachedFacets = {
+        version: signature,
+        facets: {
+          primary: raw.primary || [],
+          subtopics: raw.subtopics || [],
+          intents: raw.intents || [],
+          types: raw.types || [],
+        },
+      }
+    } catch (e) {
+      cachedFacets = null
+    }
+    cachedFacetsSignature = signature
+  }
+  return cachedFacets
+}
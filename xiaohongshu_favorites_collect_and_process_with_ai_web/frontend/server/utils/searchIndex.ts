@@ -0,0 +1,227 @@
+import { readFileSync, statSync } from 'node:fs'
+import { resolveDataPath } from './dataPath'
+
+// 由 07_build_search_index.py 生成的倒排索引；查询只访问查询词对应的倒排表，
+// 不再线性扫描全部笔记。索引里 CJK 只有二元组，另有单字表覆盖单个汉字的查询；
+// 拉丁词在加载时排成有序表，查询词按前缀匹配（"app" 能找到 "apple"）
+
+const INDEX_FILE = 'search_index.json'
+// 低于该版本的索引没有单字表，需重新运行 07
+const MIN_INDEX_VERSION = 2
+
+interface SearchIndexFile {
+  version: number
+  tokenizer: string
+  k1: number
+  b: number
+  doc_count: number
+  avg_doc_len: number
+  docs: { id: string; len: number }[]
+  postings: Record<string, [number, number][]>
+  chars: Record<string, number[]>
+}
+
+export interface SearchIndex {
+  // 文件 mtime/size 签名
+  version: string
+  k1: number
+  b: number
+  avgDocLen: number
+  docs: { id: string; len: number }[]
+  postings: Map<string, [number, number][]>
+  // CJK 单字 -> 含该字的文档下标
+  chars: Map<string, number[]>
+  // 全部拉丁词（字母/数字），已排序，用于前缀查找
+  latinTerms: string[]
+  // 建索引时已有的笔记
+  docIds: Set<string>
+}
+
+export interface SearchHit {
+  id: string
+  score: number
+}
+
+let cached: SearchIndex | null = null
+let cachedSignature = ''
+
+// CJK 统一表意文字（含扩展A与兼容区）、日文假名、韩文音节
+const CJK_RANGES: [number, number][] = [
+  [0x3400, 0x4dbf],
+  [0x4e00, 0x9fff],
+  [0xf900, 0xfaff],
+  [0x3040, 0x30ff],
+  [0xac00, 0xd7af],
+]
+
+function isCjk(cp: number): boolean {
+  return CJK_RANGES.some(([lo, hi]) => cp >= lo && cp <= hi)
+}
+
+/**
+ * 检索用分词：CJK 连续片段切成二元组（单字片段保留单字），拉丁字母/数字按词切分。
+ * 与 utils/text_utils.py 中的 tokenize 保持一致，修改时需同步。
+ */
+export function tokenize(text: string): string[] {
+  if (!text) return []
+  const s = text.normalize('NFKC').toLowerCase()
+  const tokens: string[] = []
+  let run: string[] = []
+  let buf = ''
+
+  const flushRun = () => {
+    if (run.length === 1) {
+      tokens.push(run[0])
+    } else {
+      for (let i = 0; i < run.length - 1; i++) tokens.push(run[i] + run[i + 1])
+    }
+    run = []
+  }
+  const flushBuf = () => {
+    for (const m of buf.matchAll(/[a-z0-9]+/g)) tokens.push(m[0])
+    buf = ''
+  }
+
+  for (const ch of s) {
+    if (isCjk(ch.codePointAt(0)!)) {
+      if (buf) flushBuf()
+      run.push(ch)
+    } else {
+      if (run.length) flushRun()
+      buf += ch
+    }
+  }
+  if (run.length) flushRun()
+  if (buf) flushBuf()
+  return tokens
+}
+
+const LATIN_TERM_RE = /^[a-z0-9]+$/
+
+/**
+ * 读取检索索引；文件不存在（尚未运行 07 阶段）或是旧版格式时返回 null，调用方应回退到线性匹配。
+ */
+export function getSearchIndex(): SearchIndex | null {
+  const p = resolveDataPath(INDEX_FILE)
+  let signature: string
+  try {
+    const st = statSync(p)
+    signature = `${p}:${st.mtimeMs}:${st.size}`
+  } catch (e) {
+    cached = null
+    cachedSignature = ''
+    return null
+  }
+  if (cached && cachedSignature === signature) return cached
+
+  try {
+    const raw = JSON.parse(readFileSync(p, 'utf-8')) as SearchIndexFile
+    if (!(raw.version >= MIN_INDEX_VERSION)) {
+      console.warn(`[searchIndex] ${INDEX_FILE} 版本过旧（${raw.version}），请重新运行 07_build_search_index.py`)
+      cached = null
+    } else {
+      const postings = new Map(Object.entries(raw.postings || {}))
+      const docs = raw.docs || []
+      cached = {
+        version: signature,
+        k1: raw.k1,
+        b: raw.b,
+        avgDocLen: raw.avg_doc_len || 1,
+        docs,
+        postings,
+        chars: new Map(Object.entries(raw.chars || {})),
+        // 只含 ASCII，默认的码元序与下面二分查找用的 < 比较一致
+        latinTerms: Array.from(postings.keys()).filter(t => LATIN_TERM_RE.test(t)).sort(),
+        docIds: new Set(docs.map(d => d.id)),
+      }
+    }
+  } catch (e) {
+    cached = null
+  }
+  cachedSignature = signature
+  return cached
+}
+
+function uniqueTokens(q: string): string[] {
+  return Array.from(new Set(tokenize(q)))
+}
+
+function latinTermsWithPrefix(index: SearchIndex, prefix: string): string[] {
+  const terms = index.latinTerms
+  let lo = 0
+  let hi = terms.length
+  while (lo < hi) {
+    const mid = (lo + hi) >> 1
+    if (terms[mid] < prefix) lo = mid + 1
+    else hi = mid
+  }
+  const out: string[] = []
+  for (let i = lo; i < terms.length && terms[i].startsWith(prefix); i++) out.push(terms[i])
+  return out
+}
+
+/**
+ * 查询词对应的 (文档下标, 词频) 列表：拉丁词合并所有以它为前缀的词，
+ * 单个汉字查单字表（词频按 1 计），CJK 二元组直接查倒排表。
+ */
+function postingsFor(index: SearchIndex, token: string): [number, number][] {
+  if (LATIN_TERM_RE.test(token)) {
+    const terms = latinTermsWithPrefix(index, token)
+    if (terms.length <= 1) return terms.length ? index.postings.get(terms[0])! : []
+    const tf = new Map<number, number>()
+    for (const term of terms) {
+      for (const [doc, f] of index.postings.get(term)!) tf.set(doc, (tf.get(doc) || 0) + f)
+    }
+    return Array.from(tf.entries())
+  }
+  // tokenize 只在单字片段时产出单字；CJK_RANGES 都在基本平面内，长度为 1
+  if (token.length === 1) {
+    const docs = index.chars.get(token)
+    return docs ? docs.map(doc => [doc, 1] as [number, number]) : []
+  }
+  return index.postings.get(token) || []
+}
+
+/**
+ * BM25 打分，按得分从高到低返回命中的笔记；任一查询词命中即计入。
+ */
+export function searchNotes(index: SearchIndex, q: string): SearchHit[] {
+  const tokens = uniqueTokens(q)
+  const n = index.docs.length
+  const scores = new Map<number, number>()
+
+  for (const token of tokens) {
+    const postings = postingsFor(index, token)
+    if (!postings.length) continue
+    const df = postings.length
+    const idf = Math.log(1 + (n - df + 0.5) / (df + 0.5))
+    for (const [doc, tf] of postings) {
+      const norm = tf + index.k1 * (1 - index.b + index.b * index.docs[doc].len / index.avgDocLen)
+      scores.set(doc, (scores.get(doc) || 0) + idf * tf * (index.k1 + 1) / norm)
+    }
+  }
+
+  return Array.from(scores.entries())
+    .sort((a, b) => b[1] - a[1] || a[0] - b[0])
+    .map(([doc, score]) => ({ id: index.docs[doc].id, score }))
+}
+
+/**
+ * 返回包含全部查询词的笔记 id 集合；查询分不出词时返回 null。
+ * 结果只包含建索引时已有的笔记（index.docIds），其余笔记由调用方做子串匹配。
+ */
+export function matchAllTokens(index: SearchIndex, q: string): Set<string> | null {
+  const tokens = uniqueTokens(q)
+  if (!tokens.length) return null
+  const lists = tokens.map(t => postingsFor(index, t))
+  // 从最短的倒排表开始求交集
+  lists.sort((a, b) => a.length - b.length)
+  let docs = new Set(lists[0].map(([doc]) => doc))
+  for (const list of lists.slice(1)) {
+    if (!docs.size) break
+    const next = new Set<number>()
+    for (const [doc] of list) if (docs.has(doc)) next.add(doc)
+    docs = next
+  }
+  return new Set(Array.from(docs, doc => index.docs[doc].id))
+}
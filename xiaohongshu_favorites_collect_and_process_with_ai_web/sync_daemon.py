@@ -0,0 +1,228 @@
+import argparse
+import asyncio
+import importlib
+import random
+import signal
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from client_sdk.rpc_client import EAIRPCClient  # type: ignore
+from utils.file_utils import write_json_with_project_root
+from utils import metrics, profiling
+
+# 阶段脚本以数字开头，只能按名称导入；导入一次后各轮复用其模块级缓存
+brief_stage = importlib.import_module("01_get_brief_notes")
+details_stage = importlib.import_module("02_get_details_notes")
+normalize_stage = importlib.import_module("03_normalize_notes")
+profiles_stage = importlib.import_module("10_fetch_author_profiles")
+ai_stage = importlib.import_module("04_process_with_AI")
+download_stage = importlib.import_module("05_download_images")
+ocr_stage = importlib.import_module("06_ocr_images")
+
+# ----------------------
+# Config
+# ----------------------
+# 两次同步之间的间隔（秒），另加随机抖动，避免固定节奏触发风控
+SYNC_INTERVAL_SEC = 30 * 60
+SYNC_JITTER_SEC = 120
+# 连续多少轮出错后重建 RPC 客户端（webhook 服务与浏览器页面一并重建）
+CLIENT_RESTART_AFTER_FAILURES = 2
+# 每轮状态，便于外部查看常驻进程是否健康
+STATE_PATH = "data/sync_daemon_state.json"
+
+# 每轮最多获取多少位作者的主页信息：控制在一批以内（不触发批间长停），约半分钟，
+# 不拖住同一轮后面的规范化 / AI / 图片 / OCR；积压的作者留到后续各轮继续
+DAEMON_PROFILES_PER_CYCLE = 10
+
+STEPS = ("brief", "details", "profiles", "normalize", "ai", "images", "ocr")
+
+# RPC client config（与现有脚本保持一致）
+RPC_BASE_URL = "http://127.0.0.1:8008"
+RPC_API_KEY = "testkey"
+RPC_WEBHOOK_HOST = "127.0.0.1"
+RPC_WEBHOOK_PORT = 0
+
+
+def _now_iso() -> str:
+    return datetime.now(timezone.utc).isoformat().replace("+00:00", "Z")
+
+
+def _make_client() -> EAIRPCClient:
+    return EAIRPCClient(
+        base_url=RPC_BASE_URL,
+        api_key=RPC_API_KEY,
+        webhook_host=RPC_WEBHOOK_HOST,
+        webhook_port=RPC_WEBHOOK_PORT,
+    )
+
+
+def keep_pages_warm(enabled: bool) -> None:
+    """常驻时各阶段调用不再关闭浏览器页面，下一次调用直接复用"""
+    for stage in (brief_stage, details_stage, ai_stage, ocr_stage):
+        stage.CLOSE_PAGE_WHEN_TASK_FINISHED = not enabled
+
+
+class SyncDaemon:
+    """持有一个常驻的 RPC 客户端，按间隔增量同步：简要 -> 详情 -> 作者信息 -> 规范化 -> AI -> 图片 -> OCR"""
+
+    def __init__(self, steps: List[str], interval_sec: float, jitter_sec: float,
+                 ai_worker: bool = False, cookies_path: Optional[str] = None) -> None:
+        self.steps = steps
+        self.interval_sec = interval_sec
+        self.jitter_sec = jitter_sec
+        self.ai_worker = ai_worker
+        self.cookies_path = cookies_path
+        self.client: Optional[EAIRPCClient] = None
+        self.cycles = 0
+        self.consecutive_failures = 0
+        # 首轮，或上一轮下游步骤失败 / 作者信息还有积压时，即使没有新笔记也跑一遍下游补齐积压
+        self.downstream_pending = True
+        self.stop_event = asyncio.Event()
+
+    async def _ensure_client(self) -> EAIRPCClient:
+        if self.client is not None and self.consecutive_failures >= CLIENT_RESTART_AFTER_FAILURES:
+            print(f"[daemon] 连续 {self.consecutive_failures} 轮出错，重建 RPC 客户端")
+            try:
+                await self.client.stop()
+            except Exception as e:
+                print(f"[warn] 停止旧客户端失败: {e}")
+            self.client = None
+            self.consecutive_failures = 0
+        if self.client is None:
+            started = time.perf_counter()
+            self.client = _make_client()
+            await self.client.start()
+            print(f"✅ RPC客户端已启动（{time.perf_counter() - started:.2f}s），此后各轮复用")
+        return self.client
+
+    async def _step(self, name: str, report: Dict[str, Any], fn: Callable[[], Awaitable[Any]]) -> Any:
+        print(f"[daemon] ▶ {name}")
+        started = time.perf_counter()
+        try:
+            result = await fn()
+            report[name] = {"ok": True, "seconds": round(time.perf_counter() - started, 3)}
+            return result
+        except Exception as e:
+            report[name] = {"ok": False, "seconds": round(time.perf_counter() - started, 3), "error": f"{type(e).__name__}: {e}"}
+            print(f"[FAIL] {name}: {type(e).__name__}: {e}")
+            return None
+        finally:
+            metrics.observe("daemon_step_seconds", time.perf_counter() - started, step=name)
+
+    async def run_cycle(self) -> Dict[str, Any]:
+        self.cycles += 1
+        report: Dict[str, Any] = {}
+        cycle: Dict[str, Any] = {"cycle": self.cycles, "started_at": _now_iso(), "steps": report}
+        client = await self._ensure_client()
+
+        changed = 0
+        if "brief" in self.steps:
+            results = await self._step("brief", report, lambda: brief_stage.sync_brief(client))
+            if results is None and report["brief"]["ok"]:
+                report["brief"].update(ok=False, error="sync failed")
+            if results:
+                changed = sum(int((results.get(k) or {}).get("count") or 0) for k in ("added", "updated"))
+                print(f"[daemon] 新增/更新笔记 {changed} 条")
+        cycle["changed"] = changed
+
+        if changed and "details" in self.steps:
+            await self._step("details", report, lambda: details_stage.sync_details(client))
+        if not changed and not self.downstream_pending:
+            print("[daemon] 没有新增/更新的笔记，跳过后续阶段")
+        else:
+            # 下游阶段本身都是增量的：作者信息只请求缓存过期的作者，AI 跳过已完成笔记，图片复用已下载 blob，OCR 只读下载日志新增部分
+            downstream = [
+                ("profiles", lambda: asyncio.to_thread(profiles_stage.run, self.cookies_path, DAEMON_PROFILES_PER_CYCLE)),
+                ("normalize", lambda: asyncio.to_thread(normalize_stage.main)),
+                ("ai", lambda: ai_stage.main(worker=self.ai_worker, client=client)),
+                ("images", lambda: asyncio.to_thread(download_stage.run, self.cookies_path)),
+                ("ocr", lambda: ocr_stage.main(client=client)),
+            ]
+            profiles_deferred = 0
+            for name, fn in downstream:
+                if name not in self.steps:
+                    continue
+                if self.stop_event.is_set():
+                    print("[daemon] 收到停止信号，本轮剩余步骤留到下次启动")
+                    break
+                result = await self._step(name, report, fn)
+                if name == "profiles" and isinstance(result, dict):
+                    profiles_deferred = int(result.get("deferred") or 0)
+            if profiles_deferred:
+                print(f"[daemon] 还有 {profiles_deferred} 位作者的信息留到后续各轮获取")
+            self.downstream_pending = bool(profiles_deferred) or any(
+                not report[n]["ok"] for n, _ in downstream if n in report)
+
+        failed = [name for name, r in report.items() if not r["ok"]]
+        self.consecutive_failures = self.consecutive_failures + 1 if failed else 0
+        outcome = "failed" if failed else ("ok" if len(report) > 1 else "idle")
+        metrics.inc("daemon_cycles_total", outcome=outcome)
+        cycle.update(finished_at=_now_iso(), outcome=outcome, failed_steps=failed)
+        return cycle
+
+    def _save_state(self, cycle: Dict[str, Any], next_run_at: Optional[datetime]) -> None:
+        write_json_with_project_root(STATE_PATH, {
+            "last_cycle": cycle,
+            "cycles": self.cycles,
+            "consecutive_failures": self.consecutive_failures,
+            "next_run_at": next_run_at.isoformat().replace("+00:00", "Z") if next_run_at else None,
+            "updated_at": _now_iso(),
+        }, indent=2)
+
+    async def run(self, once: bool = False) -> None:
+        try:
+            while not self.stop_event.is_set():
+                started = time.perf_counter()
+                cycle = await self.run_cycle()
+                print(f"[daemon] 第 {cycle['cycle']} 轮完成：{cycle['outcome']}，耗时 {time.perf_counter() - started:.1f}s")
+                # 常驻进程不会退出，每轮刷新一次指标文件
+                metrics.write_run_outputs(final=False)
+                if once or self.stop_event.is_set():
+                    self._save_state(cycle, None)
+                    break
+                delay = max(self.interval_sec + random.uniform(-self.jitter_sec, self.jitter_sec), 0)
+                next_run_at = datetime.now(timezone.utc) + timedelta(seconds=delay)
+                self._save_state(cycle, next_run_at)
+                print(f"[daemon] 下一轮预计 {next_run_at.astimezone().strftime('%m-%d %H:%M:%S')}")
+                try:
+                    await asyncio.wait_for(self.stop_event.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            if self.client is not None:
+                await self.client.stop()
+                print("✅ RPC客户端已停止")
+
+    def request_stop(self) -> None:
+        print("[daemon] 收到停止信号，当前步骤完成后退出")
+        self.stop_event.set()
+
+
+async def main(args: argparse.Namespace) -> None:
+    steps = [s for s in STEPS if s not in set(args.skip or [])]
+    keep_pages_warm(not args.close_pages)
+    daemon = SyncDaemon(steps, args.interval, args.jitter, ai_worker=args.ai_worker, cookies_path=args.cookies)
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        try:
+            loop.add_signal_handler(sig, daemon.request_stop)
+        except (NotImplementedError, RuntimeError):
+            # Windows 不支持，Ctrl-C 直接中断
+            pass
+    print(f"🚀 常驻同步启动：步骤 {','.join(steps)}，间隔 {args.interval:g}s（±{args.jitter:g}s）")
+    await daemon.run(once=args.once)
+
+
+if __name__ == "__main__":
+    metrics.start_run("sync_daemon")
+    profiling.start("sync_daemon")
+    parser = argparse.ArgumentParser(description="常驻进程：复用一个 RPC 客户端，定时增量同步收藏并跑完后续阶段")
+    parser.add_argument("--interval", type=float, default=SYNC_INTERVAL_SEC, help="两轮同步的间隔（秒）")
+    parser.add_argument("--jitter", type=float, default=SYNC_JITTER_SEC, help="间隔的随机抖动（秒）")
+    parser.add_argument("--once", action="store_true", help="只跑一轮就退出（配合 cron 使用）")
+    parser.add_argument("--skip", action="append", choices=STEPS, help="跳过某个步骤，可重复")
+    parser.add_argument("--ai-worker", action="store_true", help="AI 阶段以 --worker 模式运行，可与其他 worker 协作")
+    parser.add_argument("--close-pages", action="store_true", help="每次调用后仍关闭浏览器页面（默认保持页面常驻）")
+    parser.add_argument("--cookies", default=None, help="05 下载图片与 10 获取作者信息使用的 cookies JSON 路径")
+    asyncio.run(main(parser.parse_args()))
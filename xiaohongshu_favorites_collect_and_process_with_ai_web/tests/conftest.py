@@ -0,0 +1,20 @@
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+# 测试以项目根目录为导入根，与各阶段脚本一致（utils 为命名空间包）
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from utils import file_utils  # noqa: E402
+
+
+@pytest.fixture
+def project_root(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Path:
+    """把 file_utils 的项目根目录指向临时目录，*_with_project_root 系列函数不会碰到真实 data/"""
+    (tmp_path / "data").mkdir()
+    monkeypatch.setattr(file_utils, "PROJECT_ROOT", tmp_path)
+    return tmp_path
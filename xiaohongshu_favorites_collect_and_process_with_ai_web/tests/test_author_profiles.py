@@ -0,0 +1,91 @@
+import json
+
+import pytest
+
+from utils.author_profiles import (
+    PROFILE_ERROR_TTL_SEC,
+    PROFILE_TTL_SEC,
+    make_profile_record,
+    merge_failed_record,
+    needs_refresh,
+    parse_count,
+    parse_profile_html,
+    pending_authors,
+)
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("1234", 1234),
+    ("1,234", 1234),
+    ("1.2万", 12000),
+    ("3w", 30000),
+    ("2.5亿", 250000000),
+    ("10+", 10),
+    (" 88 ", 88),
+    (42, 42),
+    (3.0, 3),
+    ("", None),
+    ("abc", None),
+    ("1.2千", None),
+    (None, None),
+    (True, None),
+])
+def test_parse_count(value, expected) -> None:
+    assert parse_count(value) == expected
+
+
+def _page(state_js: str) -> str:
+    return f"<html><script>window.__INITIAL_STATE__={state_js}</script></html>"
+
+
+def _state(interactions, nickname="作者") -> str:
+    return json.dumps({"user": {"userPageData": {
+        "basicInfo": {"nickname": nickname},
+        "interactions": interactions,
+    }}}, ensure_ascii=False)
+
+
+def test_parse_profile_html_reads_counts() -> None:
+    html = _page(_state([
+        {"type": "follows", "count": "12"},
+        {"type": "fans", "count": "1.5万"},
+        {"type": "interaction", "count": "20万"},
+    ]))
+    assert parse_profile_html(html) == {"nickname": "作者", "fans": 15000, "follows": 12, "interaction": 200000}
+
+
+def test_parse_profile_html_accepts_js_undefined() -> None:
+    state = _state([{"type": "fans", "count": "7"}]).replace('"nickname": "作者"', '"nickname": undefined')
+    state = state.replace('"interactions"', '"tags": [undefined, 1], "interactions"')
+    assert parse_profile_html(_page(state)) == {"nickname": None, "fans": 7, "follows": None, "interaction": None}
+
+
+@pytest.mark.parametrize("html", [
+    "",
+    "<html>请先登录</html>",
+    _page("{not json}"),
+    _page(_state([{"type": "follows", "count": "12"}])),
+    _page(json.dumps({"user": {"userPageData": []}})),
+])
+def test_parse_profile_html_rejects_pages_without_fans(html) -> None:
+    assert parse_profile_html(html) is None
+
+
+def test_failed_fetch_keeps_previous_counts() -> None:
+    ok = make_profile_record({"nickname": "n", "fans": 10, "follows": 1, "interaction": 2}, None, now=100)
+    assert ok["expires_at"] == 100 + PROFILE_TTL_SEC
+    failed = make_profile_record(None, "HTTP 403", now=200)
+    assert failed == {"error": "HTTP 403", "fetched_at": 200, "expires_at": 200 + PROFILE_ERROR_TTL_SEC}
+    merged = merge_failed_record(ok, failed)
+    assert merged["fans"] == 10 and merged["error"] == "HTTP 403" and merged["expires_at"] == failed["expires_at"]
+    assert merge_failed_record(None, failed) == failed
+
+
+def test_pending_authors_skips_fresh_cache() -> None:
+    profiles = {
+        "fresh": {"fans": 1, "expires_at": 1000},
+        "stale": {"fans": 1, "expires_at": 10},
+    }
+    authors = [("fresh", None), ("stale", "t1"), ("new", "t2")]
+    assert list(pending_authors(authors, profiles, now=500)) == [("stale", "t1"), ("new", "t2")]
+    assert needs_refresh(None) is True
@@ -0,0 +1,206 @@
+import json
+import os
+from pathlib import Path
+
+import pytest
+
+import compact_data
+from compact_data import Compactor, _dedupe_last
+from utils import image_utils
+from utils.image_utils import image_blob_path, save_note_image_manifest
+
+DIGEST_A = "a" * 64
+DIGEST_B = "b" * 64
+DIGEST_C = "c" * 64
+DAY = 86400
+
+
+@pytest.fixture
+def data_dir(project_root: Path, monkeypatch: pytest.MonkeyPatch) -> Path:
+    """compact_data 与 image_utils 在导入时就算好了各目录，逐个指向临时目录"""
+    data = project_root / "data"
+    monkeypatch.setattr(compact_data, "PROJECT_ROOT", project_root)
+    for module in (compact_data, image_utils):
+        monkeypatch.setattr(module, "IMAGE_BLOBS_DIR", data / "blobs")
+        monkeypatch.setattr(module, "IMAGE_MANIFESTS_DIR", data / "image_manifests")
+        monkeypatch.setattr(module, "DOWNLOAD_LOG_PATH", data / "download_manifest.jsonl")
+    monkeypatch.setattr(compact_data, "OCR_INPUTS_DIR", data / "ocr_inputs")
+    monkeypatch.setattr(compact_data, "THUMBS_DIR", data / "thumbs")
+    monkeypatch.setattr(compact_data, "IMAGES_DIR", data / "images")
+    monkeypatch.setattr(compact_data, "PAYLOAD_STORE_DIR", data / "payloads")
+    return data
+
+
+def _write_json(path: Path, data) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(data, ensure_ascii=False), encoding="utf-8")
+
+
+def _put_blob(digest: str, age_sec: float = 2 * DAY) -> str:
+    path = image_blob_path(digest, ".jpg")
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(b"x" * 100)
+    mtime = os.path.getmtime(path) - age_sec
+    os.utime(path, (mtime, mtime))
+    return path
+
+
+def _brief(data_dir: Path, compactor: Compactor) -> None:
+    # n1 正常；n2 软删除已超过保留期
+    _write_json(data_dir / "favorite_notes_brief.json", {"data": [
+        {"id": "n1"},
+        {"id": "n2", "deleted": True, "deleted_at": compactor.now - 60 * DAY},
+    ]})
+
+
+def test_dedupe_last_keeps_last_value_at_first_position() -> None:
+    items = [{"id": "a", "v": 1}, {"id": "b"}, {"v": "no-id"}, {"id": "a", "v": 2}]
+    out, dropped = _dedupe_last(items, lambda it: it.get("id"))
+    assert dropped == 1
+    assert out == [{"id": "a", "v": 2}, {"id": "b"}, {"v": "no-id"}]
+
+
+def test_expired_tombstone_is_not_live(data_dir: Path) -> None:
+    c = Compactor()
+    _brief(data_dir, c)
+    c.collect_live_notes()
+    assert c.live_ids == {"n1"}
+    assert c.expired_ids == {"n2"}
+
+
+def test_mark_sweep_keeps_only_referenced_blobs(data_dir: Path) -> None:
+    c = Compactor(grace_sec=3600)
+    _brief(data_dir, c)
+    save_note_image_manifest("n1", [{"index": 0, "url": "u1", "sha256": DIGEST_A, "ext": ".jpg"}])
+    save_note_image_manifest("n2", [{"index": 0, "url": "u2", "sha256": DIGEST_B, "ext": ".jpg"}])
+    kept, dead, recent = _put_blob(DIGEST_A), _put_blob(DIGEST_B), _put_blob(DIGEST_C, age_sec=0)
+    _write_json(data_dir / "image_phash.json", {DIGEST_A: "0" * 16, DIGEST_B: "f" * 16})
+
+    c.collect_live_notes()
+    c.compact_images()
+    c.sweep_image_derivatives()
+
+    assert c.live_digests == {DIGEST_A}
+    assert not os.path.exists(image_utils.note_image_manifest_path("n2"))
+    assert os.path.exists(kept)
+    assert not os.path.exists(dead)
+    # 刚写入的 blob 可能属于正在运行的阶段，宽限期内不清除
+    assert os.path.exists(recent)
+    assert json.loads((data_dir / "image_phash.json").read_text()) == {DIGEST_A: "0" * 16}
+    assert c.report["blobs"]["files"] == 1
+
+
+def test_dry_run_only_reports(data_dir: Path) -> None:
+    c = Compactor(dry_run=True)
+    _brief(data_dir, c)
+    save_note_image_manifest("n1", [{"index": 0, "url": "u1", "sha256": DIGEST_A, "ext": ".jpg"}])
+    dead = _put_blob(DIGEST_B)
+    c.collect_live_notes()
+    c.compact_images()
+    c.sweep_image_derivatives()
+    assert os.path.exists(dead)
+    assert c.report["blobs"] == {"before": 100, "after": 0, "items": 0, "files": 1}
+
+
+def test_ocr_results_keep_duplicate_of_targets(data_dir: Path) -> None:
+    c = Compactor()
+    c.live_digests = {DIGEST_A}
+    d = "d" * 64
+    _write_json(data_dir / "ocr_results.json", {
+        # A 的图片仍在，结果指向 B，B 又指向 C：B、C 的图片已删除也要保留
+        DIGEST_A: {"success": True, "duplicate_of": DIGEST_B},
+        DIGEST_B: {"success": True, "duplicate_of": DIGEST_C},
+        DIGEST_C: {"success": True, "text": "原文", "payload_ref": "p1"},
+        d: {"success": True, "text": "无人引用", "payload_ref": "p2"},
+    })
+    c.compact_ocr_results()
+    results = json.loads((data_dir / "ocr_results.json").read_text(encoding="utf-8"))
+    assert set(results) == {DIGEST_A, DIGEST_B, DIGEST_C}
+    assert c.payload_refs == {"p1"}
+
+
+def test_download_log_keeps_last_record_and_drops_checkpoint(data_dir: Path) -> None:
+    c = Compactor()
+    c.live_ids = {"n1"}
+    lines = [
+        {"note_id": "n1", "index": 0, "status": "failed"},
+        {"note_id": "n2", "index": 0, "status": "ok"},
+        {"note_id": "n1", "index": 0, "status": "ok"},
+        {"note_id": "n1", "index": 1, "status": "ok"},
+    ]
+    log = data_dir / "download_manifest.jsonl"
+    log.write_text("".join(json.dumps(r) + "\n" for r in lines) + '{"note_id": "n1", "ind', encoding="utf-8")
+    _write_json(data_dir / "ocr_checkpoint.json", {"offset": 123})
+
+    c.compact_download_log()
+
+    records = [json.loads(line) for line in log.read_text(encoding="utf-8").splitlines()]
+    assert records == [lines[2], lines[3]]
+    # 重写后字节偏移失效，06 下次从头扫描
+    assert not (data_dir / "ocr_checkpoint.json").exists()
+
+
+def test_reclaimed_bytes_metric_is_registered_counter() -> None:
+    from utils.metrics import METRICS
+
+    assert METRICS["compact_reclaimed_bytes_total"][0] == "counter"
+
+
+def _put_payload(data_dir: Path, ref: str) -> Path:
+    path = data_dir / "payloads" / ref[:2] / f"{ref}.json"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text("{}", encoding="utf-8")
+    mtime = os.path.getmtime(path) - 2 * DAY
+    os.utime(path, (mtime, mtime))
+    return path
+
+
+def _payload_sweep(data_dir: Path, ai_results, ocr_results) -> Compactor:
+    c = Compactor()
+    if ai_results is not None:
+        (data_dir / "favorite_notes_ai_processed.json").write_text(ai_results, encoding="utf-8")
+    if ocr_results is not None:
+        (data_dir / "ocr_results.json").write_text(ocr_results, encoding="utf-8")
+    c.compact_ai_results()
+    c.compact_ocr_results()
+    c.sweep_payloads()
+    return c
+
+
+AI_RESULTS = json.dumps({"data": [{"note_id": "n1", "tasks": {"summary": {"ok": True, "raw_ref": "r1"}}}]})
+OCR_RESULTS = json.dumps({DIGEST_A: {"success": True, "payload_ref": "r2"}})
+
+
+def test_payload_sweep_keeps_referenced_payloads(data_dir: Path) -> None:
+    referenced = [_put_payload(data_dir, "r1"), _put_payload(data_dir, "r2")]
+    orphan = _put_payload(data_dir, "r3")
+    _payload_sweep(data_dir, AI_RESULTS, OCR_RESULTS)
+    assert all(p.exists() for p in referenced)
+    assert not orphan.exists()
+
+
+@pytest.mark.parametrize("ai_results, ocr_results", [
+    ('{"data": [{"note_id": "n1"', OCR_RESULTS),
+    (AI_RESULTS, '{"' + DIGEST_A),
+    (None, OCR_RESULTS),
+    (AI_RESULTS, None),
+])
+def test_payload_sweep_skipped_when_a_ref_source_is_unreadable(data_dir: Path, ai_results, ocr_results) -> None:
+    payloads = [_put_payload(data_dir, ref) for ref in ("r1", "r2", "r3")]
+    c = _payload_sweep(data_dir, ai_results, ocr_results)
+    assert c.unread_ref_sources
+    assert all(p.exists() for p in payloads)
+
+
+def test_unreadable_manifest_skips_hash_sweep(data_dir: Path) -> None:
+    c = Compactor()
+    _brief(data_dir, c)
+    save_note_image_manifest("n1", [{"index": 0, "url": "u1", "sha256": DIGEST_A, "ext": ".jpg"}])
+    (data_dir / "image_manifests" / "n3.json").write_text('{"note_id": "n3", "ima', encoding="utf-8")
+    blob = _put_blob(DIGEST_B)
+    c.collect_live_notes()
+    c.compact_images()
+    c.sweep_image_derivatives()
+    assert c.live_digests is None
+    assert os.path.exists(blob)
@@ -0,0 +1,112 @@
+import importlib
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+from utils import image_utils
+from utils.image_utils import append_download_records, download_log_size, iter_download_records
+
+
+@pytest.fixture
+def log_path(project_root: Path, monkeypatch: pytest.MonkeyPatch) -> Path:
+    path = project_root / "data" / "download_manifest.jsonl"
+    monkeypatch.setattr(image_utils, "DOWNLOAD_LOG_PATH", path)
+    return path
+
+
+@pytest.fixture
+def ocr_stage(log_path: Path, monkeypatch: pytest.MonkeyPatch):
+    """06 依赖 client_sdk，用 fake_rpc 的替身导入；测试结束后恢复 sys.modules"""
+    from utils import fake_rpc
+
+    for name in ("client_sdk", "client_sdk.params", "client_sdk.rpc_client"):
+        monkeypatch.setitem(sys.modules, name, None)
+    fake_rpc.install()
+    return importlib.import_module("06_ocr_images")
+
+
+def _record(note_id: str, index: int, status: str = "ok", digest: str = "a" * 64):
+    return {"note_id": note_id, "index": index, "url": f"https://img/{note_id}/{index}.jpg",
+            "sha256": digest, "ext": ".jpg", "status": status}
+
+
+def test_missing_log_is_empty(log_path: Path) -> None:
+    assert download_log_size() == 0
+    assert list(iter_download_records()) == []
+
+
+def test_offsets_resume_after_last_read_line(log_path: Path) -> None:
+    append_download_records([_record("n1", 0), _record("n1", 1)])
+    first = list(iter_download_records())
+    assert [r["index"] for r, _ in first] == [0, 1]
+    end = first[-1][1]
+    assert end == download_log_size()
+
+    append_download_records([_record("n2", 0)])
+    assert [(r["note_id"], pos) for r, pos in iter_download_records(end)] == [("n2", download_log_size())]
+    assert list(iter_download_records(download_log_size())) == []
+
+
+def test_partial_trailing_line_is_left_for_next_read(log_path: Path) -> None:
+    append_download_records([_record("n1", 0)])
+    size = download_log_size()
+    line = json.dumps(_record("n2", 0)).encode("utf-8")
+    with open(log_path, "ab") as f:
+        f.write(line[:10])
+    assert [pos for _, pos in iter_download_records()] == [size]
+
+    with open(log_path, "ab") as f:
+        f.write(line[10:] + b"\n")
+    assert [r["note_id"] for r, _ in iter_download_records(size)] == ["n2"]
+
+
+def test_malformed_line_is_skipped_but_consumed(log_path: Path) -> None:
+    log_path.write_bytes(b"{broken\n" + json.dumps(_record("n1", 0)).encode("utf-8") + b"\n")
+    assert [(r["note_id"], pos) for r, pos in iter_download_records()] == [("n1", download_log_size())]
+
+
+def test_utf8_offsets_are_bytes(log_path: Path) -> None:
+    append_download_records([{**_record("n1", 0), "error": "下载失败"}])
+    (_, pos), = iter_download_records()
+    assert pos == len(log_path.read_bytes())
+
+
+def test_checkpoint_round_trip(project_root: Path, ocr_stage) -> None:
+    assert ocr_stage._load_checkpoint() is None
+    ocr_stage._save_checkpoint(123)
+    assert ocr_stage._load_checkpoint() == 123
+    (project_root / ocr_stage.CHECKPOINT_RELA_PATH).write_text('{"download_log_offset": -1}', encoding="utf-8")
+    assert ocr_stage._load_checkpoint() is None
+
+
+def test_collect_new_images_reads_only_new_successful_records(log_path: Path, ocr_stage) -> None:
+    append_download_records([_record("n1", 0, digest="a" * 64)])
+    _, offset = ocr_stage.collect_new_images(0)
+
+    append_download_records([
+        _record("n2", 0, digest="b" * 64),
+        _record("n2", 1, status="failed", digest=""),
+        _record("n3", 2, status="imported", digest="b" * 64),
+    ])
+    unique, end = ocr_stage.collect_new_images(offset)
+    assert end == download_log_size()
+    assert list(unique) == ["b" * 64]
+    assert unique["b" * 64]["refs"] == [("n2", "0.jpg", 0), ("n3", "2.jpg", 2)]
+    assert ocr_stage.collect_new_images(end) == ({}, end)
+
+
+def test_failed_ocr_is_retried_until_attempt_limit(ocr_stage) -> None:
+    assert ocr_stage._needs_ocr(None)
+    assert not ocr_stage._needs_ocr({"success": True, "text": "x"})
+    # 旧版失败记录没有 attempts，按失败过一次计
+    assert ocr_stage._needs_ocr({"success": False, "error": "boom"})
+
+    entry = None
+    for attempt in range(1, ocr_stage.OCR_MAX_ATTEMPTS + 1):
+        assert ocr_stage._needs_ocr(entry)
+        entry = ocr_stage._failure_entry(entry, "boom", "/tmp/x.png")
+        assert entry["success"] is False
+        assert entry["attempts"] == attempt
+    assert not ocr_stage._needs_ocr(entry)
@@ -0,0 +1,119 @@
+import json
+import multiprocessing
+import os
+import stat
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+from utils.file_utils import (
+    UNCHANGED,
+    atomic_write_json,
+    file_lock,
+    read_json_with_project_root,
+    update_json_with_project_root,
+    write_json_with_project_root,
+)
+
+
+def _leftover_tmp(directory: Path):
+    return [p.name for p in directory.iterdir() if p.name.endswith(".tmp")]
+
+
+def test_atomic_write_replaces_content_and_keeps_mode(tmp_path: Path) -> None:
+    target = tmp_path / "out.json"
+    target.write_text("{}", encoding="utf-8")
+    os.chmod(target, 0o644)
+    atomic_write_json(str(target), {"a": "中文"}, indent=None)
+    assert json.loads(target.read_text(encoding="utf-8")) == {"a": "中文"}
+    # mkstemp 默认 0600，替换后应沿用目标原有权限
+    assert stat.S_IMODE(os.stat(target).st_mode) == 0o644
+    assert _leftover_tmp(tmp_path) == []
+
+
+def test_atomic_write_failure_keeps_original(tmp_path: Path) -> None:
+    target = tmp_path / "out.json"
+    target.write_text('{"keep": true}', encoding="utf-8")
+    with pytest.raises(TypeError):
+        atomic_write_json(str(target), {"bad": object()})
+    assert json.loads(target.read_text(encoding="utf-8")) == {"keep": True}
+    assert _leftover_tmp(tmp_path) == []
+
+
+def test_write_and_read_with_project_root(project_root: Path) -> None:
+    write_json_with_project_root("data/x.json", {"count": 1})
+    assert read_json_with_project_root("data/x.json") == {"count": 1}
+
+
+def test_update_uses_default_only_when_missing(project_root: Path) -> None:
+    out = update_json_with_project_root("data/log.json", lambda d: d.append(1), default=list)
+    assert out == [1]
+    update_json_with_project_root("data/log.json", lambda d: d.append(2), default=list)
+    assert read_json_with_project_root("data/log.json") == [1, 2]
+
+
+def test_update_returning_unchanged_skips_write(project_root: Path) -> None:
+    target = project_root / "data" / "same.json"
+    write_json_with_project_root("data/same.json", {"count": 1})
+    before = target.stat().st_mtime_ns
+    time.sleep(0.01)
+    assert update_json_with_project_root("data/same.json", lambda d: UNCHANGED) == {"count": 1}
+    assert target.stat().st_mtime_ns == before
+
+
+def test_update_missing_without_default_raises(project_root: Path) -> None:
+    with pytest.raises(FileNotFoundError):
+        update_json_with_project_root("data/none.json", lambda d: d)
+
+
+@pytest.mark.parametrize("content", ["{\"data\": [1, 2", "", "not json"])
+def test_update_refuses_to_overwrite_corrupt_file(project_root: Path, content: str) -> None:
+    path = project_root / "data" / "details.json"
+    path.write_text(content, encoding="utf-8")
+    with pytest.raises(ValueError):
+        update_json_with_project_root("data/details.json", lambda d: d, default=dict)
+    assert path.read_text(encoding="utf-8") == content
+
+
+def test_exclusive_lock_blocks_other_writer(tmp_path: Path) -> None:
+    target = str(tmp_path / "state.json")
+    atomic_write_json(target, [], indent=None)
+    entered = threading.Event()
+    order = []
+
+    def _writer() -> None:
+        entered.set()
+        update_json_with_project_root(target, lambda d: d.append("second"))
+        order.append("second")
+
+    with file_lock(target):
+        t = threading.Thread(target=_writer)
+        t.start()
+        entered.wait()
+        time.sleep(0.2)
+        # 锁未释放前另一写入方不能完成
+        order.append("first")
+    t.join(timeout=5)
+    assert order == ["first", "second"]
+    assert json.loads(Path(target).read_text(encoding="utf-8")) == ["second"]
+
+
+def _increment_many(path: str, times: int) -> None:
+    def _inc(data):
+        data["n"] += 1
+
+    for _ in range(times):
+        update_json_with_project_root(path, _inc, default=lambda: {"n": 0}, indent=None)
+
+
+def test_concurrent_updates_from_processes_are_not_lost(tmp_path: Path) -> None:
+    # 绝对路径时 os.path.join 忽略项目根目录，子进程无需继承 monkeypatch
+    target = str(tmp_path / "counter.json")
+    procs = [multiprocessing.Process(target=_increment_many, args=(target, 25)) for _ in range(4)]
+    for p in procs:
+        p.start()
+    for p in procs:
+        p.join(timeout=30)
+    assert json.loads(Path(target).read_text(encoding="utf-8")) == {"n": 100}
@@ -0,0 +1,105 @@
+import io
+import json
+from pathlib import Path
+
+import pytest
+
+from utils import file_utils
+from utils.file_utils import _ChunkedJsonScanner, iter_json_items_with_project_root
+
+ITEMS = [
+    1.5,
+    -0.25,
+    2e5,
+    1.25e-3,
+    123456789,
+    "跨块的字符串，含转义 \" 与 \\ 以及 emoji 😀",
+    {"nested": {"list": [1, 2.5, {"deep": [True, False, None]}], "text": "嵌套对象"}},
+    [[], {}, [3.75e10]],
+    True,
+    None,
+]
+
+
+def _scan(text: str, chunk_size: int, key: str = "data"):
+    scanner = _ChunkedJsonScanner(io.StringIO(text), chunk_size=chunk_size)
+    if scanner.peek() == "{":
+        assert scanner.seek_key(key)
+    return list(scanner.iter_array())
+
+
+@pytest.mark.parametrize("chunk_size", range(1, 41))
+def test_scanner_handles_any_chunk_boundary(chunk_size: int) -> None:
+    # 逐个块大小遍历，数字 / 指数 / 字符串 / 嵌套对象的每个位置都会落在块边界上
+    text = json.dumps({"meta": {"skip": [1.5, "x"]}, "data": ITEMS}, ensure_ascii=False)
+    assert _scan(text, chunk_size) == ITEMS
+
+
+@pytest.mark.parametrize("split", ["1.|5", "1e|5", "1.5e|-3", "-|7", "12|34.5|6"])
+def test_scanner_number_split_at_boundary(split: str) -> None:
+    head, *rest = split.split("|")
+    number = "".join([head, *rest])
+    # 让第一个块恰好在 head 之后结束
+    prefix = '{"data": ["' + "x" * 20 + '", '
+    text = prefix + number + ", 0]}"
+    scanner = _ChunkedJsonScanner(io.StringIO(text), chunk_size=len(prefix) + len(head))
+    assert scanner.seek_key("data")
+    assert list(scanner.iter_array()) == ["x" * 20, json.loads(number), 0]
+
+
+def test_scanner_top_level_array_and_empty() -> None:
+    assert _scan("[ ]", 1) == []
+    assert _scan("[1, 2.5]", 3) == [1, 2.5]
+    scanner = _ChunkedJsonScanner(io.StringIO('{"other": [1]}'), chunk_size=4)
+    assert scanner.seek_key("data") is False
+
+
+class _CountingReader(io.StringIO):
+    def __init__(self, text: str) -> None:
+        super().__init__(text)
+        self.reads = 0
+
+    def read(self, size: int = -1) -> str:
+        self.reads += 1
+        return super().read(size)
+
+
+def test_scanner_large_item_reads_geometrically() -> None:
+    # 单个元素长达数百个块：缓冲区按倍数增长，读取（及重新解析）次数只与块数的对数相当
+    big = {"text": "长" * 20000, "list": list(range(2000))}
+    text = json.dumps({"data": [1, big, 2]}, ensure_ascii=False)
+    reader = _CountingReader(text)
+    scanner = _ChunkedJsonScanner(reader, chunk_size=64)
+    assert scanner.seek_key("data")
+    assert list(scanner.iter_array()) == [1, big, 2]
+    assert len(text) // 64 > 300
+    assert reader.reads < 20
+
+
+def test_scanner_rejects_malformed_array() -> None:
+    with pytest.raises(ValueError):
+        _scan('{"data": [1 2]}', 4)
+
+
+@pytest.fixture
+def no_ijson(monkeypatch: pytest.MonkeyPatch) -> None:
+    # 默认环境没有 ijson，走标准库扫描器
+    monkeypatch.setattr(file_utils, "ijson", None)
+
+
+def test_iter_items_float_at_default_chunk_boundary(project_root: Path, no_ijson: None) -> None:
+    # 复现：浮点数被默认 64K 块大小截断在小数点之后
+    for pad in range(file_utils.STREAM_CHUNK_SIZE - 24, file_utils.STREAM_CHUNK_SIZE - 8):
+        data = {"data": ["x" * pad, 1.5, 2e5]}
+        (project_root / "data" / "notes.json").write_text(json.dumps(data), encoding="utf-8")
+        assert list(iter_json_items_with_project_root("data/notes.json")) == data["data"]
+
+
+def test_iter_items_accepts_list_dict_and_non_array(project_root: Path, no_ijson: None) -> None:
+    path = project_root / "data" / "notes.json"
+    path.write_text(json.dumps([{"id": "a"}, {"id": "b"}]), encoding="utf-8")
+    assert [it["id"] for it in iter_json_items_with_project_root("data/notes.json")] == ["a", "b"]
+    path.write_text(json.dumps({"count": 0, "data": None}), encoding="utf-8")
+    assert list(iter_json_items_with_project_root("data/notes.json")) == []
+    path.write_text("{}", encoding="utf-8")
+    assert list(iter_json_items_with_project_root("data/notes.json")) == []
@@ -0,0 +1,77 @@
+import time
+
+from utils.lease_utils import LeaseStore
+
+LEASE_PATH = "data/leases.json"
+KEYS = ["a", "b", "c"]
+
+
+def _always_pending(key: str) -> bool:
+    return True
+
+
+def _store(worker_id: str, **kwargs) -> LeaseStore:
+    return LeaseStore(LEASE_PATH, worker_id=worker_id, **kwargs)
+
+
+def test_claim_in_order_and_skip_leases_held_by_others(project_root) -> None:
+    w1, w2 = _store("w1"), _store("w2")
+    assert w1.claim(KEYS, _always_pending) == ("a", 0)
+    assert w2.claim(KEYS, _always_pending) == ("b", 1)
+    w1.release("a")
+    assert w1.claim(KEYS, lambda key: key != "a") == ("c", 1)
+
+
+def test_expired_lease_is_taken_over_and_counted(project_root) -> None:
+    w1, w2 = _store("w1", ttl_sec=0.01), _store("w2")
+    assert w1.claim(["a"], _always_pending) == ("a", 0)
+    time.sleep(0.02)
+    assert w2.claim(["a"], _always_pending) == ("a", 0)
+    assert w2.snapshot()["a"]["attempts"] == 2
+    # 被接管后原 worker 续约失败
+    assert w1.heartbeat("a") is False
+    assert w2.heartbeat("a") is True
+
+
+def test_done_release_removes_lease(project_root) -> None:
+    w1 = _store("w1")
+    w1.claim(["a"], _always_pending)
+    w1.release("a")
+    assert w1.snapshot() == {}
+
+
+def test_failed_release_is_final_for_this_run(project_root) -> None:
+    # 结果仍未完成（is_pending 一直为 True）时，本 worker 不会再次认领同一条
+    w1 = _store("w1")
+    assert w1.claim(["a"], _always_pending) == ("a", 0)
+    w1.release("a", done=False)
+    assert w1.claim(["a"], _always_pending) == (None, 0)
+    lease = w1.snapshot()["a"]
+    assert lease["attempts"] == 1 and lease["expires_at"] == 0
+
+
+def test_failed_attempts_accumulate_across_runs_until_max(project_root) -> None:
+    for run in range(3):
+        worker = _store(f"run{run}", max_attempts=3)
+        assert worker.claim(["a"], _always_pending) == ("a", 0)
+        worker.release("a", done=False)
+    assert _store("run3", max_attempts=3).claim(["a"], _always_pending) == (None, 0)
+    assert _store("run3").snapshot()["a"]["attempts"] == 3
+
+
+def test_completed_key_is_not_claimed_and_stale_lease_is_dropped(project_root) -> None:
+    w1 = _store("w1")
+    w1.claim(["a"], _always_pending)
+    w1.release("a", done=False)
+    # 之后由其他途径完成：认领时清理残留的租约
+    assert _store("w2").claim(["a"], lambda key: False) == (None, 0)
+    assert w1.snapshot() == {}
+
+
+def test_release_of_lease_taken_over_by_another_worker_keeps_it(project_root) -> None:
+    w1, w2 = _store("w1", ttl_sec=0.01), _store("w2")
+    w1.claim(["a"], _always_pending)
+    time.sleep(0.02)
+    w2.claim(["a"], _always_pending)
+    w1.release("a")
+    assert w2.snapshot()["a"]["worker"] == "w2"
@@ -0,0 +1,67 @@
+from typing import List
+
+from utils.page_session import PageSession
+
+
+def _run(session: PageSession, outcomes: List[bool], seconds: float = 1.0) -> List[bool]:
+    """按顺序执行若干次调用，返回每次 begin() 给出的 close_page_when_task_finished"""
+    closes = []
+    for ok in outcomes:
+        closes.append(session.begin())
+        session.end(ok, seconds)
+    return closes
+
+
+def test_page_recycled_after_max_calls() -> None:
+    s = PageSession("chat", max_calls=3)
+    assert _run(s, [True] * 7) == [False, False, True, False, False, True, False]
+    assert s.pages == 3
+    assert s.recycled == {"max_calls": 2}
+    assert s.page_open and s.calls_on_page == 1
+
+
+def test_failed_call_gets_one_more_use_then_recycled() -> None:
+    s = PageSession("chat", max_calls=0, max_errors=5)
+    assert _run(s, [True, False, True, True]) == [False, False, True, False]
+    assert s.recycled == {"error": 1}
+    # 回收后的下一次调用在新页面上
+    assert s.pages == 2
+
+
+def test_consecutive_errors_disable_reuse() -> None:
+    s = PageSession("ocr", max_calls=0, max_errors=2)
+    assert _run(s, [False, False]) == [False, True]
+    assert s.disabled
+    assert _run(s, [True, True]) == [True, True]
+    assert s.summary()["reuse_disabled"] is True
+    # 第 2 次仍复用第 1 次失败的页面并将其回收，禁用后每次都是新页面
+    assert s.pages == 3
+    assert s.recycled == {"error": 1}
+
+
+def test_reuse_false_closes_without_counting_recycle() -> None:
+    s = PageSession("chat")
+    assert s.begin(reuse=False) is True
+    s.end(True, 1.0)
+    assert s.recycled == {} and not s.page_open
+
+
+def test_summary_estimates_saved_time() -> None:
+    s = PageSession("chat", max_calls=3)
+    for seconds in (5.0, 1.0, 2.0, 7.0):
+        s.begin()
+        s.end(True, seconds)
+    summary = s.summary()
+    # 第 1、4 次为新页面（平均 6s），第 2、3 次复用（平均 1.5s）
+    assert summary["calls"] == 4 and summary["pages"] == 2
+    assert summary["cold_mean_seconds"] == 6.0
+    assert summary["warm_mean_seconds"] == 1.5
+    assert summary["saved_seconds_est"] == 9.0
+
+
+def test_summary_without_warm_calls() -> None:
+    s = PageSession("chat")
+    s.begin(reuse=False)
+    s.end(True, 2.0)
+    summary = s.report()
+    assert summary["warm_mean_seconds"] is None and summary["saved_seconds_est"] is None
@@ -0,0 +1,83 @@
+import random
+from pathlib import Path
+
+import pytest
+
+from utils.phash_utils import (
+    BKTree,
+    compute_phash,
+    hamming_distance,
+    load_phash_cache,
+    save_phash_cache,
+)
+
+
+def _random_hashes(n: int, seed: int = 7):
+    rng = random.Random(seed)
+    base = [rng.getrandbits(64) for _ in range(n // 4)]
+    # 混入与已有值只差几位的近似值，查询时才有命中
+    near = [b ^ (1 << rng.randrange(64)) ^ (1 << rng.randrange(64)) for b in base for _ in range(3)]
+    return base + near
+
+
+@pytest.mark.parametrize("radius", [0, 3, 10])
+def test_bktree_search_matches_brute_force(radius: int) -> None:
+    values = _random_hashes(400)
+    tree = BKTree()
+    for i, v in enumerate(values):
+        tree.add(v, f"k{i}")
+    assert len(tree) == len(values)
+
+    rng = random.Random(1)
+    for query in rng.sample(values, 20) + [rng.getrandbits(64) for _ in range(5)]:
+        expected = sorted((hamming_distance(query, v), f"k{i}") for i, v in enumerate(values)
+                          if hamming_distance(query, v) <= radius)
+        assert sorted(tree.search(query, radius)) == expected
+
+
+def test_bktree_nearest() -> None:
+    tree = BKTree()
+    assert tree.nearest(0, 10) is None
+    tree.add(0b1111, "far")
+    tree.add(0b0001, "near")
+    assert tree.nearest(0b0000, 4) == (1, "near")
+    assert tree.nearest(0b0001, 4) == (0, "near")
+    assert tree.nearest(1 << 40, 1) is None
+
+
+def test_phash_cache_round_trip(project_root) -> None:
+    assert load_phash_cache() == {}
+    save_phash_cache({"a" * 64: "00ff00ff00ff00ff"})
+    assert load_phash_cache() == {"a" * 64: "00ff00ff00ff00ff"}
+
+
+def _draw(path: Path, size=(240, 180), fmt="PNG", quality=95, flip=False) -> None:
+    Image = pytest.importorskip("PIL.Image")
+    ImageDraw = pytest.importorskip("PIL.ImageDraw")
+    im = Image.new("RGB", (240, 180), (250, 250, 250))
+    draw = ImageDraw.Draw(im)
+    for i in range(6):
+        draw.rectangle((10 + i * 36, 20 + i * 20, 40 + i * 36, 160), fill=(30 * i, 80, 200 - 25 * i))
+    draw.ellipse((60, 40, 160, 120), fill=(20, 20, 20))
+    if flip:
+        im = im.transpose(Image.FLIP_LEFT_RIGHT).transpose(Image.FLIP_TOP_BOTTOM)
+    im.resize(size).save(path, fmt, quality=quality)
+
+
+def test_phash_survives_recompression_and_resize(tmp_path: Path) -> None:
+    _draw(tmp_path / "orig.png")
+    _draw(tmp_path / "small.jpg", size=(120, 90), fmt="JPEG", quality=60)
+    _draw(tmp_path / "other.png", flip=True)
+    orig = compute_phash(str(tmp_path / "orig.png"))
+    small = compute_phash(str(tmp_path / "small.jpg"))
+    other = compute_phash(str(tmp_path / "other.png"))
+    assert orig is not None and orig.bit_length() <= 64
+    assert hamming_distance(orig, small) <= 6
+    assert hamming_distance(orig, other) > 16
+
+
+def test_phash_of_undecodable_file_is_none(tmp_path: Path) -> None:
+    pytest.importorskip("PIL")
+    bad = tmp_path / "bad.jpg"
+    bad.write_bytes(b"not an image")
+    assert compute_phash(str(bad)) is None
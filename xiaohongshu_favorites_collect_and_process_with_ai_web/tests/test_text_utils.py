@@ -0,0 +1,85 @@
+import json
+import re
+import shutil
+import subprocess
+from pathlib import Path
+
+import pytest
+
+from utils.text_utils import cjk_chars, is_cjk, tokenize
+
+SEARCH_INDEX_TS = Path(__file__).resolve().parent.parent / "frontend" / "server" / "utils" / "searchIndex.ts"
+
+SAMPLES = [
+    "",
+    "猫",
+    "小猫咪",
+    "iPhone 15 Pro 使用体验",
+    "ＡＢＣ１２３ 全角字母",
+    "日本語のテキスト",
+    "한국어 문장",
+    "mixed中文English混排123",
+    "emoji 😀 与标点，。！",
+    "a-b_c d.e",
+    "单",
+]
+
+
+def test_cjk_runs_become_bigrams() -> None:
+    assert tokenize("小猫咪") == ["小猫", "猫咪"]
+    # 单字片段保留单字
+    assert tokenize("猫") == ["猫"]
+    assert tokenize("a猫b") == ["a", "猫", "b"]
+
+
+def test_latin_words_lowercased_and_nfkc() -> None:
+    assert tokenize("iPhone 15 Pro") == ["iphone", "15", "pro"]
+    assert tokenize("ＡＢＣ１２３") == ["abc123"]
+    assert tokenize("a-b_c") == ["a", "b", "c"]
+
+
+def test_is_cjk() -> None:
+    assert is_cjk("中") and is_cjk("の") and is_cjk("한")
+    assert not is_cjk("a") and not is_cjk("，")
+
+
+def _ts_tokenizer_source() -> str:
+    """从 searchIndex.ts 中取出 CJK_RANGES / isCjk / tokenize，去掉类型标注后可由 node 直接执行"""
+    src = SEARCH_INDEX_TS.read_text(encoding="utf-8")
+    start = src.index("const CJK_RANGES")
+    end = src.index("/**", src.index("export function tokenize"))
+    code = src[start:end].replace("export function", "function")
+    code = re.sub(r":\s*(\[number, number\]\[\]|string\[\]|number|boolean|string)(?=\s*[=,){])", "", code)
+    return code.replace(")!", ")")
+
+
+@pytest.mark.skipif(shutil.which("node") is None, reason="需要 node 才能对比前端分词")
+def test_python_and_ts_tokenizers_agree() -> None:
+    script = _ts_tokenizer_source() + (
+        "\nconst samples = JSON.parse(require('fs').readFileSync(0, 'utf-8'));"
+        "\nprocess.stdout.write(JSON.stringify(samples.map(tokenize)));"
+    )
+    out = subprocess.run(["node", "-e", script], input=json.dumps(SAMPLES), capture_output=True,
+                         text=True, check=True, timeout=30)
+    assert json.loads(out.stdout) == [tokenize(s) for s in SAMPLES]
+
+
+def test_cjk_chars() -> None:
+    assert cjk_chars("小猫ａ猫，の") == {"小", "猫", "の"}
+    assert cjk_chars("") == set()
+
+
+def test_search_index_has_char_table(project_root) -> None:
+    import importlib
+
+    stage = importlib.import_module("07_build_search_index")
+    (project_root / "data" / "favorite_notes_details.json").write_text(json.dumps({"data": [
+        {"id": "n1", "title": "小猫咪", "desc": "apple"},
+        {"id": "n2", "title": "猫", "desc": ""},
+    ]}, ensure_ascii=False), encoding="utf-8")
+    index = stage.build_index()
+    assert index["version"] >= 2
+    assert index["chars"]["猫"] == [0, 1]
+    assert index["chars"]["咪"] == [0]
+    # 倒排表仍只有二元组与单字片段
+    assert "咪" not in index["postings"] and "猫咪" in index["postings"]
@@ -0,0 +1,77 @@
+from typing import Any, Dict, List, Optional
+
+from utils.file_utils import read_json_with_project_root
+from utils.payload_store import load_payload, put_payload
+
+AI_RESULT_PATH = "data/favorite_notes_ai_processed.json"
+
+
+def load_ai_results_by_note(file_path: str = AI_RESULT_PATH) -> Dict[str, Dict[str, Any]]:
+    """读取 04 阶段的 AI 处理结果，按 note_id 建立索引（文件不存在时返回空）"""
+    try:
+        state = read_json_with_project_root(file_path)
+    except FileNotFoundError:
+        return {}
+    index: Dict[str, Dict[str, Any]] = {}
+    for item in (state.get("data") if isinstance(state, dict) else None) or []:
+        nid = item.get("note_id") if isinstance(item, dict) else None
+        if isinstance(nid, str) and nid:
+            index[nid] = item
+    return index
+
+
+def _task_result(ai: Dict[str, Any], name: str) -> Dict[str, Any]:
+    # 优先取拍平后的字段，其次取 tasks.<name>.result
+    flat = ai.get(name)
+    if isinstance(flat, dict) and flat:
+        return flat
+    return ((ai.get("tasks") or {}).get(name) or {}).get("result") or {}
+
+
+def ai_summary(ai: Optional[Dict[str, Any]]) -> str:
+    if not ai:
+        return ""
+    s = _task_result(ai, "summary").get("summary_200")
+    return s if isinstance(s, str) else ""
+
+
+def ai_keywords(ai: Optional[Dict[str, Any]]) -> List[str]:
+    if not ai:
+        return []
+    kws = _task_result(ai, "keywords").get("keywords")
+    return [k for k in kws if isinstance(k, str)] if isinstance(kws, list) else []
+
+
+def ai_topics(ai: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    if not ai:
+        return None
+    topics = _task_result(ai, "topics")
+    if not topics:
+        return None
+    return {
+        "primary_topic": topics.get("primary_topic"),
+        "subtopics": topics.get("subtopics") or [],
+        "content_intent": topics.get("content_intent"),
+        "content_type": topics.get("content_type"),
+        "confidence": topics.get("confidence"),
+    }
+
+
+def externalize_task_raw(task: Dict[str, Any]) -> bool:
+    """把任务记录中的模型原始回复移到旁路存储，改为 raw_ref 引用；有改动时返回 True"""
+    if not isinstance(task, dict) or "raw" not in task:
+        return False
+    raw = task.pop("raw")
+    if isinstance(raw, str) and raw:
+        task["raw_ref"] = put_payload(raw)
+    return True
+
+
+def load_task_raw(task: Optional[Dict[str, Any]]) -> Optional[str]:
+    """按需取回任务的模型原始回复（兼容仍内联 raw 的旧记录）"""
+    if not isinstance(task, dict):
+        return None
+    if isinstance(task.get("raw"), str):
+        return task["raw"]
+    raw = load_payload(task.get("raw_ref"))
+    return raw if isinstance(raw, str) else None
@@ -0,0 +1,163 @@
+import json
+import re
+import time
+from typing import Any, Dict, Iterable, Iterator, Optional, Tuple
+
+from utils.file_utils import iter_json_items_with_project_root, read_json_with_project_root, update_json_with_project_root
+
+# ----------------------
+# 作者主页信息缓存
+# ----------------------
+# 按 author.user_id 缓存作者的粉丝数等信息，03 规范化时据此计算 engagement_rate，本身不发任何请求。
+# 缓存文件 data/author_profiles.json：
+#   {"version": 1, "profiles": {<user_id>: {"nickname", "fans", "follows", "interaction",
+#                                            "fetched_at", "expires_at", "error"}}}
+# 成功的记录 PROFILE_TTL_SEC 后过期、失败的记录 PROFILE_ERROR_TTL_SEC 后过期，过期后由抓取脚本重新获取；
+# 过期但成功过的记录仍可用于计算（粉丝数变化缓慢，旧值好过没有）。
+
+AUTHOR_PROFILES_PATH = "data/author_profiles.json"
+AUTHOR_PROFILES_VERSION = 1
+
+# 成功记录的有效期
+PROFILE_TTL_SEC = 7 * 24 * 3600
+# 失败记录（主页打不开、需要验证等）的有效期，避免每次都重试同一个作者
+PROFILE_ERROR_TTL_SEC = 6 * 3600
+
+_INITIAL_STATE_RE = re.compile(r"window\.__INITIAL_STATE__\s*=\s*(\{.*?\})\s*</script>", re.S)
+_COUNT_RE = re.compile(r"^([\d.]+)\s*([万wW亿]?)\+?$")
+
+
+def _empty() -> Dict[str, Any]:
+    return {"version": AUTHOR_PROFILES_VERSION, "profiles": {}}
+
+
+def load_author_profiles() -> Dict[str, Dict[str, Any]]:
+    """读取缓存：user_id -> 记录（文件不存在或损坏时返回空）"""
+    try:
+        data = read_json_with_project_root(AUTHOR_PROFILES_PATH)
+    except (FileNotFoundError, ValueError):
+        return {}
+    profiles = data.get("profiles") if isinstance(data, dict) else None
+    return profiles if isinstance(profiles, dict) else {}
+
+
+def save_author_profiles(updates: Dict[str, Dict[str, Any]]) -> None:
+    """把本批结果合并进缓存（锁内读-改-写，不覆盖其他进程同时写入的作者）"""
+    if not updates:
+        return
+
+    def _merge(data: Any) -> Dict[str, Any]:
+        if not isinstance(data, dict) or not isinstance(data.get("profiles"), dict):
+            data = _empty()
+        data["profiles"].update(updates)
+        return data
+
+    update_json_with_project_root(AUTHOR_PROFILES_PATH, _merge, default=_empty, indent=None)
+
+
+def profile_fans(profiles: Dict[str, Dict[str, Any]], user_id: Optional[str]) -> Optional[int]:
+    profile = profiles.get(user_id) if user_id else None
+    fans = profile.get("fans") if isinstance(profile, dict) else None
+    return fans if isinstance(fans, int) and not isinstance(fans, bool) else None
+
+
+def engagement_rate(engagement_score: int, fans: Optional[int]) -> Optional[float]:
+    """互动量 / 作者粉丝数；粉丝数未知或为 0 时返回 None"""
+    if not fans or fans <= 0:
+        return None
+    return round(engagement_score / fans, 6)
+
+
+def needs_refresh(profile: Any, now: Optional[float] = None) -> bool:
+    if not isinstance(profile, dict):
+        return True
+    return float(profile.get("expires_at") or 0) <= (now if now is not None else time.time())
+
+
+def iter_note_authors(details_path: str) -> Iterator[Tuple[str, Optional[str]]]:
+    """流式遍历详情数据，按出现顺序产出去重后的 (user_id, xsec_token)"""
+    seen = set()
+    for note in iter_json_items_with_project_root(details_path):
+        author = note.get("author_info") if isinstance(note, dict) else None
+        if not isinstance(author, dict):
+            continue
+        user_id = str(author.get("user_id") or "").strip()
+        if not user_id or user_id in seen:
+            continue
+        seen.add(user_id)
+        yield user_id, author.get("xsec_token")
+
+
+def parse_count(value: Any) -> Optional[int]:
+    """主页上的计数："1234" / "1.2万" / "3亿" / "10+" -> 整数；无法识别返回 None"""
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return int(value)
+    if not isinstance(value, str):
+        return None
+    m = _COUNT_RE.match(value.strip().replace(",", ""))
+    if not m:
+        return None
+    try:
+        num = float(m.group(1))
+    except ValueError:
+        return None
+    unit = m.group(2)
+    if unit in ("万", "w", "W"):
+        num *= 10_000
+    elif unit == "亿":
+        num *= 100_000_000
+    return int(round(num))
+
+
+def parse_profile_html(html: str) -> Optional[Dict[str, Any]]:
+    """从作者主页 HTML 内嵌的 __INITIAL_STATE__ 中取出昵称与关注 / 粉丝 / 获赞与收藏数"""
+    m = _INITIAL_STATE_RE.search(html or "")
+    if not m:
+        return None
+    # 内嵌的是 JS 对象字面量，未定义的字段写作 undefined
+    raw = re.sub(r"(?<=[:\[,])\s*undefined\s*(?=[,}\]])", "null", m.group(1))
+    try:
+        state = json.loads(raw)
+    except ValueError:
+        return None
+    page = ((state.get("user") or {}).get("userPageData") or {}) if isinstance(state, dict) else {}
+    if not isinstance(page, dict):
+        return None
+    counts: Dict[str, Optional[int]] = {}
+    for it in page.get("interactions") or []:
+        if isinstance(it, dict) and it.get("type"):
+            counts[str(it["type"])] = parse_count(it.get("count"))
+    if counts.get("fans") is None:
+        return None
+    basic = page.get("basicInfo") or {}
+    return {
+        "nickname": basic.get("nickname") if isinstance(basic, dict) else None,
+        "fans": counts.get("fans"),
+        "follows": counts.get("follows"),
+        "interaction": counts.get("interaction"),
+    }
+
+
+def make_profile_record(parsed: Optional[Dict[str, Any]], error: Optional[str], now: Optional[float] = None) -> Dict[str, Any]:
+    now = now if now is not None else time.time()
+    if parsed is not None:
+        return {**parsed, "fetched_at": now, "expires_at": now + PROFILE_TTL_SEC}
+    return {"error": error or "unknown", "fetched_at": now, "expires_at": now + PROFILE_ERROR_TTL_SEC}
+
+
+def merge_failed_record(previous: Any, record: Dict[str, Any]) -> Dict[str, Any]:
+    """抓取失败时保留上一次成功拿到的数值，只更新错误信息与过期时间"""
+    if isinstance(previous, dict) and previous.get("fans") is not None:
+        kept = {k: previous.get(k) for k in ("nickname", "fans", "follows", "interaction")}
+        return {**kept, **record}
+    return record
+
+
+def pending_authors(authors: Iterable[Tuple[str, Optional[str]]], profiles: Dict[str, Dict[str, Any]],
+                    now: Optional[float] = None) -> Iterator[Tuple[str, Optional[str]]]:
+    now = now if now is not None else time.time()
+    for user_id, token in authors:
+        if needs_refresh(profiles.get(user_id), now):
+            yield user_id, token
@@ -0,0 +1,437 @@
+"""本地替身 RPC：不依赖真实服务与登录 cookie，离线复现各阶段的客户端性能
+
+用法（在项目根目录）：
+    python -m utils.fake_rpc [选项] 04_process_with_AI.py [阶段参数...]
+
+运行前把假的 client_sdk（params / rpc_client）注入 sys.modules，阶段脚本原样执行。
+EAIRPCClient 的同名方法按夹具数据返回与真实服务相同结构的结果，
+并按配置注入延迟、错误与格式错误，同一 seed 下结果可复现。
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import random
+import re
+import runpy
+import sys
+import time
+import types
+import uuid
+from typing import Any, Dict, List, Optional
+
+from utils.file_utils import json_loads, PROJECT_ROOT
+
+try:
+    from PIL import Image  # type: ignore
+except ImportError:  # pragma: no cover - 可选依赖
+    Image = None
+
+# ----------------------
+# 默认配置
+# ----------------------
+# 各方法的延迟中位数（毫秒）；details 按每条笔记计算
+DEFAULT_LATENCY_MS: Dict[str, float] = {
+    "brief": 800,
+    "details": 1500,
+    "chat": 2500,
+    "ocr": 600,
+    # 打开新浏览器页面的额外耗时；上一次同类调用未关闭页面（close_page_when_task_finished=False）时免去
+    "page_open": 1200,
+}
+# 延迟服从对数正态分布，sigma 越大长尾越明显
+DEFAULT_LATENCY_SIGMA = 0.5
+
+DEFAULT_FIXTURES_DIR = PROJECT_ROOT / "data"
+BRIEF_FIXTURE = "favorite_notes_brief.json"
+DETAILS_FIXTURE = "favorite_notes_details.json"
+
+
+class FakeRPCConfig:
+    def __init__(self, fixtures_dir: str = str(DEFAULT_FIXTURES_DIR), seed: int = 0,
+                 latency_scale: float = 1.0, latency_sigma: float = DEFAULT_LATENCY_SIGMA,
+                 error_rate: float = 0.0, malformed_rate: float = 0.0,
+                 latency_ms: Optional[Dict[str, float]] = None) -> None:
+        self.fixtures_dir = fixtures_dir
+        self.seed = seed
+        # 0 表示不等待，只测客户端自身开销
+        self.latency_scale = latency_scale
+        self.latency_sigma = latency_sigma
+        # 返回 success=False 的概率
+        self.error_rate = error_rate
+        # 返回无法解析的内容的概率（chat 为残缺的模型回复，其余方法抛出 JSONDecodeError）
+        self.malformed_rate = malformed_rate
+        self.latency_ms = {**DEFAULT_LATENCY_MS, **(latency_ms or {})}
+
+
+# 由 install() 设置，EAIRPCClient 构造时读取
+_CONFIG = FakeRPCConfig()
+
+
+# ----------------------
+# 夹具
+# ----------------------
+
+def _load_fixture(name: str) -> Dict[str, Any]:
+    try:
+        with open(os.path.join(_CONFIG.fixtures_dir, name), "rb") as f:
+            data = json_loads(f.read())
+    except (OSError, ValueError):
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
+def _note_id(item: Any) -> Optional[str]:
+    if not isinstance(item, dict):
+        return None
+    nid = item.get("id") or (item.get("raw_data") or {}).get("note_id")
+    return str(nid) if nid else None
+
+
+def _detail_from_brief(brief: Dict[str, Any]) -> Dict[str, Any]:
+    """夹具中没有详情时，按简要信息拼出结构一致的详情"""
+    cover = brief.get("cover_image")
+    return {
+        "raw_data": None,
+        "id": _note_id(brief),
+        "xsec_token": brief.get("xsec_token"),
+        "title": brief.get("title") or "",
+        "desc": "",
+        "author_info": brief.get("author_info") or {},
+        "tags": [],
+        "date": None,
+        "ip_zh": None,
+        "comment_num": "0",
+        "statistic": brief.get("statistic") or {},
+        "images": [cover] if cover else [],
+        "video": None,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+
+
+# ----------------------
+# 模型回复
+# ----------------------
+
+def _pick(rng: random.Random, options: List[str]) -> str:
+    return options[rng.randrange(len(options))] if options else "…"
+
+
+def _vocab(prompt: str, name: str) -> List[str]:
+    # 04 的提示词里以 "name: [a, b, c]" 给出可选词表
+    m = re.search(name + r":\s*\[([^\]]*)\]", prompt)
+    return [w.strip() for w in m.group(1).split(",") if w.strip()] if m else []
+
+
+def _fake_model_reply(prompt: str, rng: random.Random) -> str:
+    """按提示词中要求的 JSON 字段生成一条能通过 04 校验的回复"""
+    title = re.search(r"【标题】(.*?)(?:【|$)", prompt)
+    topic = (title.group(1) if title else prompt[-40:]).strip()[:40] or "内容"
+    confidence = round(rng.uniform(0.6, 0.95), 2)
+    if '"summary_200"' in prompt:
+        reply: Dict[str, Any] = {"summary_200": f"{topic}：这是一条用于压测的摘要。"}
+    elif '"keywords"' in prompt:
+        reply = {"keywords": [f"{topic[:8]}{i}" for i in range(rng.randint(3, 5))]}
+    elif '"primary_topic"' in prompt:
+        reply = {
+            "primary_topic": _pick(rng, _vocab(prompt, "primary_topic")),
+            "subtopics": [topic[:10]],
+            "content_intent": _pick(rng, _vocab(prompt, "content_intent")),
+            "content_type": _pick(rng, _vocab(prompt, "content_type")),
+        }
+    elif '"takeaways"' in prompt:
+        reply = {"takeaways": [f"{topic[:20]} 要点{i + 1}" for i in range(rng.randint(1, 3))]}
+    elif '"steps"' in prompt:
+        reply = {"steps": [{"step": i + 1, "action": f"第{i + 1}步", "tip": ""} for i in range(rng.randint(2, 5))]}
+    elif '"entities"' in prompt:
+        reply = {"entities": {"people": [], "orgs": [], "products": [topic[:10]], "locations": []}, "concepts": [topic[:10]]}
+    else:
+        return f"收到：{topic}"
+    reply["version"] = "1.0"
+    reply["confidence"] = confidence
+    return "```json\n" + json.dumps(reply, ensure_ascii=False) + "\n```"
+
+
+def _fake_ocr_data(path: str, rng: random.Random) -> Dict[str, Any]:
+    """按图片内容生成确定的识别文本与坐标"""
+    try:
+        with open(path, "rb") as f:
+            digest = hashlib.sha256(f.read()).hexdigest()
+    except OSError:
+        digest = hashlib.sha256(path.encode("utf-8")).hexdigest()
+    width, height = 1080, 1440
+    if Image is not None:
+        try:
+            with Image.open(path) as im:
+                width, height = im.size
+        except Exception:
+            pass
+    lines = [f"图片文字 {digest[:8]} 第{i + 1}行" for i in range(rng.randint(0, 6))]
+    line_h = max(height // 20, 1)
+    polys = [[[10, i * line_h], [width - 10, i * line_h], [width - 10, (i + 1) * line_h], [10, (i + 1) * line_h]]
+             for i in range(len(lines))]
+    return {
+        "text": "\n".join(lines),
+        "confidence": {"avg": round(rng.uniform(0.8, 0.99), 3)} if lines else {},
+        "dt_polys": polys,
+        "raw_image_path": path,
+    }
+
+
+# ----------------------
+# 客户端替身
+# ----------------------
+
+class _Params:
+    """TaskParams / ServiceParams / SyncParams 的替身，只保存关键字参数"""
+
+    def __init__(self, **kwargs: Any) -> None:
+        self.__dict__.update(kwargs)
+
+
+class TaskParams(_Params):
+    pass
+
+
+class ServiceParams(_Params):
+    pass
+
+
+class SyncParams(_Params):
+    pass
+
+
+class FakeEAIRPCClient:
+    """与 EAIRPCClient 方法签名一致；连接参数被忽略"""
+
+    def __init__(self, base_url: str = "", api_key: str = "", webhook_host: str = "",
+                 webhook_port: int = 0, **kwargs: Any) -> None:
+        self._config = _CONFIG
+        self._calls: Dict[str, int] = {}
+        # 上一次调用后仍保持打开页面的方法
+        self._open_pages: set = set()
+        # method -> {"calls", "errors", "malformed", "latency_ms"}
+        self.stats: Dict[str, Dict[str, float]] = {}
+
+    async def start(self) -> None:
+        pass
+
+    async def stop(self) -> None:
+        for method, s in sorted(self.stats.items()):
+            avg = s["latency_ms"] / s["calls"] if s["calls"] else 0
+            print(f"[fake-rpc] {method}: {int(s['calls'])} 次，注入错误 {int(s['errors'])}，"
+                  f"格式错误 {int(s['malformed'])}，平均延迟 {avg:.0f}ms")
+
+    def _rng(self, method: str) -> random.Random:
+        # 每次调用使用独立的随机源：结果只取决于 seed 与该方法的调用序号
+        n = self._calls.get(method, 0)
+        self._calls[method] = n + 1
+        return random.Random(f"{self._config.seed}:{method}:{n}")
+
+    def _page_setup_ms(self, method: str, task_params: Any) -> float:
+        """按 close_page_when_task_finished 模拟页面复用：页面未打开时计入打开耗时"""
+        cost = 0.0 if method in self._open_pages else self._config.latency_ms.get("page_open", 0)
+        if getattr(task_params, "close_page_when_task_finished", True):
+            self._open_pages.discard(method)
+        else:
+            self._open_pages.add(method)
+        return cost
+
+    async def _simulate(self, method: str, rng: random.Random, units: int = 1,
+                        task_params: Any = None) -> Optional[str]:
+        """等待模拟延迟，返回要注入的故障：None / "error" / "malformed\""""
+        cfg = self._config
+        s = self.stats.setdefault(method, {"calls": 0, "errors": 0, "malformed": 0, "latency_ms": 0.0})
+        s["calls"] += 1
+        delay_ms = sum(cfg.latency_ms.get(method, 0) * rng.lognormvariate(0, cfg.latency_sigma) for _ in range(units))
+        delay_ms += self._page_setup_ms(method, task_params)
+        delay_ms *= cfg.latency_scale
+        s["latency_ms"] += delay_ms
+        if delay_ms > 0:
+            await asyncio.sleep(delay_ms / 1000)
+        roll = rng.random()
+        if roll < cfg.error_rate:
+            s["errors"] += 1
+            return "error"
+        if roll < cfg.error_rate + cfg.malformed_rate:
+            s["malformed"] += 1
+            return "malformed"
+        return None
+
+    @staticmethod
+    def _envelope(plugin_id: str, started: float, **payload: Any) -> Dict[str, Any]:
+        return {
+            "success": True,
+            "exec_elapsed_ms": int((time.perf_counter() - started) * 1000),
+            "plugin_id": plugin_id,
+            "version": "fake",
+            "task_id": str(uuid.uuid4()),
+            **payload,
+        }
+
+    @staticmethod
+    def _failure(plugin_id: str, started: float) -> Dict[str, Any]:
+        return {
+            "success": False,
+            "error": "fake rpc: injected error",
+            "exec_elapsed_ms": int((time.perf_counter() - started) * 1000),
+            "plugin_id": plugin_id,
+            "data": None,
+        }
+
+    @staticmethod
+    def _malformed(plugin_id: str) -> None:
+        body = '{"success": true, "plugin_id": "' + plugin_id + '", "data": [{"'
+        raise json.JSONDecodeError("fake rpc: malformed response", body, len(body))
+
+    async def get_favorite_notes_brief_from_xhs(self, storage_data: str = "{}", task_params: Any = None,
+                                                service_params: Any = None, sync_params: Any = None,
+                                                **kwargs: Any) -> Dict[str, Any]:
+        plugin_id = "xiaohongshu_favorites_brief"
+        started = time.perf_counter()
+        fault = await self._simulate("brief", self._rng("brief"), task_params=task_params)
+        if fault == "error":
+            return self._failure(plugin_id, started)
+        if fault == "malformed":
+            self._malformed(plugin_id)
+
+        try:
+            stored = json_loads(storage_data or "{}")
+        except ValueError:
+            stored = {}
+        existing = [it for it in (stored.get("data") if isinstance(stored, dict) else None) or [] if _note_id(it)]
+        known = {_note_id(it) for it in existing}
+        added = [it for it in _load_fixture(BRIEF_FIXTURE).get("data") or [] if _note_id(it) and _note_id(it) not in known]
+        max_new = getattr(sync_params, "max_new_items", None)
+        if max_new:
+            added = added[:max_new]
+        data = existing + added
+        return self._envelope(
+            plugin_id, started,
+            data=data,
+            count=len(data),
+            added={"data": added, "count": len(added)},
+            updated={"data": [], "count": 0},
+        )
+
+    async def get_notes_details_from_xhs(self, brief_data: str = "{}", wait_time_sec: float = 0,
+                                         task_params: Any = None, service_params: Any = None,
+                                         rpc_timeout_sec: Optional[float] = None, **kwargs: Any) -> Dict[str, Any]:
+        # wait_time_sec 是真实服务在两条笔记之间的风控等待，这里由 details 的延迟配置代替
+        plugin_id = "xiaohongshu_details"
+        started = time.perf_counter()
+        try:
+            brief = json_loads(brief_data or "{}")
+        except ValueError:
+            brief = {}
+        items = [it for it in (brief.get("data") if isinstance(brief, dict) else None) or [] if _note_id(it)]
+        rng = self._rng("details")
+        fault = await self._simulate("details", rng, units=max(len(items), 1), task_params=task_params)
+        if fault == "error":
+            return self._failure(plugin_id, started)
+        if fault == "malformed":
+            self._malformed(plugin_id)
+
+        fixtures = {_note_id(it): it for it in _load_fixture(DETAILS_FIXTURE).get("data") or [] if _note_id(it)}
+        details: List[Dict[str, Any]] = []
+        failed: List[Dict[str, Any]] = []
+        for it in items:
+            # 单条笔记也可能失败，交给 02 的重试逻辑
+            if rng.random() < self._config.error_rate:
+                failed.append(it)
+                continue
+            details.append(fixtures.get(_note_id(it)) or _detail_from_brief(it))
+        return self._envelope(
+            plugin_id, started,
+            data=details,
+            count=len(details),
+            failed_notes={"data": failed, "count": len(failed)},
+        )
+
+    async def chat_with_yuanbao(self, ask_question: str = "", conversation_id: str = "",
+                                task_params: Any = None, **kwargs: Any) -> Dict[str, Any]:
+        plugin_id = "yuanbao_chat"
+        started = time.perf_counter()
+        rng = self._rng("chat")
+        fault = await self._simulate("chat", rng, task_params=task_params)
+        if fault == "error":
+            return self._failure(plugin_id, started)
+        reply = _fake_model_reply(ask_question, rng)
+        if fault == "malformed":
+            # 模型回复被截断：外层结构正常，回复本身无法解析
+            reply = reply[: max(len(reply) // 2, 1)]
+        return self._envelope(plugin_id, started, data=[{"last_model_message": reply}], count=1)
+
+    async def call_paddle_ocr(self, image_path_abs_path: str = "", task_params: Any = None,
+                              **kwargs: Any) -> Dict[str, Any]:
+        plugin_id = "paddle_ocr"
+        started = time.perf_counter()
+        rng = self._rng("ocr")
+        fault = await self._simulate("ocr", rng, task_params=task_params)
+        if fault == "error":
+            return self._failure(plugin_id, started)
+        if fault == "malformed":
+            self._malformed(plugin_id)
+        return self._envelope(plugin_id, started, data=_fake_ocr_data(image_path_abs_path, rng),
+                              task_params_extra={"image_path_abs_path": image_path_abs_path})
+
+
+# ----------------------
+# 注入与命令行
+# ----------------------
+
+def install(config: Optional[FakeRPCConfig] = None) -> None:
+    """用替身替换 client_sdk；需在导入阶段脚本之前调用"""
+    global _CONFIG
+    if config is not None:
+        _CONFIG = config
+    sdk = types.ModuleType("client_sdk")
+    params = types.ModuleType("client_sdk.params")
+    rpc_client = types.ModuleType("client_sdk.rpc_client")
+    params.TaskParams = TaskParams
+    params.ServiceParams = ServiceParams
+    params.SyncParams = SyncParams
+    rpc_client.EAIRPCClient = FakeEAIRPCClient
+    sdk.params = params
+    sdk.rpc_client = rpc_client
+    sys.modules.update({"client_sdk": sdk, "client_sdk.params": params, "client_sdk.rpc_client": rpc_client})
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="用本地替身 RPC 运行阶段脚本")
+    parser.add_argument("script", help="要运行的阶段脚本，如 04_process_with_AI.py")
+    parser.add_argument("script_args", nargs=argparse.REMAINDER, help="传给阶段脚本的参数")
+    parser.add_argument("--fixtures", default=str(DEFAULT_FIXTURES_DIR), help="夹具目录（简要/详情 JSON 所在目录）")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--latency-scale", type=float, default=1.0, help="延迟倍率，0 表示不等待")
+    parser.add_argument("--latency-sigma", type=float, default=DEFAULT_LATENCY_SIGMA)
+    parser.add_argument("--latency-ms", action="append", default=[], metavar="METHOD=MS",
+                        help="覆盖某个方法的延迟中位数，如 chat=1200，可重复")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--malformed-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    latency_ms: Dict[str, float] = {}
+    for item in args.latency_ms:
+        method, _, ms = item.partition("=")
+        if method not in DEFAULT_LATENCY_MS or not ms:
+            parser.error(f"--latency-ms 格式应为 METHOD=MS，METHOD 取 {'/'.join(DEFAULT_LATENCY_MS)}")
+        latency_ms[method] = float(ms)
+
+    install(FakeRPCConfig(
+        fixtures_dir=args.fixtures,
+        seed=args.seed,
+        latency_scale=args.latency_scale,
+        latency_sigma=args.latency_sigma,
+        error_rate=args.error_rate,
+        malformed_rate=args.malformed_rate,
+        latency_ms=latency_ms,
+    ))
+    print(f"[fake-rpc] 夹具 {args.fixtures}，seed {args.seed}，错误率 {args.error_rate}，格式错误率 {args.malformed_rate}")
+    sys.argv = [args.script] + args.script_args
+    runpy.run_path(args.script, run_name="__main__")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,35 @@
 import json
 import os
+import stat
+import tempfile
+import time
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Any
+from typing import Any, Callable, Iterator, Optional
+
+from utils.metrics import observe_file_io
+
+try:
+    import fcntl  # type: ignore
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+
+try:
+    import msvcrt  # type: ignore
+except ImportError:  # pragma: no cover - POSIX
+    msvcrt = None
+
+try:
+    # 可选加速：orjson 解析速度约为标准库的数倍
+    import orjson  # type: ignore
+except ImportError:  # pragma: no cover - 可选依赖
+    orjson = None
+
+try:
+    # 可选加速：ijson 基于事件流解析，真正做到逐条读取
+    import ijson  # type: ignore
+except ImportError:  # pragma: no cover - 可选依赖
+    ijson = None
 
 
 def get_root_dir():
@@ -14,27 +42,357 @@ def get_root_dir():
 
 PROJECT_ROOT = get_root_dir()
 
+# 流式读取时每次从文件读入的字符数
+STREAM_CHUNK_SIZE = 64 * 1024
+
+
+def json_loads(data: Any) -> Any:
+    """解析 JSON 文本/字节，优先使用 orjson"""
+    if orjson is not None:
+        return orjson.loads(data)
+    if isinstance(data, (bytes, bytearray)):
+        data = data.decode('utf-8')
+    return json.loads(data)
+
+
+# ----------------------
+# 文件锁与原子写入
+# ----------------------
+
+# Windows 下目标文件被其他进程打开时 os.replace 会失败，按此间隔重试
+REPLACE_RETRY_TIMES = 50
+REPLACE_RETRY_INTERVAL_SEC = 0.1
+
+
+@contextmanager
+def file_lock(abs_path: str, shared: bool = False) -> Iterator[None]:
+    """对 ``<abs_path>.lock`` 加建议锁（跨进程）
+
+    写入方使用排他锁，读取方使用共享锁；Windows 下不支持共享锁，统一为排他锁。
+    同一进程内不可重入，嵌套调用会死锁。
+
+    Args:
+        abs_path: 被保护文件的绝对路径
+        shared: 是否使用共享锁
+    """
+    lock_path = f"{abs_path}.lock"
+    os.makedirs(os.path.dirname(lock_path) or ".", exist_ok=True)
+    with open(lock_path, 'a+b') as lf:
+        if fcntl is not None:
+            fcntl.flock(lf.fileno(), fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+        elif msvcrt is not None:
+            lf.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(lf.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    # LK_LOCK 自身重试约 10s 后放弃，这里继续等待
+                    continue
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lf.fileno(), fcntl.LOCK_UN)
+            elif msvcrt is not None:
+                lf.seek(0)
+                msvcrt.locking(lf.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def _read_json_file(abs_path: str) -> Any:
+    with open(abs_path, 'rb') as f:
+        return json_loads(f.read())
+
+
+def _target_file_mode(abs_path: str) -> int:
+    """沿用目标文件原有权限；新文件按 umask 计算（mkstemp 默认 0600，其他进程可能读不到）"""
+    try:
+        return stat.S_IMODE(os.stat(abs_path).st_mode)
+    except FileNotFoundError:
+        umask = os.umask(0)
+        os.umask(umask)
+        return 0o666 & ~umask
+
+
+def atomic_write_json(abs_path: str, data: Any, indent: Optional[int] = 4) -> None:
+    """先写同目录临时文件并 fsync，再 rename 覆盖目标，读取方永远看不到半截文件
+
+    不加锁：适用于只有单一写入方的文件（如发布阶段生成的大量小文件），
+    需要与其他写入方互斥时请用 write_json_with_project_root。
+    """
+    dir_name = os.path.dirname(abs_path) or "."
+    os.makedirs(dir_name, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(prefix=f".{os.path.basename(abs_path)}.", suffix=".tmp", dir=dir_name)
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=indent)
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(tmp_path, _target_file_mode(abs_path))
+        for attempt in range(REPLACE_RETRY_TIMES):
+            try:
+                os.replace(tmp_path, abs_path)
+                break
+            except PermissionError:
+                if attempt == REPLACE_RETRY_TIMES - 1:
+                    raise
+                time.sleep(REPLACE_RETRY_INTERVAL_SEC)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
 
 def read_json_with_project_root(file_path: str) -> Any:
     """读取项目根目录下的JSON文件
 
+    持共享锁读取，保证拿到的是某次完整写入后的快照。
+
     Args:
         file_path: 相对于项目根目录的文件路径
 
     Returns:
         解析后的JSON数据
     """
-    with open(os.path.join(PROJECT_ROOT, file_path), 'r', encoding='utf-8') as f:
-        return json.loads(f.read())
+    abs_path = os.path.join(PROJECT_ROOT, file_path)
+    started = time.perf_counter()
+    with file_lock(abs_path, shared=True):
+        data = _read_json_file(abs_path)
+    observe_file_io("read", abs_path, time.perf_counter() - started)
+    return data
 
 
-def write_json_with_project_root(file_path: str, data: Any) -> None:
+def write_json_with_project_root(file_path: str, data: Any, indent: Optional[int] = 4) -> None:
     """写入JSON数据到项目根目录下的文件
 
+    持排他锁，先写临时文件再原子替换，进程中途崩溃不会留下截断的文件。
+
     Args:
         data: 要写入的数据
         file_path: 相对于项目根目录的文件路径
+        indent: JSON 缩进
+    """
+    abs_path = os.path.join(PROJECT_ROOT, file_path)
+    started = time.perf_counter()
+    with file_lock(abs_path):
+        atomic_write_json(abs_path, data, indent=indent)
+    observe_file_io("write", abs_path, time.perf_counter() - started)
+
+
+# updater 返回此值表示数据没有变化，跳过写回
+UNCHANGED = object()
+
+
+def update_json_with_project_root(
+    file_path: str,
+    updater: Callable[[Any], Any],
+    default: Optional[Callable[[], Any]] = None,
+    indent: Optional[int] = 4,
+) -> Any:
+    """在排他锁内完成 读取-修改-写回，避免多个阶段并发追加时互相覆盖
+
+    Args:
+        file_path: 相对于项目根目录的文件路径
+        updater: 接收当前数据，返回新数据；返回 None 表示原地修改了传入对象，返回 UNCHANGED 表示无需写回
+        default: 文件不存在时用于生成初始数据的工厂函数
+        indent: JSON 缩进
+
+    Returns:
+        写回后的数据
+
+    Raises:
+        ValueError: 文件存在但无法解析。此时不会写入，原文件保持不变，需人工修复或移走
+    """
+    abs_path = os.path.join(PROJECT_ROOT, file_path)
+    started = time.perf_counter()
+    with file_lock(abs_path):
+        try:
+            data = _read_json_file(abs_path)
+        except FileNotFoundError:
+            if default is None:
+                raise
+            data = default()
+        except ValueError as e:
+            # 损坏的文件里可能是唯一一份数据（详情 / AI 结果），绝不能用空的默认值覆盖
+            raise ValueError(f"{abs_path} 不是合法的 JSON，已放弃写入以免覆盖原有数据，请修复或移走该文件后重试: {e}") from e
+        new_data = updater(data)
+        if new_data is UNCHANGED:
+            return data
+        if new_data is None:
+            new_data = data
+        atomic_write_json(abs_path, new_data, indent=indent)
+    observe_file_io("update", abs_path, time.perf_counter() - started)
+    return new_data
+
+
+# ----------------------
+# 流式读取
+# ----------------------
+
+# JSON 数字中可能出现的字符
+_NUMBER_CHARS = frozenset("0123456789.eE+-")
+
+
+class _ChunkedJsonScanner:
+    """基于 JSONDecoder.raw_decode 的增量扫描器（标准库兜底实现）
+
+    只在缓冲区中保留当前正在解析的值，已消费的部分会被丢弃。
+    """
+
+    def __init__(self, f, chunk_size: int = STREAM_CHUNK_SIZE):
+        self._f = f
+        self._chunk_size = chunk_size
+        self._decoder = json.JSONDecoder()
+        self._buf = ""
+        self._pos = 0
+        self._eof = False
+
+    def _fill(self, size: Optional[int] = None) -> bool:
+        if self._eof:
+            return False
+        chunk = self._f.read(size or self._chunk_size)
+        if not chunk:
+            self._eof = True
+            return False
+        # 丢弃已消费部分，避免缓冲区无限增长
+        self._buf = self._buf[self._pos:] + chunk
+        self._pos = 0
+        return True
+
+    def peek(self) -> Optional[str]:
+        """跳过空白并返回下一个字符（不消费），文件结束返回 None"""
+        while True:
+            while self._pos < len(self._buf) and self._buf[self._pos] in " \t\r\n":
+                self._pos += 1
+            if self._pos < len(self._buf):
+                return self._buf[self._pos]
+            if not self._fill():
+                return None
+
+    def expect(self, ch: str) -> None:
+        if self.peek() != ch:
+            raise ValueError(f"JSON 流格式错误：期望 {ch!r}，位置 {self._pos}")
+        self._pos += 1
+
+    def _grow(self) -> bool:
+        # 值不完整时每次都要从值的起点重新解析：读入量与已缓冲的长度相当（缓冲区成倍增长），
+        # 单个值跨越很多块时总解析量仍与其长度成线性，而不是 块数 × 长度
+        return self._fill(max(self._chunk_size, len(self._buf) - self._pos))
+
+    def decode_value(self) -> Any:
+        """解析一个完整的 JSON 值；数据不足时自动读入更多内容"""
+        if self.peek() is None:
+            raise ValueError("JSON 流意外结束")
+        while True:
+            try:
+                obj, end = self._decoder.raw_decode(self._buf, self._pos)
+            except json.JSONDecodeError:
+                if not self._grow():
+                    raise
+                continue
+            # 数字可能在块边界处被截断（"1." | "5"、"1e" | "5"），raw_decode 会只返回前缀 1；
+            # 数字之后直到缓冲区末尾都还可能是数字的一部分时，读入更多再重新解析
+            if self._may_be_truncated(obj, end) and self._grow():
+                continue
+            self._pos = end
+            return obj
+
+    def _may_be_truncated(self, obj: Any, end: int) -> bool:
+        if end == len(self._buf):
+            return True
+        if isinstance(obj, bool) or not isinstance(obj, (int, float)):
+            return False
+        j = end
+        while j < len(self._buf) and self._buf[j] in _NUMBER_CHARS:
+            j += 1
+        return j == len(self._buf)
+
+    def iter_array(self) -> Iterator[Any]:
+        """逐个产出当前位置数组中的元素"""
+        self.expect('[')
+        if self.peek() == ']':
+            self._pos += 1
+            return
+        while True:
+            yield self.decode_value()
+            ch = self.peek()
+            self._pos += 1
+            if ch == ']':
+                return
+            if ch != ',':
+                raise ValueError(f"JSON 流格式错误：数组中出现 {ch!r}")
+
+    def seek_key(self, key: str) -> bool:
+        """在顶层对象中定位到 key 对应值的起始位置；不存在返回 False"""
+        self.expect('{')
+        if self.peek() == '}':
+            return False
+        while True:
+            k = self.decode_value()
+            self.expect(':')
+            if k == key:
+                return True
+            # 非目标字段：解析后立即丢弃
+            self.decode_value()
+            ch = self.peek()
+            self._pos += 1
+            if ch == '}':
+                return False
+            if ch != ',':
+                raise ValueError(f"JSON 流格式错误：对象中出现 {ch!r}")
+
+
+def _peek_root_byte(f) -> Optional[bytes]:
+    while True:
+        ch = f.read(1)
+        if not ch:
+            return None
+        if ch not in b" \t\r\n":
+            return ch
+
+
+def iter_json_items_with_project_root(file_path: str, key: str = "data") -> Iterator[Any]:
+    """流式读取项目根目录下 JSON 文件中的数组元素
+
+    兼容两种结构：``{"data": [...]}``（读取 key 对应的数组）或顶层直接是数组。
+    安装了 ijson 时使用其事件流解析，否则退回标准库增量扫描。
+    任一时刻内存中只保留一个元素。
+
+    Args:
+        file_path: 相对于项目根目录的文件路径
+        key: 顶层对象中数组字段名
+
+    Yields:
+        数组中的每个元素
     """
-    with open(os.path.join(PROJECT_ROOT, file_path), 'w', encoding='utf-8') as f:
-        json.dump(data, f, ensure_ascii=False, indent=4)
+    abs_path = os.path.join(PROJECT_ROOT, file_path)
+    # 只在打开文件时持锁：写入方通过 rename 替换文件，已打开的句柄仍指向旧快照，
+    # 因此长时间遍历不会阻塞写入方
+    if ijson is not None:
+        with file_lock(abs_path, shared=True):
+            f = open(abs_path, 'rb')
+        with f:
+            root = _peek_root_byte(f)
+            if root not in (b'{', b'['):
+                return
+            f.seek(0)
+            prefix = "item" if root == b'[' else f"{key}.item"
+            yield from ijson.items(f, prefix, use_float=True)
+        return
 
+    with file_lock(abs_path, shared=True):
+        f = open(abs_path, 'r', encoding='utf-8')
+    with f:
+        scanner = _ChunkedJsonScanner(f)
+        root = scanner.peek()
+        if root == '[':
+            yield from scanner.iter_array()
+        elif root == '{':
+            if not scanner.seek_key(key):
+                return
+            if scanner.peek() != '[':
+                # 字段存在但不是数组（如 null），视为无数据
+                return
+            yield from scanner.iter_array()
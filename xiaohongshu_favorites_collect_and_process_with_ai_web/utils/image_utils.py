@@ -0,0 +1,210 @@
+import hashlib
+import json
+import os
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+from utils.file_utils import atomic_write_json, file_lock, json_loads, PROJECT_ROOT
+
+# ----------------------
+# 内容寻址存储
+# ----------------------
+# data/blobs/<前两位>/<sha256><扩展名>        图片内容，同样的字节只存一份
+# data/image_manifests/<note_id>.json       每条笔记的图片列表，指向 blob
+IMAGE_BLOBS_DIR = PROJECT_ROOT / "data" / "blobs"
+IMAGE_MANIFESTS_DIR = PROJECT_ROOT / "data" / "image_manifests"
+
+# 旧版按 data/images/<note_id>/<文件名> 存放的图片，05 会把它们导入 blob 存储
+LEGACY_IMAGES_DIR = PROJECT_ROOT / "data" / "images"
+
+IMAGE_MANIFEST_VERSION = 1
+
+
+def sanitize_filename(name: str) -> str:
+    # Windows 非法字符过滤: \\ / : * ? " < > |
+    invalid = '<>:"/\\|?*'
+    for ch in invalid:
+        name = name.replace(ch, '_')
+    # 去除控制字符
+    name = ''.join(c if 32 <= ord(c) < 127 else '_' for c in name)
+    # 避免过长
+    return name[:200] if len(name) > 200 else name
+
+
+def pick_filename_from_url(url: str, fallback: str) -> str:
+    path = urlsplit(url).path
+    base = os.path.basename(path) or fallback
+    base = sanitize_filename(base)
+    if not os.path.splitext(base)[1]:
+        # 没有扩展名时，尝试根据URL中可能的格式提示，默认 .jpg
+        if 'webp' in url.lower():
+            base += '.webp'
+        elif 'png' in url.lower():
+            base += '.png'
+        else:
+            base += '.jpg'
+    return base
+
+
+def guess_image_ext(data: bytes, fallback: str = ".jpg") -> str:
+    """按文件头判断图片格式；CDN 链接里的扩展名经常与实际内容不符"""
+    if data.startswith(b"\xff\xd8\xff"):
+        return ".jpg"
+    if data.startswith(b"\x89PNG\r\n\x1a\n"):
+        return ".png"
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return ".webp"
+    if data[:6] in (b"GIF87a", b"GIF89a"):
+        return ".gif"
+    if data[4:8] == b"ftyp" and data[8:12] in (b"avif", b"avis"):
+        return ".avif"
+    if data[4:8] == b"ftyp" and data[8:12] in (b"heic", b"heix", b"mif1"):
+        return ".heic"
+    return fallback
+
+
+def image_blob_rel_path(digest: str, ext: str) -> str:
+    """blob 相对 IMAGE_BLOBS_DIR 的路径（统一用 / 分隔）"""
+    return f"{digest[:2]}/{digest}{ext}"
+
+
+def image_blob_path(digest: str, ext: str) -> str:
+    return os.path.join(str(IMAGE_BLOBS_DIR), digest[:2], f"{digest}{ext}")
+
+
+def put_image_blob(data: bytes) -> Tuple[str, str]:
+    """按内容哈希写入 blob，已存在则直接复用
+
+    Returns:
+        (sha256 十六进制摘要, 扩展名)
+    """
+    digest = hashlib.sha256(data).hexdigest()
+    ext = guess_image_ext(data)
+    dst = image_blob_path(digest, ext)
+    if os.path.exists(dst) and os.path.getsize(dst) == len(data):
+        return digest, ext
+    os.makedirs(os.path.dirname(dst), exist_ok=True)
+    # 先写临时文件再改名，中途中断不会留下半张图片
+    tmp = f"{dst}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, dst)
+    return digest, ext
+
+
+def note_image_manifest_path(note_id: str) -> str:
+    return os.path.join(str(IMAGE_MANIFESTS_DIR), f"{sanitize_filename(note_id)}.json")
+
+
+def load_note_image_manifest(note_id: str) -> Optional[Dict[str, Any]]:
+    try:
+        with open(note_image_manifest_path(note_id), "rb") as f:
+            manifest = json_loads(f.read())
+    except (FileNotFoundError, ValueError):
+        return None
+    return manifest if isinstance(manifest, dict) else None
+
+
+def save_note_image_manifest(note_id: str, images: List[Dict[str, Any]]) -> None:
+    """写入单条笔记的图片清单；images 中每项至少包含 index/url/sha256/ext"""
+    atomic_write_json(note_image_manifest_path(note_id), {
+        "version": IMAGE_MANIFEST_VERSION,
+        "note_id": note_id,
+        "images": images,
+    }, indent=2)
+
+
+def iter_note_image_manifests(unreadable: Optional[List[str]] = None) -> Iterator[Dict[str, Any]]:
+    """遍历全部笔记的图片清单（按文件名排序，结果稳定）
+
+    Args:
+        unreadable: 传入列表时，读取失败或格式不对的清单文件名追加到其中（默认静默跳过）
+    """
+    if not os.path.isdir(IMAGE_MANIFESTS_DIR):
+        return
+    for fname in sorted(os.listdir(IMAGE_MANIFESTS_DIR)):
+        if not fname.endswith(".json"):
+            continue
+        try:
+            with open(os.path.join(str(IMAGE_MANIFESTS_DIR), fname), "rb") as f:
+                manifest = json_loads(f.read())
+        except (OSError, ValueError):
+            manifest = None
+        if isinstance(manifest, dict) and manifest.get("note_id"):
+            yield manifest
+        elif unreadable is not None:
+            unreadable.append(fname)
+
+
+def manifest_image_entries(manifest: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """清单中有效的图片条目，按笔记内顺序排列"""
+    images = [it for it in (manifest.get("images") or []) if isinstance(it, dict) and it.get("sha256")]
+    return sorted(images, key=lambda it: it.get("index", 0))
+
+
+def find_image_blob(digest: str) -> Optional[str]:
+    """只知道哈希、不知道扩展名时查找 blob 文件"""
+    shard = os.path.join(str(IMAGE_BLOBS_DIR), digest[:2])
+    try:
+        names = os.listdir(shard)
+    except FileNotFoundError:
+        return None
+    for name in names:
+        if name.startswith(digest) and not name.endswith(".tmp"):
+            return os.path.join(shard, name)
+    return None
+
+
+# ----------------------
+# 下载日志
+# ----------------------
+# data/download_manifest.jsonl：05 每处理一张新图片追加一行，只增不改。
+# 下游（06）记录读到的字节偏移，下次只读新增部分，启动开销与历史图片数量无关。
+
+DOWNLOAD_LOG_PATH = PROJECT_ROOT / "data" / "download_manifest.jsonl"
+
+
+def append_download_records(records: List[Dict[str, Any]]) -> None:
+    """追加下载记录：note_id/url/path/size/sha256/status/downloaded_at（失败时带 error）"""
+    if not records:
+        return
+    abs_path = str(DOWNLOAD_LOG_PATH)
+    lines = "".join(json.dumps(r, ensure_ascii=False, separators=(",", ":")) + "\n" for r in records)
+    # 整批一次写入并持锁，多进程追加时行不会交错；二进制模式保证偏移按字节计算
+    with file_lock(abs_path):
+        with open(abs_path, "ab") as f:
+            f.write(lines.encode("utf-8"))
+            f.flush()
+            os.fsync(f.fileno())
+
+
+def download_log_size() -> int:
+    try:
+        return os.path.getsize(DOWNLOAD_LOG_PATH)
+    except FileNotFoundError:
+        return 0
+
+
+def iter_download_records(offset: int = 0) -> Iterator[Tuple[Dict[str, Any], int]]:
+    """从字节偏移 offset 开始读取下载记录
+
+    Yields:
+        (记录, 该行结束处的字节偏移)；末尾未写完的半行不会产出，留待下次读取
+    """
+    try:
+        f = open(DOWNLOAD_LOG_PATH, "rb")
+    except FileNotFoundError:
+        return
+    with f:
+        f.seek(offset)
+        pos = offset
+        for line in f:
+            if not line.endswith(b"\n"):
+                return
+            pos += len(line)
+            try:
+                record = json_loads(line)
+            except ValueError:
+                continue
+            if isinstance(record, dict):
+                yield record, pos
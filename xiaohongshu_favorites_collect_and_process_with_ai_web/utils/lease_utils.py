@@ -0,0 +1,138 @@
+import os
+import socket
+import time
+from typing import Any, Callable, Dict, Iterable, Optional, Set, Tuple
+
+from utils.file_utils import read_json_with_project_root, update_json_with_project_root
+
+# ----------------------
+# 基于租约的任务认领
+# ----------------------
+# 多个 worker（可在不同机器上，共享同一个项目目录）通过一个租约文件协调：
+#   {"leases": {<key>: {"worker", "acquired_at", "heartbeat_at", "expires_at", "attempts", ["released_at"]}}}
+# 认领 / 续约 / 释放都在 file_utils 的排他锁内完成读-改-写，同一条目同一时刻只归一个 worker。
+# worker 崩溃后不再续约，租约过期即可被其他 worker 接管；
+# 处理成功的条目释放时删除租约，未成功的保留条目（expires_at 置 0）以累计认领次数；
+# 累计认领达到上限（反复失败，或大概率是这条数据让 worker 崩溃）的条目不再分配，需人工处理后删除租约。
+# 每个 worker 在一次运行中对同一条目只处理一次，失败的留待下次运行，避免对同一条反复重试。
+# 注意：跨机器共享目录时依赖网络文件系统对 flock 的支持（NFSv4 / SMB 一般可用）。
+
+# 租约有效期（秒），需明显大于续约间隔
+LEASE_TTL_SEC = 180
+# 处理期间的续约间隔（秒）
+LEASE_HEARTBEAT_SEC = 30
+# 同一条目最多被认领几次（含接管），超过后跳过
+LEASE_MAX_ATTEMPTS = 3
+
+
+def default_worker_id() -> str:
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+def _empty() -> Dict[str, Any]:
+    return {"leases": {}}
+
+
+def _leases(data: Any) -> Dict[str, Dict[str, Any]]:
+    if not isinstance(data, dict) or not isinstance(data.get("leases"), dict):
+        data = _empty()
+    return data["leases"]
+
+
+class LeaseStore:
+    """租约文件的读写封装；key 通常为 note_id"""
+
+    def __init__(self, rel_path: str, worker_id: Optional[str] = None, ttl_sec: float = LEASE_TTL_SEC,
+                 max_attempts: int = LEASE_MAX_ATTEMPTS) -> None:
+        self.rel_path = rel_path
+        self.worker_id = worker_id or default_worker_id()
+        self.ttl_sec = ttl_sec
+        self.max_attempts = max_attempts
+        # 本次运行中已处理并释放过的条目
+        self.handled: Set[str] = set()
+
+    def _update(self, fn: Callable[[Dict[str, Dict[str, Any]]], Any]) -> Any:
+        box: Dict[str, Any] = {}
+
+        def _apply(data: Any) -> Dict[str, Any]:
+            if not isinstance(data, dict) or not isinstance(data.get("leases"), dict):
+                data = _empty()
+            box["result"] = fn(data["leases"])
+            return data
+
+        update_json_with_project_root(self.rel_path, _apply, default=_empty, indent=2)
+        return box.get("result")
+
+    def claim(self, candidates: Iterable[str], is_pending: Callable[[str], bool]) -> Tuple[Optional[str], int]:
+        """按顺序认领第一个可处理的条目
+
+        is_pending 在锁内针对未被占用的候选调用，应基于最新落盘的结果判断，
+        避免重复处理刚被其他 worker 完成并释放的条目。本次运行已处理过的条目不再认领。
+
+        Returns:
+            (认领到的 key 或 None, 仍被其他 worker 有效持有的条目数)
+        """
+        def _claim(leases: Dict[str, Dict[str, Any]]) -> Tuple[Optional[str], int]:
+            now = time.time()
+            held_by_others = 0
+            for key in candidates:
+                lease = leases.get(key)
+                if lease and lease.get("worker") != self.worker_id and lease.get("expires_at", 0) > now:
+                    held_by_others += 1
+                    continue
+                if key in self.handled:
+                    continue
+                if not is_pending(key):
+                    # 已完成但租约残留（如释放前崩溃），顺手清理
+                    leases.pop(key, None)
+                    continue
+                if lease and int(lease.get("attempts") or 0) >= self.max_attempts:
+                    continue
+                if lease and lease.get("worker") != self.worker_id and not lease.get("released_at"):
+                    print(f"[info] 接管过期租约 {key}（原 worker {lease.get('worker')}）")
+                leases[key] = {
+                    "worker": self.worker_id,
+                    "acquired_at": now,
+                    "heartbeat_at": now,
+                    "expires_at": now + self.ttl_sec,
+                    "attempts": int((lease or {}).get("attempts") or 0) + 1,
+                }
+                return key, held_by_others
+            return None, held_by_others
+
+        return self._update(_claim)
+
+    def heartbeat(self, key: str) -> bool:
+        """续约；租约已被他人接管时返回 False"""
+        def _renew(leases: Dict[str, Dict[str, Any]]) -> bool:
+            lease = leases.get(key)
+            if not lease or lease.get("worker") != self.worker_id:
+                return False
+            now = time.time()
+            lease["heartbeat_at"] = now
+            lease["expires_at"] = now + self.ttl_sec
+            return True
+
+        return bool(self._update(_renew))
+
+    def release(self, key: str, done: bool = True) -> None:
+        """释放租约；done=False（处理失败或未完成）时保留条目与认领次数，供之后的认领计数"""
+        self.handled.add(key)
+
+        def _release(leases: Dict[str, Dict[str, Any]]) -> None:
+            lease = leases.get(key)
+            if not lease or lease.get("worker") != self.worker_id:
+                return
+            if done:
+                del leases[key]
+            else:
+                lease["expires_at"] = 0
+                lease["released_at"] = time.time()
+
+        self._update(_release)
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        try:
+            return _leases(read_json_with_project_root(self.rel_path))
+        except (FileNotFoundError, ValueError):
+            return {}
@@ -0,0 +1,253 @@
+import atexit
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+# ----------------------
+# 运行指标
+# ----------------------
+# 进程内累计计数器与直方图；阶段脚本调用 start_run(stage) 后，进程退出时写出：
+#   data/metrics/<stage>.prom   Prometheus textfile（node_exporter --collector.textfile.directory 指向该目录）
+#   data/metrics/<stage>.json   本次运行摘要：各指标的次数/总耗时/分位数，以及耗时占比
+# 未调用 start_run 时（如基准测试）只在内存中累计，不写文件。
+
+# 可用环境变量 XHS_METRICS_DIR 改写输出目录
+METRICS_DIR_ENV = "XHS_METRICS_DIR"
+METRIC_PREFIX = "xhs_"
+
+# 直方图桶（秒 / 字节）
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+BYTES_BUCKETS = (1024, 8 * 1024, 64 * 1024, 256 * 1024, 1024 ** 2, 4 * 1024 ** 2, 16 * 1024 ** 2, 64 * 1024 ** 2)
+
+# 指标名 -> (类型, 说明, 直方图桶)
+METRICS: Dict[str, Tuple[str, str, Tuple[float, ...]]] = {
+    "ai_task_seconds": ("histogram", "04 单个 AI 任务（一次模型调用 + 解析）耗时", LATENCY_BUCKETS),
+    "ai_task_total": ("counter", "04 AI 任务次数，outcome=ok/rpc_error/parse_error", ()),
+    "download_seconds": ("histogram", "05 单张图片下载耗时（含重试）", LATENCY_BUCKETS),
+    "download_bytes": ("histogram", "05 下载成功的图片大小", BYTES_BUCKETS),
+    "download_total": ("counter", "05 图片下载次数，status=ok/failed", ()),
+    "download_retries_total": ("counter", "05 下载重试次数", ()),
+    "ocr_call_seconds": ("histogram", "06 单次 OCR 调用耗时（切片各算一次）", LATENCY_BUCKETS),
+    "ocr_call_total": ("counter", "06 OCR 调用次数，outcome=ok/failed/error", ()),
+    "file_io_seconds": ("histogram", "JSON 文件读写耗时（含加锁等待）", LATENCY_BUCKETS),
+    "file_io_bytes_total": ("counter", "JSON 文件读写字节数", ()),
+    "page_call_seconds": ("histogram", "chat / OCR 单次调用耗时，page=cold（新页面）/warm（复用页面）", LATENCY_BUCKETS),
+    "page_recycle_total": ("counter", "页面回收次数，reason=max_calls/error", ()),
+    "profile_fetch_seconds": ("histogram", "10 单个作者主页请求（含解析）耗时", LATENCY_BUCKETS),
+    "profile_fetch_total": ("counter", "10 作者主页请求次数，status=ok/failed", ()),
+    "daemon_step_seconds": ("histogram", "常驻模式每轮各步骤耗时", LATENCY_BUCKETS),
+    "daemon_cycles_total": ("counter", "常驻模式同步轮数，outcome=ok/failed/idle", ()),
+    "compact_reclaimed_bytes_total": ("counter", "compact_data 回收的磁盘字节数，target=压缩/清理对象", ()),
+}
+
+_lock = threading.Lock()
+# (name, 排序后的标签) -> 计数值
+_counters: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], float] = {}
+# (name, 排序后的标签) -> {"buckets": [...], "count", "sum", "min", "max"}
+_histograms: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], Dict[str, Any]] = {}
+
+_run: Dict[str, Any] = {}
+
+
+def _key(name: str, labels: Dict[str, Any]) -> Tuple[str, Tuple[Tuple[str, str], ...]]:
+    return name, tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def inc(name: str, value: float = 1.0, **labels: Any) -> None:
+    key = _key(name, labels)
+    with _lock:
+        _counters[key] = _counters.get(key, 0.0) + value
+
+
+def observe(name: str, value: float, **labels: Any) -> None:
+    buckets = METRICS.get(name, ("histogram", "", LATENCY_BUCKETS))[2] or LATENCY_BUCKETS
+    key = _key(name, labels)
+    with _lock:
+        h = _histograms.get(key)
+        if h is None:
+            h = _histograms[key] = {"buckets": [0] * len(buckets), "count": 0, "sum": 0.0, "min": value, "max": value}
+        for i, bound in enumerate(buckets):
+            if value <= bound:
+                h["buckets"][i] += 1
+                break
+        h["count"] += 1
+        h["sum"] += value
+        h["min"] = min(h["min"], value)
+        h["max"] = max(h["max"], value)
+
+
+@contextmanager
+def timer(name: str, **labels: Any) -> Iterator[None]:
+    """记录代码块耗时（秒）；异常同样计入"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(name, time.perf_counter() - started, **labels)
+
+
+def observe_file_io(op: str, abs_path: str, seconds: float) -> None:
+    # 只用文件名作标签，避免标签数量随路径增长
+    name = os.path.basename(str(abs_path))
+    observe("file_io_seconds", seconds, op=op, file=name)
+    try:
+        inc("file_io_bytes_total", os.path.getsize(abs_path), op=op, file=name)
+    except OSError:
+        pass
+
+
+def _quantile(h: Dict[str, Any], buckets: Tuple[float, ...], q: float) -> Optional[float]:
+    """按桶线性插值估算分位数，结果限制在实际 min/max 之间"""
+    if not h["count"]:
+        return None
+    rank = q * h["count"]
+    seen = 0
+    lower = 0.0
+    for i, bound in enumerate(buckets):
+        n = h["buckets"][i]
+        if n and seen + n >= rank:
+            est = lower + (bound - lower) * (rank - seen) / n
+            return round(min(max(est, h["min"]), h["max"]), 6)
+        seen += n
+        lower = bound
+    return round(h["max"], 6)
+
+
+def snapshot() -> Dict[str, Any]:
+    """当前累计值：counters / histograms（含 mean 与 p50/p95/p99 估算）"""
+    with _lock:
+        counters = [{"name": n, "labels": dict(l), "value": v} for (n, l), v in sorted(_counters.items())]
+        histograms: List[Dict[str, Any]] = []
+        for (n, l), h in sorted(_histograms.items()):
+            buckets = METRICS.get(n, ("histogram", "", LATENCY_BUCKETS))[2] or LATENCY_BUCKETS
+            histograms.append({
+                "name": n,
+                "labels": dict(l),
+                "count": h["count"],
+                "sum": round(h["sum"], 6),
+                "mean": round(h["sum"] / h["count"], 6) if h["count"] else None,
+                "min": round(h["min"], 6),
+                "max": round(h["max"], 6),
+                "p50": _quantile(h, buckets, 0.5),
+                "p95": _quantile(h, buckets, 0.95),
+                "p99": _quantile(h, buckets, 0.99),
+            })
+    return {"counters": counters, "histograms": histograms}
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _fmt_labels(labels: Dict[str, str], extra: Optional[Dict[str, str]] = None) -> str:
+    merged = {**labels, **(extra or {})}
+    if not merged:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in merged.items()) + "}"
+
+
+def _fmt_value(v: float) -> str:
+    if math.isinf(v):
+        return "+Inf"
+    return repr(float(v)) if isinstance(v, float) and not v.is_integer() else str(int(v))
+
+
+def render_prometheus(stage: str, wall_seconds: float, finished_at: float) -> str:
+    """Prometheus 文本格式；每条序列都带 stage 标签，多个阶段的文件可放在同一目录"""
+    base = {"stage": stage}
+    lines: List[str] = [
+        f"# HELP {METRIC_PREFIX}stage_duration_seconds 阶段最近一次运行的墙钟耗时",
+        f"# TYPE {METRIC_PREFIX}stage_duration_seconds gauge",
+        f"{METRIC_PREFIX}stage_duration_seconds{_fmt_labels(base)} {_fmt_value(wall_seconds)}",
+        f"# HELP {METRIC_PREFIX}stage_last_run_timestamp_seconds 阶段最近一次运行结束时间",
+        f"# TYPE {METRIC_PREFIX}stage_last_run_timestamp_seconds gauge",
+        f"{METRIC_PREFIX}stage_last_run_timestamp_seconds{_fmt_labels(base)} {_fmt_value(round(finished_at, 3))}",
+    ]
+    with _lock:
+        names = sorted({n for n, _ in _counters} | {n for n, _ in _histograms})
+        for name in names:
+            kind, help_text, buckets = METRICS.get(name, ("counter" if name.endswith("_total") else "histogram", "", LATENCY_BUCKETS))
+            buckets = buckets or LATENCY_BUCKETS
+            full = METRIC_PREFIX + name
+            lines.append(f"# HELP {full} {help_text or name}")
+            lines.append(f"# TYPE {full} {kind}")
+            if kind == "counter":
+                for (n, l), v in sorted(_counters.items()):
+                    if n == name:
+                        lines.append(f"{full}{_fmt_labels(base, dict(l))} {_fmt_value(v)}")
+                continue
+            for (n, l), h in sorted(_histograms.items()):
+                if n != name:
+                    continue
+                labels = {**base, **dict(l)}
+                cumulative = 0
+                for bound, cnt in zip(buckets, h["buckets"]):
+                    cumulative += cnt
+                    lines.append(f"{full}_bucket{_fmt_labels(labels, {'le': _fmt_value(bound)})} {cumulative}")
+                lines.append(f"{full}_bucket{_fmt_labels(labels, {'le': '+Inf'})} {h['count']}")
+                lines.append(f"{full}_sum{_fmt_labels(labels)} {_fmt_value(round(h['sum'], 6))}")
+                lines.append(f"{full}_count{_fmt_labels(labels)} {h['count']}")
+    return "\n".join(lines) + "\n"
+
+
+def metrics_dir() -> str:
+    from utils.file_utils import PROJECT_ROOT  # 延迟导入：file_utils 依赖本模块
+
+    return os.environ.get(METRICS_DIR_ENV) or os.path.join(str(PROJECT_ROOT), "data", "metrics")
+
+
+def write_run_outputs(final: bool = True) -> None:
+    """写出本次运行的 textfile 与 JSON 摘要；未调用 start_run 时不做任何事
+
+    常驻进程用 final=False 定期刷新，进程退出时再写最终结果。
+    """
+    if not _run or _run.get("written"):
+        return
+    from utils.file_utils import atomic_write_json
+
+    _run["written"] = final
+    stage = _run["stage"]
+    finished = time.time()
+    wall = time.perf_counter() - _run["perf_start"]
+    out_dir = metrics_dir()
+    os.makedirs(out_dir, exist_ok=True)
+
+    # textfile 收集器可能随时读取，必须整体替换
+    prom_path = os.path.join(out_dir, f"{stage}.prom")
+    tmp = f"{prom_path}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(render_prometheus(stage, wall, finished))
+    os.replace(tmp, prom_path)
+
+    snap = snapshot()
+    # 各 *_seconds 指标的累计耗时占墙钟时间的比例，回答“时间花在哪里”
+    breakdown = sorted(
+        ({"name": h["name"], "labels": h["labels"], "seconds": h["sum"], "share": round(h["sum"] / wall, 4) if wall else None}
+         for h in snap["histograms"] if h["name"].endswith("_seconds")),
+        key=lambda x: x["seconds"], reverse=True,
+    )
+    atomic_write_json(os.path.join(out_dir, f"{stage}.json"), {
+        "stage": stage,
+        "pid": os.getpid(),
+        "started_at": _run["started_at"],
+        "finished_at": datetime.fromtimestamp(finished, tz=timezone.utc).isoformat().replace("+00:00", "Z"),
+        "wall_seconds": round(wall, 3),
+        "time_breakdown": breakdown,
+        **snap,
+    }, indent=2)
+
+
+def start_run(stage: str) -> None:
+    """标记阶段开始；进程退出（包括异常退出）时自动写出指标"""
+    if _run:
+        return
+    _run.update({
+        "stage": stage,
+        "perf_start": time.perf_counter(),
+        "started_at": datetime.now(timezone.utc).isoformat().replace("+00:00", "Z"),
+    })
+    atexit.register(write_run_outputs)
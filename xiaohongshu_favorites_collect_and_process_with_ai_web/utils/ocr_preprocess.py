@@ -0,0 +1,164 @@
+import os
+from typing import Any, Dict, List, Optional
+
+from utils.file_utils import atomic_write_json, json_loads, PROJECT_ROOT
+
+try:
+    from PIL import Image, ImageOps  # type: ignore
+except ImportError:  # pragma: no cover - 可选依赖
+    Image = None
+    ImageOps = None
+
+# ----------------------
+# OCR 前的图片预处理
+# ----------------------
+# 原图（常见 1080~4000px 宽的 WebP/JPEG）缩放到适合 OCR 的宽度并转灰度 PNG（文字图片无损且比 JPEG 更小）；
+# 超长截图按固定高度切片（相邻切片有重叠，避免文字行被切断）。
+# 每个切片记录 scale/offset，识别出的坐标可映射回原图。
+
+OCR_INPUTS_DIR = PROJECT_ROOT / "data" / "ocr_inputs"
+
+# 缩放后的最大宽度；文字行高仍在 OCR 模型的舒适区间内
+OCR_MAX_WIDTH = 1280
+# 宽高比超过该值视为长截图，需要切片
+OCR_TILE_ASPECT = 3.0
+# 切片高度与重叠高度（缩放后的像素）
+OCR_TILE_HEIGHT = 1600
+OCR_TILE_OVERLAP = 96
+
+PREPROCESS_VERSION = 1
+
+# OCR 结果中表示坐标的字段名（PaddleOCR 常见输出）
+BOX_KEYS = ("box", "boxes", "bbox", "points", "poly", "polys", "dt_polys", "rec_polys", "rec_boxes", "text_region")
+
+
+def preprocess_available() -> bool:
+    return Image is not None
+
+
+def _tile_path(digest: str, idx: int) -> str:
+    return os.path.join(str(OCR_INPUTS_DIR), digest[:2], f"{digest}.v{PREPROCESS_VERSION}.{idx}.png")
+
+
+def _meta_path(digest: str) -> str:
+    return os.path.join(str(OCR_INPUTS_DIR), digest[:2], f"{digest}.v{PREPROCESS_VERSION}.json")
+
+
+def _load_cached_tiles(digest: str) -> Optional[List[Dict[str, Any]]]:
+    """已预处理过的图片直接读切片信息，不再解码原图"""
+    try:
+        with open(_meta_path(digest), "rb") as f:
+            tiles = json_loads(f.read())
+    except (OSError, ValueError):
+        return None
+    if not isinstance(tiles, list) or not tiles:
+        return None
+    for idx, tile in enumerate(tiles):
+        tile["path"] = _tile_path(digest, idx)
+        if not os.path.exists(tile["path"]):
+            return None
+    return tiles
+
+
+def prepare_ocr_inputs(digest: str, src_path: str) -> Optional[List[Dict[str, Any]]]:
+    """生成（或复用）预处理后的切片
+
+    Returns:
+        [{"path", "scale", "offset_x", "offset_y", "width", "height"}]，
+        scale 为 原图像素 / 预处理后像素，offset 为切片左上角在原图中的位置；
+        未安装 Pillow 或图片无法解码时返回 None，调用方直接使用原图
+    """
+    cached = _load_cached_tiles(digest)
+    if cached is not None:
+        return cached
+    if Image is None:
+        return None
+    try:
+        with Image.open(src_path) as im:
+            im = ImageOps.exif_transpose(im)
+            orig_w, orig_h = im.size
+            scale = max(orig_w / OCR_MAX_WIDTH, 1.0)
+            w = max(round(orig_w / scale), 1)
+            h = max(round(orig_h / scale), 1)
+
+            spans = [(0, h)]
+            if h / w > OCR_TILE_ASPECT and h > OCR_TILE_HEIGHT:
+                step = OCR_TILE_HEIGHT - OCR_TILE_OVERLAP
+                spans = []
+                top = 0
+                while True:
+                    bottom = min(top + OCR_TILE_HEIGHT, h)
+                    spans.append((top, bottom))
+                    if bottom >= h:
+                        break
+                    top += step
+
+            gray = im.convert("L")
+            if scale > 1.0:
+                gray = gray.resize((w, h), Image.LANCZOS)
+            tiles: List[Dict[str, Any]] = []
+            for idx, (top, bottom) in enumerate(spans):
+                path = _tile_path(digest, idx)
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                tmp = f"{path}.{os.getpid()}.tmp"
+                gray.crop((0, top, w, bottom)).save(tmp, format="PNG", optimize=True)
+                os.replace(tmp, path)
+                tiles.append({
+                    "scale": scale,
+                    "offset_x": 0,
+                    "offset_y": round(top * scale),
+                    "width": w,
+                    "height": bottom - top,
+                })
+        # 切片全部写完后再写说明文件，中途中断下次会重新生成
+        atomic_write_json(_meta_path(digest), tiles, indent=None)
+        for idx, tile in enumerate(tiles):
+            tile["path"] = _tile_path(digest, idx)
+        return tiles
+    except Exception:
+        return None
+
+
+def _map_points(value: Any, tile: Dict[str, Any]) -> Any:
+    """把 [x, y] / [[x, y], ...] / [x1, y1, x2, y2] 形式的坐标换算回原图"""
+    scale = tile["scale"]
+    ox, oy = tile["offset_x"], tile["offset_y"]
+    if isinstance(value, list) and value and all(isinstance(v, (int, float)) for v in value):
+        if len(value) % 2:
+            return value
+        return [round(v * scale + (ox if i % 2 == 0 else oy), 1) for i, v in enumerate(value)]
+    if isinstance(value, list):
+        return [_map_points(v, tile) for v in value]
+    return value
+
+
+def map_boxes_to_original(data: Any, tile: Dict[str, Any]) -> Any:
+    """递归处理 OCR 返回结构，坐标字段换算为原图坐标，其余字段原样保留"""
+    if isinstance(data, dict):
+        return {k: (_map_points(v, tile) if k in BOX_KEYS else map_boxes_to_original(v, tile)) for k, v in data.items()}
+    if isinstance(data, list):
+        return [map_boxes_to_original(v, tile) for v in data]
+    return data
+
+
+def merge_tile_texts(texts: List[str]) -> str:
+    """拼接各切片文本；重叠区域会被识别两次，去掉与上一片末尾重复的开头行"""
+    merged: List[str] = []
+    for text in texts:
+        lines = [ln for ln in (text or "").splitlines()]
+        # 重叠高度只有几行文字，最多比较前几行
+        drop = 0
+        for n in range(min(len(lines), len(merged), 4), 0, -1):
+            if merged[-n:] == lines[:n]:
+                drop = n
+                break
+        merged.extend(lines[drop:])
+    return "\n".join(merged)
+
+
+def preprocess_meta(tiles: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """写入结果中的预处理说明，不含本机路径"""
+    return {
+        "version": PREPROCESS_VERSION,
+        "tiles": [{k: t[k] for k in ("scale", "offset_x", "offset_y", "width", "height")} for t in tiles],
+    }
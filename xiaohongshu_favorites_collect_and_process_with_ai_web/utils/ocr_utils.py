@@ -0,0 +1,152 @@
+import json
+import os
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+from utils.file_utils import read_json_with_project_root, PROJECT_ROOT
+from utils.image_utils import iter_note_image_manifests, manifest_image_entries
+from utils.payload_store import load_payload, put_payload
+
+OCR_RESULTS_PATH = "data/ocr_results.json"
+IMAGES_DIR = PROJECT_ROOT / "data" / "images"
+
+# OCR 返回的 data 中留在主文件里的字段，其余（坐标、置信度、图片数据等）移到旁路存储
+OCR_INLINE_DATA_KEYS = ("text", "raw_image_path")
+# 其余字段序列化后小于该字节数时留在原处，外置只会多一个引用
+OCR_PAYLOAD_MIN_BYTES = 512
+
+
+def note_id_from_image_path(path: Optional[str]) -> Optional[str]:
+    """从 .../images/<note_id>/<file> 形式的路径中取出 note_id（兼容 Windows 分隔符）"""
+    if not path:
+        return None
+    parts = [p for p in re.split(r"[\\/]+", path) if p]
+    for i in range(len(parts) - 2, -1, -1):
+        if parts[i] == "images" and i + 1 < len(parts) - 1:
+            return parts[i + 1]
+    return None
+
+
+def _scan_image_owners() -> Dict[str, str]:
+    """扫描旧版 data/images，建立 文件名 -> note_id 的映射（结果记录中缺少路径时兜底）"""
+    owners: Dict[str, str] = {}
+    if not os.path.isdir(IMAGES_DIR):
+        return owners
+    for note_id in os.listdir(IMAGES_DIR):
+        note_dir = IMAGES_DIR / note_id
+        if not os.path.isdir(note_dir):
+            continue
+        for fname in os.listdir(note_dir):
+            owners.setdefault(fname, note_id)
+    return owners
+
+
+def ocr_entry_text(entry: Any) -> str:
+    if not isinstance(entry, dict) or not entry.get("success"):
+        return ""
+    data = entry.get("data")
+    text = data.get("text") if isinstance(data, dict) else None
+    return text if isinstance(text, str) else ""
+
+
+def resolve_ocr_entry(results: Dict[str, Any], entry: Any) -> Any:
+    """近似重复图片的结果只记录 duplicate_of，取其指向的原始结果"""
+    if isinstance(entry, dict) and entry.get("duplicate_of"):
+        return results.get(entry["duplicate_of"])
+    return entry
+
+
+def externalize_ocr_payload(entry: Any) -> bool:
+    """把 OCR 结果中的完整返回结构移到旁路存储，data 只保留文本；有改动时返回 True"""
+    if not isinstance(entry, dict) or not isinstance(entry.get("data"), dict):
+        return False
+    data = entry["data"]
+    extra = {k: v for k, v in data.items() if k not in OCR_INLINE_DATA_KEYS}
+    if not extra or len(json.dumps(extra, ensure_ascii=False).encode("utf-8")) < OCR_PAYLOAD_MIN_BYTES:
+        return False
+    entry["payload_ref"] = put_payload(extra)
+    entry["data"] = {k: v for k, v in data.items() if k in OCR_INLINE_DATA_KEYS}
+    return True
+
+
+def load_ocr_data(entry: Any) -> Dict[str, Any]:
+    """按需取回 OCR 的完整 data（文本 + 旁路存储中的其余字段）"""
+    if not isinstance(entry, dict):
+        return {}
+    data = dict(entry.get("data") or {})
+    if entry.get("payload_ref"):
+        payload = load_payload(entry["payload_ref"])
+        if isinstance(payload, dict):
+            data = {**payload, **data}
+    return data
+
+
+def ocr_entry_note_id(entry: Any) -> Optional[str]:
+    if not isinstance(entry, dict):
+        return None
+    extra = entry.get("task_params_extra") or {}
+    data = entry.get("data") or {}
+    for path in (
+        extra.get("image_path_abs_path") if isinstance(extra, dict) else None,
+        data.get("raw_image_path") if isinstance(data, dict) else None,
+        entry.get("image_path"),
+    ):
+        nid = note_id_from_image_path(path)
+        if nid:
+            return nid
+    return None
+
+
+def load_ocr_entries_by_note() -> Dict[str, List[Tuple[str, str]]]:
+    """读取 OCR 结果，按 note_id 聚合识别出的文本
+
+    结果以图片内容哈希为键，通过 data/image_manifests 映射回引用它的每条笔记；
+    旧版以文件名为键的结果按图片路径归属笔记。
+
+    Returns:
+        note_id -> [(图片ID, OCR 文本)]（按图片在笔记中的顺序，跳过失败/空文本）
+    """
+    try:
+        results = read_json_with_project_root(OCR_RESULTS_PATH)
+    except FileNotFoundError:
+        return {}
+    if not isinstance(results, dict):
+        return {}
+
+    by_note: Dict[str, List[Tuple[str, str]]] = {}
+    claimed = set()
+    for manifest in iter_note_image_manifests():
+        note_id = str(manifest["note_id"])
+        seen = set()
+        for it in manifest_image_entries(manifest):
+            digest = it["sha256"]
+            if digest in seen or digest not in results:
+                continue
+            seen.add(digest)
+            claimed.add(digest)
+            text = ocr_entry_text(resolve_ocr_entry(results, results[digest]))
+            if text.strip():
+                by_note.setdefault(note_id, []).append((digest, text))
+
+    owners: Optional[Dict[str, str]] = None
+    for image_id in sorted(results):
+        if image_id in claimed:
+            continue
+        entry = results[image_id]
+        text = ocr_entry_text(entry)
+        if not text.strip():
+            continue
+        note_id = ocr_entry_note_id(entry)
+        if not note_id:
+            if owners is None:
+                owners = _scan_image_owners()
+            note_id = owners.get(image_id)
+        if not note_id:
+            continue
+        by_note.setdefault(note_id, []).append((image_id, text))
+    return by_note
+
+
+def load_ocr_text_by_note() -> Dict[str, List[str]]:
+    """同 load_ocr_entries_by_note，但只保留文本"""
+    return {nid: [text for _, text in entries] for nid, entries in load_ocr_entries_by_note().items()}
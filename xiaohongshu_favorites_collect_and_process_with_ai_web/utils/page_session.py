@@ -0,0 +1,111 @@
+from typing import Any, Dict, Optional
+
+from utils import metrics
+
+# ----------------------
+# 浏览器页面复用
+# ----------------------
+# 自动化后端按 close_page_when_task_finished 决定调用结束后是否关闭页面；不关闭时下一次同类调用直接复用该页面。
+# PageSession 把连续的调用编成一个会话：会话内页面保持打开，满足以下任一条件时让本次调用结束后关闭页面（回收），
+# 下一次调用会在新页面上进行：
+#   - 同一页面已累计 max_calls 次调用（长时间使用的页面内存上涨、偶发卡死）
+#   - 上一次调用失败（页面可能处于异常状态，至多再用一次）
+# 连续失败 max_errors 次后本次运行不再复用，退回每次调用都关闭页面。
+# 每次调用按是否新页面（cold / warm）分别记录耗时，summary() 估算复用节省的时间。
+
+# 同一页面最多承载多少次调用
+PAGE_SESSION_MAX_CALLS = 20
+# 连续失败多少次后放弃复用
+PAGE_SESSION_MAX_ERRORS = 3
+
+
+class PageSession:
+    """一类调用（如 chat / ocr）的页面生命周期；begin() 与 end() 成对调用，同一时刻只有一个调用在进行"""
+
+    def __init__(self, name: str, max_calls: int = PAGE_SESSION_MAX_CALLS,
+                 max_errors: int = PAGE_SESSION_MAX_ERRORS) -> None:
+        self.name = name
+        self.max_calls = max_calls
+        self.max_errors = max_errors
+        self.page_open = False
+        self.calls_on_page = 0
+        self.consecutive_errors = 0
+        self.recycle_reason: Optional[str] = None
+        self.disabled = False
+        self.pages = 0
+        self.recycled: Dict[str, int] = {}
+        self.stats: Dict[str, Dict[str, float]] = {"cold": {"count": 0, "seconds": 0.0}, "warm": {"count": 0, "seconds": 0.0}}
+        self._current: Optional[Dict[str, Any]] = None
+
+    def begin(self, reuse: bool = True) -> bool:
+        """开始一次调用，返回本次应传给 TaskParams 的 close_page_when_task_finished"""
+        reuse = reuse and not self.disabled
+        cold = not self.page_open
+        if cold:
+            self.pages += 1
+        reason = None
+        if reuse and self.recycle_reason:
+            reason = self.recycle_reason
+        elif reuse and self.max_calls and self.calls_on_page + 1 >= self.max_calls:
+            reason = "max_calls"
+        close = not reuse or reason is not None
+        self._current = {"cold": cold, "close": close, "reason": reason}
+        return close
+
+    def end(self, ok: bool, seconds: float) -> None:
+        """记录调用结果与耗时，并决定页面状态"""
+        current = self._current or {"cold": True, "close": True, "reason": None}
+        self._current = None
+        kind = "cold" if current["cold"] else "warm"
+        self.stats[kind]["count"] += 1
+        self.stats[kind]["seconds"] += seconds
+        metrics.observe("page_call_seconds", seconds, session=self.name, page=kind)
+
+        if ok:
+            self.consecutive_errors = 0
+        else:
+            self.consecutive_errors += 1
+            if self.max_errors and self.consecutive_errors >= self.max_errors and not self.disabled:
+                self.disabled = True
+                print(f"[warn] {self.name} 连续失败 {self.consecutive_errors} 次，本次运行不再复用页面")
+
+        if current["close"]:
+            if current["reason"]:
+                self.recycled[current["reason"]] = self.recycled.get(current["reason"], 0) + 1
+                metrics.inc("page_recycle_total", session=self.name, reason=current["reason"])
+            self.page_open = False
+            self.calls_on_page = 0
+            self.recycle_reason = None
+        else:
+            self.page_open = True
+            self.calls_on_page += 1
+            if not ok:
+                # 页面可能已异常：下一次调用结束后关闭
+                self.recycle_reason = "error"
+
+    def summary(self) -> Dict[str, Any]:
+        cold, warm = self.stats["cold"], self.stats["warm"]
+        cold_mean = cold["seconds"] / cold["count"] if cold["count"] else None
+        warm_mean = warm["seconds"] / warm["count"] if warm["count"] else None
+        saved = (cold_mean - warm_mean) * warm["count"] if cold_mean is not None and warm_mean is not None else None
+        return {
+            "session": self.name,
+            "calls": int(cold["count"] + warm["count"]),
+            "pages": self.pages,
+            "recycled": dict(self.recycled),
+            "reuse_disabled": self.disabled,
+            "cold_mean_seconds": round(cold_mean, 3) if cold_mean is not None else None,
+            "warm_mean_seconds": round(warm_mean, 3) if warm_mean is not None else None,
+            # 以新页面调用的平均耗时为基准，估算复用页面省下的总时间
+            "saved_seconds_est": round(saved, 1) if saved is not None else None,
+        }
+
+    def report(self) -> Dict[str, Any]:
+        s = self.summary()
+        if s["calls"] and s["warm_mean_seconds"] is None:
+            print(f"[info] {self.name} 未复用页面：{s['calls']} 次调用，平均 {s['cold_mean_seconds']}s")
+        elif s["calls"]:
+            print(f"[info] {self.name} 页面复用：{s['calls']} 次调用 / {s['pages']} 个页面，"
+                  f"新页面平均 {s['cold_mean_seconds']}s，复用平均 {s['warm_mean_seconds']}s，"
+                  f"估计节省 {s['saved_seconds_est']}s")
+        return s
@@ -0,0 +1,54 @@
+import gzip
+import hashlib
+import json
+import os
+from typing import Any
+
+from utils.file_utils import json_loads, PROJECT_ROOT
+
+# ----------------------
+# 压缩的旁路存储
+# ----------------------
+# 模型原始回复、OCR 完整返回等只在调试/重新解析时才用到的大字段，
+# 以 gzip 压缩的 JSON 存放在 data/payloads/<前两位>/<sha256>.json.gz，
+# 主记录里只保留哈希引用，下游读取主文件时不再解析这些内容。
+
+PAYLOAD_STORE_DIR = PROJECT_ROOT / "data" / "payloads"
+
+# 压缩级别：6 与 9 的体积相差很小，速度快不少
+PAYLOAD_COMPRESS_LEVEL = 6
+
+
+def _payload_path(digest: str) -> str:
+    return os.path.join(str(PAYLOAD_STORE_DIR), digest[:2], f"{digest}.json.gz")
+
+
+def put_payload(value: Any) -> str:
+    """写入任意可 JSON 序列化的值，返回内容哈希；相同内容只存一份"""
+    raw = json.dumps(value, ensure_ascii=False, sort_keys=True, separators=(",", ":")).encode("utf-8")
+    digest = hashlib.sha256(raw).hexdigest()
+    dst = _payload_path(digest)
+    if os.path.exists(dst):
+        return digest
+    os.makedirs(os.path.dirname(dst), exist_ok=True)
+    # mtime=0 让相同内容的压缩结果逐字节一致
+    tmp = f"{dst}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(gzip.compress(raw, compresslevel=PAYLOAD_COMPRESS_LEVEL, mtime=0))
+    os.replace(tmp, dst)
+    return digest
+
+
+def load_payload(digest: str) -> Any:
+    """按哈希读取旁路存储中的值；不存在或已损坏时返回 None"""
+    if not isinstance(digest, str) or not digest:
+        return None
+    try:
+        with open(_payload_path(digest), "rb") as f:
+            return json_loads(gzip.decompress(f.read()))
+    except (OSError, EOFError, ValueError):
+        return None
+
+
+def payload_exists(digest: str) -> bool:
+    return os.path.exists(_payload_path(digest))
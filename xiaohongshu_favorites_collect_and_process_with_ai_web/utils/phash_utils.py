@@ -0,0 +1,124 @@
+import math
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from utils.file_utils import read_json_with_project_root, write_json_with_project_root
+
+try:
+    from PIL import Image  # type: ignore
+except ImportError:  # pragma: no cover - 可选依赖
+    Image = None
+
+# ----------------------
+# 感知哈希（pHash）
+# ----------------------
+# 缩放到 32x32 灰度图做二维 DCT，取左上角 8x8 低频系数（去掉直流分量）与中位数比较，
+# 得到 64 位指纹。重新压缩、格式转换、轻微缩放后指纹基本不变，汉明距离很小。
+
+PHASH_CACHE_PATH = "data/image_phash.json"
+
+_DCT_SIZE = 32
+_HASH_SIZE = 8
+
+# DCT 余弦表：_COS[u][x] = cos((2x+1)uπ / 2N)，只需要前 8 个频率
+_COS = [
+    [math.cos((2 * x + 1) * u * math.pi / (2 * _DCT_SIZE)) for x in range(_DCT_SIZE)]
+    for u in range(_HASH_SIZE)
+]
+
+
+def phash_available() -> bool:
+    return Image is not None
+
+
+def compute_phash(path: str) -> Optional[int]:
+    """计算图片的 64 位 pHash；未安装 Pillow 或无法解码时返回 None"""
+    if Image is None:
+        return None
+    try:
+        with Image.open(path) as im:
+            im = im.convert("L").resize((_DCT_SIZE, _DCT_SIZE), Image.LANCZOS)
+            # L 模式每像素一个字节；getdata() 在新版 Pillow 中已弃用
+            pixels = list(im.tobytes())
+    except Exception:
+        return None
+
+    rows = [pixels[i * _DCT_SIZE:(i + 1) * _DCT_SIZE] for i in range(_DCT_SIZE)]
+    # 先对每行做一维 DCT（只保留低频），再对列做
+    row_dct = [[sum(c * p for c, p in zip(_COS[u], row)) for u in range(_HASH_SIZE)] for row in rows]
+    coeffs: List[float] = []
+    for v in range(_HASH_SIZE):
+        for u in range(_HASH_SIZE):
+            coeffs.append(sum(_COS[v][y] * row_dct[y][u] for y in range(_DCT_SIZE)))
+
+    # 直流分量只反映整体亮度，不参与比较
+    median = sorted(coeffs[1:])[len(coeffs[1:]) // 2]
+    value = 0
+    for c in coeffs:
+        value = (value << 1) | (1 if c > median else 0)
+    return value
+
+
+def hamming_distance(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+class BKTree:
+    """按汉明距离组织的 BK 树，半径查询只访问满足三角不等式的子树"""
+
+    def __init__(self) -> None:
+        # 节点：(哈希, 对应的 key, {距离: 子节点})
+        self._root: Optional[Tuple[int, str, Dict[int, tuple]]] = None
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def add(self, value: int, key: str) -> None:
+        self._size += 1
+        if self._root is None:
+            self._root = (value, key, {})
+            return
+        node = self._root
+        while True:
+            d = hamming_distance(value, node[0])
+            child = node[2].get(d)
+            if child is None:
+                node[2][d] = (value, key, {})
+                return
+            node = child
+
+    def search(self, value: int, max_distance: int) -> Iterator[Tuple[int, str]]:
+        """产出所有距离不超过 max_distance 的 (距离, key)"""
+        if self._root is None:
+            return
+        stack = [self._root]
+        while stack:
+            node = stack.pop()
+            d = hamming_distance(value, node[0])
+            if d <= max_distance:
+                yield d, node[1]
+            for child_d, child in node[2].items():
+                if d - max_distance <= child_d <= d + max_distance:
+                    stack.append(child)
+
+    def nearest(self, value: int, max_distance: int) -> Optional[Tuple[int, str]]:
+        best: Optional[Tuple[int, str]] = None
+        for d, key in self.search(value, max_distance):
+            if best is None or d < best[0]:
+                best = (d, key)
+                if d == 0:
+                    break
+        return best
+
+
+def load_phash_cache() -> Dict[str, str]:
+    """读取 sha256 -> pHash（16 位十六进制）缓存，避免每次重新解码图片"""
+    try:
+        data = read_json_with_project_root(PHASH_CACHE_PATH)
+    except (FileNotFoundError, ValueError):
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
+def save_phash_cache(cache: Dict[str, str]) -> None:
+    write_json_with_project_root(PHASH_CACHE_PATH, cache, indent=None)
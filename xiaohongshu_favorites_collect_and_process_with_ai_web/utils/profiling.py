@@ -0,0 +1,171 @@
+import atexit
+import cProfile
+import io
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+# ----------------------
+# 按需性能分析
+# ----------------------
+# 设置环境变量即可对任意阶段开启，无需改脚本：
+#   XHS_PROFILE=cpu          cProfile：cpu.prof（snakeviz / pstats 可读）+ cpu_top.txt
+#   XHS_PROFILE=sample       定时采样主线程调用栈：stacks.folded（flamegraph.pl / speedscope 可读），
+#                            采的是墙钟时间，await 等待 RPC 的时间也会体现出来
+#   XHS_PROFILE=mem          tracemalloc：mem_top.txt（按行/按调用栈的分配排行与峰值）+ mem.snapshot
+#   可组合：XHS_PROFILE=sample,mem
+# 结果写入 data/profiles/<阶段>-<时间>-<pid>/，进程退出时落盘。
+
+PROFILE_ENV = "XHS_PROFILE"
+PROFILE_DIR_ENV = "XHS_PROFILE_DIR"
+# 采样间隔（毫秒）
+PROFILE_INTERVAL_ENV = "XHS_PROFILE_INTERVAL_MS"
+DEFAULT_INTERVAL_MS = 5
+# tracemalloc 记录的调用栈深度
+TRACEMALLOC_FRAMES = 25
+# 排行输出条数
+TOP_N = 50
+
+PROFILE_MODES = ("cpu", "sample", "mem")
+
+_state: Dict[str, Any] = {}
+
+
+class StackSampler(threading.Thread):
+    """后台线程定时读取目标线程的调用栈，按折叠格式（a;b;c 次数）累计"""
+
+    def __init__(self, thread_id: int, interval_sec: float) -> None:
+        super().__init__(name="xhs-stack-sampler", daemon=True)
+        self.thread_id = thread_id
+        self.interval_sec = interval_sec
+        self.counts: Counter = Counter()
+        self.samples = 0
+        self._stop_event = threading.Event()
+
+    def run(self) -> None:
+        while not self._stop_event.wait(self.interval_sec):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            self.counts[";".join(reversed(stack))] += 1
+            self.samples += 1
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        self.join(timeout=1.0)
+
+    def write_folded(self, path: str) -> None:
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, count in self.counts.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+def requested_modes() -> List[str]:
+    raw = os.environ.get(PROFILE_ENV, "")
+    modes = [m.strip().lower() for m in raw.split(",") if m.strip()]
+    unknown = [m for m in modes if m not in PROFILE_MODES]
+    if unknown:
+        print(f"[warn] 未知的 {PROFILE_ENV} 取值 {unknown}，可选 {'/'.join(PROFILE_MODES)}")
+    return [m for m in modes if m in PROFILE_MODES]
+
+
+def _profile_root() -> str:
+    from utils.file_utils import PROJECT_ROOT
+
+    return os.environ.get(PROFILE_DIR_ENV) or os.path.join(str(PROJECT_ROOT), "data", "profiles")
+
+
+def start(stage: str) -> Optional[str]:
+    """按环境变量开启性能分析；未开启时不做任何事。返回本次的输出目录"""
+    modes = requested_modes()
+    if not modes or _state:
+        return None
+    run_dir = os.path.join(_profile_root(), f"{stage}-{datetime.now().strftime('%Y%m%d-%H%M%S')}-{os.getpid()}")
+    os.makedirs(run_dir, exist_ok=True)
+    _state.update({"stage": stage, "dir": run_dir, "modes": modes, "started": time.perf_counter()})
+
+    if "mem" in modes:
+        tracemalloc.start(TRACEMALLOC_FRAMES)
+    if "sample" in modes:
+        try:
+            interval_ms = float(os.environ.get(PROFILE_INTERVAL_ENV, DEFAULT_INTERVAL_MS))
+        except ValueError:
+            interval_ms = DEFAULT_INTERVAL_MS
+        sampler = StackSampler(threading.get_ident(), max(interval_ms, 0.5) / 1000)
+        sampler.start()
+        _state["sampler"] = sampler
+    if "cpu" in modes:
+        profiler = cProfile.Profile()
+        profiler.enable()
+        _state["profiler"] = profiler
+
+    atexit.register(stop)
+    print(f"[info] 性能分析已开启（{','.join(modes)}），结果目录: {run_dir}")
+    return run_dir
+
+
+def _write_mem_report(run_dir: str) -> None:
+    snapshot = tracemalloc.take_snapshot()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    # 过滤掉分析工具自身的分配
+    snapshot = snapshot.filter_traces((
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, cProfile.__file__),
+        tracemalloc.Filter(False, pstats.__file__),
+        tracemalloc.Filter(False, __file__),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    ))
+    snapshot.dump(os.path.join(run_dir, "mem.snapshot"))
+
+    lines = [f"当前 {current / 1024 / 1024:.1f} MB，峰值 {peak / 1024 / 1024:.1f} MB", "", f"== 按行 Top {TOP_N} =="]
+    for stat in snapshot.statistics("lineno")[:TOP_N]:
+        lines.append(f"{stat.size / 1024:10.1f} KB {stat.count:8d} 块  {stat.traceback[0]}")
+    lines += ["", "== 按调用栈 Top 10 =="]
+    for stat in snapshot.statistics("traceback")[:10]:
+        lines.append(f"-- {stat.size / 1024:.1f} KB，{stat.count} 块")
+        lines.extend("   " + ln for ln in stat.traceback.format(limit=12))
+    with open(os.path.join(run_dir, "mem_top.txt"), "w", encoding="utf-8") as f:
+        f.write("\n".join(lines) + "\n")
+
+
+def stop() -> None:
+    """停止分析并写出结果（进程退出时自动调用，可重复调用）"""
+    if not _state or _state.get("stopped"):
+        return
+    _state["stopped"] = True
+    run_dir = _state["dir"]
+
+    profiler: Optional[cProfile.Profile] = _state.get("profiler")
+    if profiler is not None:
+        profiler.disable()
+    sampler: Optional[StackSampler] = _state.get("sampler")
+    if sampler is not None:
+        sampler.stop()
+        sampler.write_folded(os.path.join(run_dir, "stacks.folded"))
+    # 先取内存快照，避免把下面整理 cProfile 结果的分配算进去
+    if "mem" in _state["modes"] and tracemalloc.is_tracing():
+        _write_mem_report(run_dir)
+
+    if profiler is not None:
+        profiler.dump_stats(os.path.join(run_dir, "cpu.prof"))
+        buf = io.StringIO()
+        stats = pstats.Stats(profiler, stream=buf)
+        stats.sort_stats("cumulative").print_stats(TOP_N)
+        stats.sort_stats("tottime").print_stats(TOP_N)
+        with open(os.path.join(run_dir, "cpu_top.txt"), "w", encoding="utf-8") as f:
+            f.write(buf.getvalue())
+
+    print(f"[info] 性能分析结果已写入 {run_dir}（耗时 {time.perf_counter() - _state['started']:.1f}s）")
@@ -0,0 +1,179 @@
+import atexit
+import os
+import socket
+import time
+from collections import Counter, deque
+from datetime import datetime, timedelta, timezone
+from typing import Any, Deque, Dict, Optional
+
+# ----------------------
+# 进度与运行清单
+# ----------------------
+# ProgressTracker 记录阶段内每个条目的结果（ok/skipped/failed 等），按滑动窗口计算吞吐与预计剩余时间，
+# 定期打印一行进度；运行结束时写出结构化清单 data/runs/<阶段>-<时间>-<pid>.json：
+#   起止时间、本次配置、各结果计数、吞吐，用于按账号额度估算每次能跑多少条。
+# 未调用 finish() 就退出（异常 / Ctrl-C）时也会写出，status 记为 aborted。
+
+# 可用环境变量 XHS_RUNS_DIR 改写输出目录
+RUNS_DIR_ENV = "XHS_RUNS_DIR"
+# 吞吐滑动窗口：最近多少个实际处理的条目
+RATE_WINDOW = 20
+# 进度行最小打印间隔（秒），0 表示每个条目都打印
+PRINT_INTERVAL_SEC = 10.0
+# 这些结果几乎没有耗时，不计入吞吐，否则 ETA 会偏乐观
+INSTANT_STATUSES = ("skipped", "invalid", "reused", "imported", "duplicate", "missing")
+
+STATUS_LABELS = {
+    "ok": "成功",
+    "partial": "部分",
+    "failed": "失败",
+    "skipped": "跳过",
+    "invalid": "无效",
+    "reused": "复用",
+    "imported": "导入",
+    "duplicate": "近似重复",
+    "missing": "缺失",
+}
+
+
+def _iso(ts: float) -> str:
+    return datetime.fromtimestamp(ts, tz=timezone.utc).isoformat().replace("+00:00", "Z")
+
+
+def format_duration(seconds: float) -> str:
+    seconds = int(round(max(seconds, 0)))
+    hours, rest = divmod(seconds, 3600)
+    minutes, secs = divmod(rest, 60)
+    if hours:
+        return f"{hours}h{minutes:02d}m"
+    if minutes:
+        return f"{minutes}m{secs:02d}s"
+    return f"{secs}s"
+
+
+def runs_dir() -> str:
+    from utils.file_utils import PROJECT_ROOT
+
+    return os.environ.get(RUNS_DIR_ENV) or os.path.join(str(PROJECT_ROOT), "data", "runs")
+
+
+class ProgressTracker:
+    """单个阶段的进度：每处理完一个条目调用 tick(status)，结束时调用 finish()"""
+
+    def __init__(self, stage: str, total: int, unit: str = "条", config: Optional[Dict[str, Any]] = None,
+                 print_interval: float = PRINT_INTERVAL_SEC) -> None:
+        self.stage = stage
+        self.total = max(int(total), 0)
+        self.unit = unit
+        self.config = dict(config or {})
+        self.print_interval = print_interval
+        self.counts: Counter = Counter()
+        self.done = 0
+        self.work_done = 0
+        self.started_at = time.time()
+        self.started = time.monotonic()
+        # 最近若干个实际处理条目的完成时刻，首个元素为起点
+        self._window: Deque[float] = deque([self.started], maxlen=RATE_WINDOW + 1)
+        self._last_print = self.started
+        self._printed_done = 0
+        self._finished = False
+        atexit.register(self._abort)
+
+    def tick(self, status: str = "ok", n: int = 1) -> None:
+        now = time.monotonic()
+        self.counts[status] += n
+        self.done += n
+        if status not in INSTANT_STATUSES:
+            self.work_done += n
+            self._window.extend([now] * n)
+        if self.print_interval <= 0 or now - self._last_print >= self.print_interval or self.done >= self.total:
+            self._last_print = now
+            self._printed_done = self.done
+            print(self.line())
+
+    def rate(self) -> Optional[float]:
+        """最近窗口内每秒实际处理的条目数"""
+        if len(self._window) < 2:
+            return None
+        span = self._window[-1] - self._window[0]
+        return (len(self._window) - 1) / span if span > 0 else None
+
+    def eta_seconds(self) -> Optional[float]:
+        remaining = max(self.total - self.done, 0)
+        if remaining == 0:
+            return 0.0
+        rate = self.rate()
+        if not rate:
+            return None
+        # 剩余条目中也会有跳过/复用的，按已处理部分中实际处理的比例折算
+        work_ratio = self.work_done / self.done if self.done else 1.0
+        return remaining * work_ratio / rate
+
+    def line(self) -> str:
+        pct = f" ({self.done / self.total * 100:.1f}%)" if self.total else ""
+        counts = " ".join(f"{STATUS_LABELS.get(k, k)} {v}" for k, v in self.counts.most_common())
+        rate = self.rate()
+        rate_text = f"{rate:.2f} {self.unit}/s" if rate else f"-- {self.unit}/s"
+        eta = self.eta_seconds()
+        if self.total and self.done >= self.total:
+            eta_text = "已完成"
+        elif eta is None:
+            eta_text = "剩余 --"
+        else:
+            finish_at = datetime.now() + timedelta(seconds=eta)
+            eta_text = f"剩余约 {format_duration(eta)}，预计 {finish_at.strftime('%H:%M:%S' if eta < 86400 else '%m-%d %H:%M')} 完成"
+        return f"[进度] {self.done}/{self.total}{pct} | {counts or '-'} | {rate_text} | {eta_text}"
+
+    def manifest(self, status: str, extra: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        finished_at = time.time()
+        wall = time.monotonic() - self.started
+        rate = self.rate()
+        return {
+            "stage": self.stage,
+            "status": status,
+            "pid": os.getpid(),
+            "host": socket.gethostname(),
+            "started_at": _iso(self.started_at),
+            "finished_at": _iso(finished_at),
+            "wall_seconds": round(wall, 3),
+            "config": self.config,
+            "unit": self.unit,
+            "total": self.total,
+            "processed": self.done,
+            "remaining": max(self.total - self.done, 0),
+            "counts": dict(self.counts),
+            "throughput": {
+                # 含跳过等瞬时条目
+                "items_per_sec": round(self.done / wall, 4) if wall > 0 else None,
+                # 只算实际处理的条目，用于估算下次运行耗时
+                "work_items_per_sec": round(self.work_done / wall, 4) if wall > 0 else None,
+                "recent_work_items_per_sec": round(rate, 4) if rate else None,
+                "avg_seconds_per_work_item": round(wall / self.work_done, 3) if self.work_done else None,
+            },
+            **({"extra": extra} if extra else {}),
+        }
+
+    def finish(self, status: str = "completed", **extra: Any) -> Optional[str]:
+        """打印最终进度并写出运行清单，返回清单路径；重复调用无效"""
+        if self._finished:
+            return None
+        self._finished = True
+        atexit.unregister(self._abort)
+        from utils.file_utils import atomic_write_json
+
+        if self.done != self._printed_done:
+            print(self.line())
+        out_dir = runs_dir()
+        path = os.path.join(out_dir, f"{self.stage}-{datetime.now().strftime('%Y%m%d-%H%M%S')}-{os.getpid()}.json")
+        try:
+            os.makedirs(out_dir, exist_ok=True)
+            atomic_write_json(path, self.manifest(status, extra), indent=2)
+        except OSError as e:
+            print(f"[warn] 写入运行清单失败: {e}")
+            return None
+        print(f"[info] 运行清单已写入 {path}")
+        return path
+
+    def _abort(self) -> None:
+        # 进程退出前仍未 finish：异常或被中断
+        self.finish(status="aborted")
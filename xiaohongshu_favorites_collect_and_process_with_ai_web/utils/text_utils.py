@@ -0,0 +1,62 @@
+import re
+import unicodedata
+from typing import List, Set
+
+# CJK 统一表意文字（含扩展A与兼容区）、日文假名、韩文音节，按二元组切分
+_CJK_RANGES = (
+    ("\u3400", "\u4dbf"),
+    ("\u4e00", "\u9fff"),
+    ("\uf900", "\ufaff"),
+    ("\u3040", "\u30ff"),
+    ("\uac00", "\ud7af"),
+)
+
+_LATIN_WORD_RE = re.compile(r"[a-z0-9]+")
+
+
+def is_cjk(ch: str) -> bool:
+    return any(lo <= ch <= hi for lo, hi in _CJK_RANGES)
+
+
+def tokenize(text: str) -> List[str]:
+    """检索用分词：CJK 连续片段切成二元组（单字片段保留单字），拉丁字母/数字按词切分。
+
+    与前端 server/utils/searchIndex.ts 中的 tokenize 保持一致，修改时需同步。
+    """
+    if not text:
+        return []
+    text = unicodedata.normalize("NFKC", text).lower()
+    tokens: List[str] = []
+    run: List[str] = []
+
+    def flush_run() -> None:
+        if len(run) == 1:
+            tokens.append(run[0])
+        else:
+            for i in range(len(run) - 1):
+                tokens.append(run[i] + run[i + 1])
+        run.clear()
+
+    buf: List[str] = []
+    for ch in text:
+        if is_cjk(ch):
+            if buf:
+                tokens.extend(_LATIN_WORD_RE.findall("".join(buf)))
+                buf.clear()
+            run.append(ch)
+        else:
+            if run:
+                flush_run()
+            buf.append(ch)
+    if run:
+        flush_run()
+    if buf:
+        tokens.extend(_LATIN_WORD_RE.findall("".join(buf)))
+    return tokens
+
+
+def cjk_chars(text: str) -> Set[str]:
+    """文本中出现的全部 CJK 单字（与 tokenize 相同的规范化），供单字查询使用"""
+    if not text:
+        return set()
+    return {ch for ch in unicodedata.normalize("NFKC", text).lower() if is_cjk(ch)}